@@ -0,0 +1,125 @@
+# catalog/autocomplete.py
+"""
+Index mémoire (par processus) pour l'autocomplétion "search-as-you-type".
+
+/api/products/?search= fait une requête SQL par frappe clavier. Ici, les
+noms des produits actifs et des catégories sont gardés dans des tableaux
+triés : une recherche = un bisect + la lecture des N entrées suivantes,
+sans aucune requête SQL.
+
+  - clés normalisées (minuscules, sans accents) : "Écran" -> "ecran"
+  - chaque nom est indexé en entier ET à partir de chacun de ses mots,
+    pour que "rtx" trouve "Nvidia RTX 4090"
+  - l'index est construit au premier appel, puis reconstruit quand
+    CatalogVersion.names_version change (nom ou état actif modifié, pas un
+    prix ni un stock). Elle n'est relue en base qu'au plus toutes les
+    CATALOG_AUTOCOMPLETE_CHECK_INTERVAL secondes (défaut 5s) ; dans le
+    processus qui écrit, les signaux l'invalident tout de suite.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Category, Product
+from .versioning import get_catalog_version
+
+
+def normalize(text: str) -> str:
+    """Minuscules, sans accents, espaces compactés."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+class PrefixIndex:
+    """
+    Tableaux triés de (clé, position) : `names` pour les noms complets,
+    `words` pour les noms pris à partir du 2e, 3e... mot.
+    """
+
+    def __init__(self, items):
+        # items : [(id, nom affiché)]
+        self.items = list(items)
+        names, words = [], []
+        for position, (_, label) in enumerate(self.items):
+            key = normalize(label)
+            names.append((key, position))
+            start = key.find(" ")
+            while start != -1:
+                words.append((key[start + 1 :], position))
+                start = key.find(" ", start + 1)
+        names.sort()
+        words.sort()
+        self.name_keys = [key for key, _ in names]
+        self.name_positions = [position for _, position in names]
+        self.word_keys = [key for key, _ in words]
+        self.word_positions = [position for _, position in words]
+
+    def search(self, prefix: str, limit: int) -> list[tuple[int, str]]:
+        """
+        Au plus `limit` (id, nom) dont le nom, ou un de ses mots, commence
+        par `prefix` (déjà normalisé). Les noms qui commencent par le
+        préfixe passent en premier, puis ordre alphabétique.
+        """
+        found = {}
+        for keys, positions in (
+            (self.name_keys, self.name_positions),
+            (self.word_keys, self.word_positions),
+        ):
+            index = bisect_left(keys, prefix)
+            while index < len(keys) and len(found) < limit and keys[index].startswith(prefix):
+                found.setdefault(positions[index], None)
+                index += 1
+        return [self.items[position] for position in found]
+
+
+class AutocompleteIndex:
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._indexes = None  # (produits, catégories)
+
+    def search(self, query: str, limit: int) -> dict:
+        prefix = normalize(query)
+        if not prefix:
+            return {"products": [], "categories": []}
+        products, categories = self._get_indexes()
+        return {
+            "products": [{"id": pk, "name": name} for pk, name in products.search(prefix, limit)],
+            "categories": [{"id": pk, "name": name} for pk, name in categories.search(prefix, limit)],
+        }
+
+    def invalidate(self) -> None:
+        """Force la relecture de la version au prochain appel."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _get_indexes(self):
+        indexes = self._indexes
+        if indexes is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return indexes
+
+        with self._lock:
+            if self._indexes is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._indexes
+            # version lue AVANT les noms : une écriture concurrente sera vue au prochain contrôle
+            version = get_catalog_version().names_version
+            if self._indexes is None or version != self._version:
+                products = Product.objects.filter(is_active=True).values_list("id", "name")
+                self._indexes = (
+                    PrefixIndex(products.iterator(chunk_size=10_000)),
+                    PrefixIndex(Category.objects.values_list("id", "name")),
+                )
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._indexes
+
+
+autocomplete_index = AutocompleteIndex(
+    check_interval=getattr(settings, "CATALOG_AUTOCOMPLETE_CHECK_INTERVAL", 5),
+)
@@ -0,0 +1,105 @@
+# catalog/facets.py
+"""
+Compteurs de facettes pour la barre latérale de la page Produits.
+
+Chaque facette est calculée par UNE requête d'agrégation (GROUP BY /
+COUNT filtré), jamais par une boucle Python sur les produits.
+Le résultat est mis en cache par "signature" de filtres (filtres + recherche)
+et par version du catalogue : toute écriture Product/Category invalide le cache.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .filters import apply_product_filters
+from .versioning import get_catalog_version
+
+# Bornes des tranches de prix : [0, 50[, [50, 100[, ... [1000, +inf[
+DEFAULT_PRICE_BUCKETS = [0, 50, 100, 250, 500, 1000]
+
+
+def get_price_buckets() -> list[Decimal]:
+    bounds = getattr(settings, "CATALOG_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS)
+    return [Decimal(str(bound)) for bound in bounds]
+
+
+def facets_cache_key(filters: dict, search: str | None) -> str:
+    signature = json.dumps(
+        {
+            "filters": filters,
+            "search": search or "",
+            "version": get_catalog_version().version,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return "catalog:facets:" + hashlib.md5(signature.encode("utf-8")).hexdigest()
+
+
+def category_facet(qs) -> list[dict]:
+    rows = (
+        qs.order_by()
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("category__name")
+    )
+    return [
+        {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+        for row in rows
+    ]
+
+
+def price_facet(qs) -> list[dict]:
+    bounds = get_price_buckets()
+    buckets = []
+    for index, low in enumerate(bounds):
+        high = bounds[index + 1] if index + 1 < len(bounds) else None
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        buckets.append((f"bucket_{index}", low, high, condition))
+
+    counts = qs.order_by().aggregate(
+        **{key: Count("id", filter=condition) for key, _, _, condition in buckets}
+    )
+    return [
+        {
+            "min": str(low),
+            "max": str(high) if high is not None else None,
+            "count": counts[key],
+        }
+        for key, low, high, _ in buckets
+    ]
+
+
+def stock_facet(qs) -> dict:
+    return qs.order_by().aggregate(
+        in_stock=Count("id", filter=Q(stock__gt=0)),
+        out_of_stock=Count("id", filter=Q(stock=0)),
+    )
+
+
+def compute_facets(base_qs, filters: dict, search: str | None = None) -> dict:
+    """
+    Calcule (ou relit depuis le cache) les facettes pour `base_qs`
+    (produits actifs, déjà restreints par la recherche).
+
+    Chaque facette ignore son propre filtre : cocher une catégorie ne fait
+    pas disparaître les autres catégories de la liste.
+    """
+    key = facets_cache_key(filters, search)
+    facets = cache.get(key)
+    if facets is not None:
+        return facets
+
+    facets = {
+        "categories": category_facet(apply_product_filters(base_qs, filters, exclude="category")),
+        "price": price_facet(apply_product_filters(base_qs, filters, exclude="price")),
+        "stock": stock_facet(apply_product_filters(base_qs, filters, exclude="stock")),
+    }
+    cache.set(key, facets, getattr(settings, "CATALOG_FACETS_CACHE_TIMEOUT", 60))
+    return facets
@@ -0,0 +1,114 @@
+# catalog/filters.py
+"""
+Filtres du catalogue (/api/products/).
+
+  - ?category=2 ou ?category=2,5 (ou ?category=2&category=5)  -> une ou plusieurs catégories
+  - ?min_price=10&max_price=99.90                             -> fourchette de prix
+  - ?in_stock=1                                               -> seulement stock > 0
+
+Les filtres sont d'abord normalisés dans un dict (parse_product_filters),
+ce qui permet aussi de s'en servir comme clé de cache (voir facets.py).
+"""
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off"}
+# Plus grand identifiant stockable (entier signé 64 bits) : au-delà, la base
+# lève OverflowError au lieu de simplement ne rien trouver
+MAX_ID = 2**63 - 1
+
+
+def parse_ids(values, name, max_ids=None) -> list[int]:
+    """
+    "1,5,9" (ou liste de telles chaînes, ex: params.getlist) -> [1, 5, 9],
+    sans doublons, dans l'ordre reçu. ValidationError (400) si une valeur
+    n'est pas un identifiant (entier de 1 à MAX_ID), ou s'il y en a plus
+    de `max_ids`.
+    """
+    if isinstance(values, str):
+        values = [values]
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            if not part.strip():
+                continue
+            try:
+                pk = int(part)
+            except ValueError:
+                raise ValidationError({name: "Liste d'identifiants attendue (ex: 1,5,9)."})
+            if not 1 <= pk <= MAX_ID:
+                raise ValidationError({name: f"Identifiant hors limites : {part.strip()}."})
+            ids.append(pk)
+    ids = list(dict.fromkeys(ids))
+    if max_ids is not None and len(ids) > max_ids:
+        raise ValidationError({name: f"{max_ids} identifiants maximum par requête."})
+    return ids
+
+
+def _parse_decimal(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: "Nombre décimal attendu."})
+    # Decimal("NaN") / Decimal("Infinity") passent le parsing mais pas l'ORM
+    if not parsed.is_finite():
+        raise ValidationError({name: "Nombre décimal attendu."})
+    return parsed
+
+
+def parse_product_filters(params) -> dict:
+    """
+    Lit les query params et retourne un dict normalisé :
+      {"category": [2, 5], "min_price": Decimal, "max_price": Decimal, "in_stock": True}
+    Seuls les filtres réellement fournis apparaissent dans le dict.
+    """
+    filters = {}
+
+    categories = parse_ids(params.getlist("category"), "category")
+    if categories:
+        filters["category"] = sorted(categories)
+
+    min_price = _parse_decimal(params, "min_price")
+    if min_price is not None:
+        filters["min_price"] = min_price
+    max_price = _parse_decimal(params, "max_price")
+    if max_price is not None:
+        filters["max_price"] = max_price
+
+    in_stock = (params.get("in_stock") or "").lower()
+    if in_stock in TRUE_VALUES:
+        filters["in_stock"] = True
+    elif in_stock in FALSE_VALUES:
+        filters["in_stock"] = False
+    elif in_stock:
+        raise ValidationError({"in_stock": "Valeur booléenne attendue (1/0)."})
+
+    return filters
+
+
+def apply_product_filters(qs, filters: dict, exclude: str | None = None):
+    """
+    Applique les filtres normalisés à un queryset de produits.
+
+    `exclude` permet d'ignorer un groupe de filtres ("category", "price"
+    ou "stock") : c'est ce que fait le calcul des facettes pour que chaque
+    facette affiche les choix possibles indépendamment de sa propre sélection.
+    """
+    if exclude != "category" and "category" in filters:
+        qs = qs.filter(category_id__in=filters["category"])
+    if exclude != "price":
+        if "min_price" in filters:
+            qs = qs.filter(price__gte=filters["min_price"])
+        if "max_price" in filters:
+            qs = qs.filter(price__lte=filters["max_price"])
+    if exclude != "stock" and "in_stock" in filters:
+        if filters["in_stock"]:
+            qs = qs.filter(stock__gt=0)
+        else:
+            qs = qs.filter(stock=0)
+    return qs
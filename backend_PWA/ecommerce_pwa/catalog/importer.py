@@ -0,0 +1,275 @@
+# catalog/importer.py
+"""
+Import / mise à jour en masse des produits depuis un flux fournisseur
+(CSV ou JSON Lines), utilisé par `python manage.py import_products`.
+
+  - lecture en streaming : le fichier n'est jamais chargé en entier
+  - upsert par paquets de taille fixe, clé = sku
+    (bulk_create pour les nouveaux, bulk_update pour les existants)
+  - une transaction par paquet : une erreur SQL n'annule que son paquet
+  - une ligne illisible (UTF-8 ou JSON invalide, valeur JSON qui n'est
+    pas un objet, champ invalide) est signalée avec son numéro de ligne
+    et ignorée, l'import continue
+
+Colonnes reconnues : sku (obligatoire), name, description, price, stock,
+is_active, image_url, category (nom) ou category_id.
+
+bulk_create / bulk_update ne passent pas par Product.save() ni par les
+signaux : la version du catalogue, l'index de recherche et le cache des
+réponses sont donc mis à jour ici, une fois par paquet.
+"""
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import search, trigrams
+from .models import CatalogVersion, Category, Product
+from .response_cache import response_cache
+from .stock_cache import stock_cache
+
+UPDATE_FIELDS = [
+    "name", "description", "price", "stock", "is_active", "image_url",
+    "category", "version", "updated_at",
+]
+REQUIRED_FOR_CREATE = ("name", "price", "category_id")
+TRUE_VALUES = {"1", "true", "yes", "on", "oui"}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path: str, fmt: str):
+    """
+    Générateur de (n° de ligne, dict), un enregistrement du fichier à la
+    fois. Un enregistrement illisible donne (n° de ligne, RowError) au lieu
+    d'interrompre la lecture.
+    """
+    with open(path, "rb") as handle:
+        if fmt == "csv":
+            yield from _read_csv(handle)
+        else:
+            yield from _read_jsonl(handle)
+
+
+def _read_jsonl(handle):
+    for line_no, raw in enumerate(handle, start=1):
+        try:
+            line = raw.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            yield line_no, RowError("encodage UTF-8 invalide")
+            continue
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(f"JSON invalide: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_no, RowError(f"objet JSON attendu, reçu {type(row).__name__}")
+            continue
+        yield line_no, row
+
+
+def _read_csv(handle):
+    position = {"line": 0}
+    undecodable = []
+
+    def lines():
+        # décodage ligne par ligne : une ligne invalide est mise de côté
+        for line_no, raw in enumerate(handle, start=1):
+            position["line"] = line_no
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError:
+                undecodable.append(line_no)
+
+    reader = csv.DictReader(lines())
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            row = None
+        except csv.Error as e:
+            row = RowError(f"CSV invalide: {e}")
+        while undecodable:
+            yield undecodable.pop(0), RowError("encodage UTF-8 invalide")
+        if row is None:
+            return
+        yield position["line"], row
+
+
+def chunked(rows, size: int):
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ProductImporter:
+    def __init__(self, chunk_size: int = 1000, create_categories: bool = True):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.categories_by_name = {c.name: c.pk for c in Category.objects.all()}
+        self.category_ids = set(self.categories_by_name.values())
+        self.created = 0
+        self.updated = 0
+        self.errors: list[str] = []
+        self.rows = 0
+
+    def run(self, rows, on_chunk=None) -> dict:
+        started = time.perf_counter()
+        for chunk in chunked(rows, self.chunk_size):
+            chunk_started = time.perf_counter()
+            created, updated = self.import_chunk(chunk)
+            self.rows += len(chunk)
+            if on_chunk is not None:
+                elapsed = time.perf_counter() - chunk_started
+                on_chunk(self.rows, created, updated, len(chunk) / elapsed if elapsed else 0)
+
+        if self.created or self.updated:
+            response_cache.clear()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "errors": len(self.errors),
+            "seconds": elapsed,
+            "rows_per_second": self.rows / elapsed if elapsed else 0,
+        }
+
+    # ------------------------------------------------------------------
+    def import_chunk(self, chunk: list[tuple[int, dict]]) -> tuple[int, int]:
+        """`chunk` : (n° de ligne, dict ou RowError), comme produits par read_rows()."""
+        parsed: dict[str, dict] = {}
+        for line_no, row in chunk:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                if not isinstance(row, dict):
+                    raise RowError(f"objet attendu, reçu {type(row).__name__}")
+                values = self.parse_row(row)
+            except RowError as e:
+                self.errors.append(f"ligne {line_no}: {e}")
+                continue
+            parsed[values["sku"]] = values  # même sku deux fois : la dernière ligne gagne
+
+        if not parsed:
+            return 0, 0
+
+        try:
+            return self._upsert(parsed)
+        except DatabaseError as e:
+            # la transaction du paquet est annulée, on passe au suivant
+            self.errors.append(f"paquet lignes {chunk[0][0]}-{chunk[-1][0]} annulé: {e}")
+            return 0, 0
+
+    def _upsert(self, parsed: dict[str, dict]) -> tuple[int, int]:
+        with transaction.atomic():
+            # verrou de CatalogVersion d'abord, lignes produit ensuite :
+            # même ordre que Product.save (voir catalog/inventory.py)
+            # les créations ont toujours un nom (REQUIRED_FOR_CREATE)
+            names = any({"name", "is_active"} & values.keys() for values in parsed.values())
+            version = CatalogVersion.bump(names=names)
+            now = timezone.now()
+            existing = Product.objects.in_bulk(list(parsed), field_name="sku")
+
+            to_create, to_update = [], []
+            for sku, values in parsed.items():
+                product = existing.get(sku)
+                if product is None:
+                    missing = [field for field in REQUIRED_FOR_CREATE if field not in values]
+                    if missing:
+                        self.errors.append(f"sku {sku}: champs requis manquants {missing}")
+                        continue
+                    product = Product(sku=sku)
+                    to_create.append(product)
+                else:
+                    to_update.append(product)
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.version = version
+                product.updated_at = now
+
+            Product.objects.bulk_create(to_create, batch_size=self.chunk_size)
+            Product.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=self.chunk_size)
+
+            if any(product.pk is None for product in to_create):
+                # base sans RETURNING : on relit les ids générés
+                ids = dict(
+                    Product.objects.filter(sku__in=[p.sku for p in to_create])
+                    .values_list("sku", "pk")
+                )
+                for product in to_create:
+                    product.pk = ids[product.sku]
+            if search.is_available():
+                search.index_products(to_create + to_update)
+            trigrams.index_products(to_create + to_update)
+
+        stock_cache.invalidate(product.pk for product in to_update)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        return len(to_create), len(to_update)
+
+    def parse_row(self, row: dict) -> dict:
+        sku = str(row.get("sku") or "").strip()
+        if not sku:
+            raise RowError("sku manquant")
+        values = {"sku": sku}
+
+        if row.get("name") not in (None, ""):
+            values["name"] = str(row["name"])[:200]
+        if "description" in row:
+            values["description"] = str(row["description"] or "")
+        if row.get("price") not in (None, ""):
+            try:
+                price = Decimal(str(row["price"])).quantize(Decimal("0.01"))
+            except InvalidOperation:
+                raise RowError(f"prix invalide: {row['price']!r}")
+            # NaN, négatif ou plus de 8 chiffres avant la virgule (max_digits=10)
+            if not price.is_finite() or price < 0 or price.adjusted() >= 8:
+                raise RowError(f"prix invalide: {row['price']!r}")
+            values["price"] = price
+        if row.get("stock") not in (None, ""):
+            try:
+                values["stock"] = max(int(row["stock"]), 0)
+            except (TypeError, ValueError):
+                raise RowError(f"stock invalide: {row['stock']!r}")
+        if row.get("is_active") not in (None, ""):
+            is_active = row["is_active"]
+            values["is_active"] = is_active if isinstance(is_active, bool) else str(is_active).lower() in TRUE_VALUES
+        if "image_url" in row:
+            values["image_url"] = str(row["image_url"]) if row["image_url"] else None
+
+        category_id = self.resolve_category(row)
+        if category_id is not None:
+            values["category_id"] = category_id
+        return values
+
+    def resolve_category(self, row: dict) -> int | None:
+        if row.get("category_id") not in (None, ""):
+            try:
+                category_id = int(row["category_id"])
+            except (TypeError, ValueError):
+                raise RowError(f"category_id invalide: {row['category_id']!r}")
+            if category_id not in self.category_ids:
+                raise RowError(f"catégorie #{category_id} introuvable")
+            return category_id
+
+        name = str(row.get("category") or "").strip()
+        if not name:
+            return None
+        if name not in self.categories_by_name:
+            if not self.create_categories:
+                raise RowError(f"catégorie {name!r} introuvable")
+            category = Category.objects.create(name=name)
+            self.categories_by_name[name] = category.pk
+            self.category_ids.add(category.pk)
+        return self.categories_by_name[name]
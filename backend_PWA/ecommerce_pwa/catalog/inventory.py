@@ -0,0 +1,82 @@
+# catalog/inventory.py
+"""
+Réservation du stock pendant une commande, en requêtes groupées.
+
+  1. lock_products() verrouille toutes les lignes produit du panier en UNE
+     requête SELECT ... FOR UPDATE, toujours par pk croissant : deux
+     commandes concurrentes prennent les verrous dans le même ordre et ne
+     peuvent pas s'interbloquer (deadlock)
+  2. decrement_stock() retire les quantités en UN seul UPDATE
+     (stock = stock - CASE pk WHEN ... END)
+
+Le stock fait partie du catalogue (Product.CATALOG_FIELDS) : après une
+commande, les ETag, le cache de réponses et la synchro delta doivent voir
+le nouveau stock. Un UPDATE de queryset ne passe ni par Product.save() ni
+par les signaux : decrement_stock() publie donc lui-même le changement,
+APRÈS commit (publish_stock_change) : nouvelle version du catalogue,
+version des produits vendus, caches vidés.
+
+Ordre des verrous : partout où les deux sont pris (Product.save, import,
+signaux des catégories, publish_stock_change), la ligne CatalogVersion est
+verrouillée AVANT les lignes produit. La transaction de la commande ne
+prend que les verrous produit (la version est incrémentée après son
+commit) : elle ne peut pas s'interbloquer avec ces écritures, et les
+commandes ne se sérialisent pas sur CatalogVersion.
+"""
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .models import Product
+from .signals import catalog_changed
+from .stock_cache import stock_cache
+from .versioning import bump_catalog_version
+
+
+def lock_products(product_ids) -> dict:
+    """{pk: Product} des produits trouvés, verrouillés jusqu'à la fin de la transaction."""
+    products = (
+        Product.objects.select_for_update()
+        .filter(pk__in=product_ids)
+        .order_by("pk")
+        .only("id", "name", "price", "stock", "is_active")
+    )
+    return {product.pk: product for product in products}
+
+
+def decrement_stock(products: dict, quantities: dict) -> None:
+    """
+    Retire quantities[pk] du stock des produits verrouillés `products`
+    (stock déjà vérifié par l'appelant). Met aussi à jour `products` en mémoire.
+    """
+    if not quantities:
+        return
+    delta = Case(
+        *[When(pk=pk, then=Value(units)) for pk, units in quantities.items()],
+        output_field=PositiveIntegerField(),
+    )
+    Product.objects.filter(pk__in=quantities).update(
+        stock=F("stock") - delta,
+        updated_at=timezone.now(),
+    )
+
+    remaining = {}
+    for pk, units in quantities.items():
+        products[pk].stock -= units
+        remaining[pk] = products[pk].stock if products[pk].is_active else None
+
+    # seulement si la commande est validée : un rollback ne doit pas polluer les caches
+    transaction.on_commit(lambda: publish_stock_change(remaining))
+
+
+def publish_stock_change(remaining: dict) -> None:
+    """
+    Après commit d'une commande : stock "live", nouvelle version du
+    catalogue pour les produits vendus (ETag, synchro delta), caches vidés.
+    `remaining` : {pk: stock restant, None si produit inactif}.
+    """
+    stock_cache.set_many(remaining)
+    with transaction.atomic():
+        version = bump_catalog_version()
+        Product.objects.filter(pk__in=remaining).update(version=version)
+    catalog_changed()
@@ -0,0 +1,115 @@
+import random
+import statistics
+import string
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from catalog.models import Category, Product
+from catalog.pagination import KeysetPagination
+from catalog.views import ProductViewSet
+
+# Formes de requêtes de ProductViewSet.list (voir catalog/views.py)
+QUERY_SHAPES = [
+    ("liste, 1re page", "/api/products/?limit=20"),
+    ("liste, page suivante", "/api/products/?limit=20&cursor={cursor}"),
+    ("catégorie, 1re page", "/api/products/?category={category}&limit=20"),
+    ("catégorie, page suivante", "/api/products/?category={category}&limit=20&cursor={cursor}"),
+    ("prix + stock", "/api/products/?min_price=10&max_price=100&in_stock=1&limit=20"),
+    ("liste complète (non paginée)", "/api/products/?fields=id"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche EXPLAIN QUERY PLAN et les temps des requêtes de ProductViewSet "
+        "sur un catalogue synthétique de 10k / 100k / 1M produits. "
+        "Les données générées sont annulées (rollback) à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000, 1_000_000],
+            help="Tailles de catalogue à mesurer (défaut : 10000 100000 1000000).",
+        )
+        parser.add_argument("--runs", type=int, default=5, help="Exécutions par requête (médiane).")
+        parser.add_argument("--categories", type=int, default=50, help="Nombre de catégories générées.")
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.runs = max(options["runs"], 1)
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            categories = Category.objects.bulk_create(
+                Category(name=f"Bench {i:03d}") for i in range(options["categories"])
+            )
+            self.category_id = categories[0].pk
+
+            for size in sorted(options["sizes"]):
+                self.populate(size, categories, rng)
+                self.report(size)
+
+            # ne rien laisser dans la base
+            transaction.set_rollback(True)
+
+    # ------------------------------------------------------------------
+    def populate(self, size, categories, rng):
+        missing = size - Product.objects.filter(name__startswith="bench-").count()
+        started = time.perf_counter()
+        batch = []
+        for _ in range(max(missing, 0)):
+            suffix = "".join(rng.choices(string.ascii_lowercase, k=12))
+            batch.append(Product(
+                category=rng.choice(categories),
+                name=f"bench-{suffix}",
+                price=Decimal(rng.randint(100, 50_000)) / 100,
+                stock=rng.choice([0, 0, 1, 5, 20, 100]),
+                is_active=rng.random() > 0.1,
+            ))
+            if len(batch) == 10_000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n=== {size} produits (génération {time.perf_counter() - started:.1f}s) ==="
+        ))
+
+    def report(self, size):
+        paginator = KeysetPagination()
+        middle = (
+            Product.objects.filter(is_active=True, name__startswith="bench-")
+            .order_by("name", "id")
+            .values_list("name", "id")[size // 2 : size // 2 + 1]
+        )
+        cursor = paginator.encode_cursor(list(middle[0])) if middle else ""
+
+        for label, template in QUERY_SHAPES:
+            url = template.format(cursor=cursor, category=self.category_id)
+            request = Request(self.factory.get(url))
+            view = ProductViewSet(request=request, action="list", format_kwarg=None, kwargs={})
+            queryset = view.get_queryset()
+            if "limit" in request.query_params:
+                queryset = paginator.get_page_queryset(queryset, request)
+
+            timings = []
+            for _ in range(self.runs):
+                started = time.perf_counter()
+                rows = len(list(queryset.all()))
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"\n{label} — {url}\n  {rows} lignes, médiane {statistics.median(timings):.2f} ms "
+                f"(min {min(timings):.2f} ms)"
+            ))
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"  {line}")
@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from catalog.models import Category, Product
+from catalog.serializers import ProductSerializer
+from ecommerce_pwa.fast_serializers import FastSerializer
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from orders.models import Order, OrderItem
+from orders.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les serializers DRF (ProductSerializer, OrderSerializer, "
+        "NotificationSerializer) au chemin rapide FastSerializer sur des données "
+        "synthétiques, et vérifie que la sortie est identique. "
+        "Les données générées sont annulées (rollback) à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="Objets par liste (défaut : 2000).")
+        parser.add_argument("--runs", type=int, default=5, help="Exécutions par mesure (médiane).")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        self.runs = max(options["runs"], 1)
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            user = User.objects.create_user(username="bench-serializers")
+            category = Category.objects.create(name="Bench")
+            products = Product.objects.bulk_create(
+                Product(
+                    category=category,
+                    name=f"bench-{i:06d}",
+                    description="Description " * 10,
+                    price=Decimal(rng.randint(100, 50_000)) / 100,
+                    stock=rng.randint(0, 50),
+                )
+                for i in range(rows)
+            )
+            orders = Order.objects.bulk_create(
+                Order(user=user, total_amount=Decimal("99.90")) for _ in range(rows // 5)
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order,
+                    product=rng.choice(products),
+                    quantity=rng.randint(1, 3),
+                    unit_price=Decimal("19.98"),
+                )
+                for order in orders
+                for _ in range(3)
+            )
+            Notification.objects.bulk_create(
+                Notification(user=user, title="Promo", message="Message " * 5, type="promo")
+                for _ in range(rows)
+            )
+
+            self.compare(
+                "ProductSerializer",
+                Product.objects.filter(category=category).select_related("category"),
+                ProductSerializer,
+            )
+            self.compare(
+                "OrderSerializer (+ items)",
+                Order.objects.filter(user=user).prefetch_related("items__product"),
+                OrderSerializer,
+            )
+            self.compare(
+                "NotificationSerializer",
+                Notification.objects.filter(user=user),
+                NotificationSerializer,
+            )
+
+            transaction.set_rollback(True)
+
+    def compare(self, label, queryset, serializer_class):
+        fast = FastSerializer.for_serializer(serializer_class)
+
+        drf_data = serializer_class(queryset.all(), many=True).data
+        fast_data = fast.serialize(fast.values(queryset.all()))
+        if [dict(item) for item in drf_data] != fast_data:
+            raise CommandError(f"{label} : la sortie du chemin rapide diffère de DRF.")
+
+        drf = self.measure(lambda: serializer_class(queryset.all(), many=True).data)
+        quick = self.measure(lambda: fast.serialize(fast.values(queryset.all())))
+        self.stdout.write(self.style.SUCCESS(
+            f"{label:<28} {len(fast_data):>6} objets | DRF {drf:8.1f} ms | "
+            f"rapide {quick:8.1f} ms | x{drf / quick:.1f}"
+        ))
+
+    def measure(self, func):
+        timings = []
+        for _ in range(self.runs):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from catalog.snapshot import brotli, build_snapshot, get_snapshot_dir
+
+
+class Command(BaseCommand):
+    help = (
+        "Écrit le catalogue complet (catégories + produits actifs) dans un fichier "
+        "JSON adressé par hash, pré-compressé en gzip (et brotli si disponible)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=3,
+            help="Nombre de snapshots à conserver (défaut : 3).",
+        )
+
+    def handle(self, *args, **options):
+        pointer = build_snapshot(keep=options["keep"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {pointer['file']} (catalogue v{pointer['version']}, "
+            f"{pointer['size']} octets) écrit dans {get_snapshot_dir()}"
+        ))
+        if brotli is None:
+            self.stdout.write("Module `brotli` absent : seule la variante gzip a été générée.")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from catalog.popularity import LONG_WINDOW_DAYS, compact
+from catalog.versioning import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire les ventes de plus de "
+        f"{LONG_WINDOW_DAYS} jours et recalcule les meilleures ventes 7 / 30 jours "
+        "(à lancer une fois par jour, ex: cron)."
+    )
+
+    def handle(self, *args, **options):
+        expired, ranked = compact()
+        # le tri ?ordering=popular change : la nouvelle version change les
+        # ETag et les clés du cache de réponses de TOUS les processus (un
+        # response_cache.clear() ici ne viderait que celui de la commande)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"{expired} seaux expirés, {ranked} produits classés."
+        ))
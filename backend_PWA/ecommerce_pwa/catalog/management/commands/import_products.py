@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import ProductImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe / met à jour des produits en masse depuis un fichier CSV ou "
+        "JSON Lines (clé : sku), par paquets de taille fixe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier .csv ou .jsonl du fournisseur.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Format du fichier (déduit de l'extension par défaut).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Nombre de lignes par paquet / transaction (défaut : 1000).",
+        )
+        parser.add_argument(
+            "--no-create-categories",
+            action="store_true",
+            help="Rejeter les lignes dont la catégorie (par nom) n'existe pas.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"Fichier introuvable : {path}")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size doit être >= 1")
+
+        importer = ProductImporter(
+            chunk_size=options["chunk_size"],
+            create_categories=not options["no_create_categories"],
+        )
+
+        def on_chunk(rows, created, updated, rate):
+            if options["verbosity"] >= 2:
+                self.stdout.write(
+                    f"  {rows} lignes lues (+{created} créés, {updated} mis à jour, {rate:.0f} lignes/s)"
+                )
+
+        report = importer.run(read_rows(str(path), fmt), on_chunk=on_chunk)
+
+        for error in importer.errors[:20]:
+            self.stderr.write(f"  {error}")
+        if len(importer.errors) > 20:
+            self.stderr.write(f"  ... {len(importer.errors) - 20} autres erreurs")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} lignes en {report['seconds']:.2f}s "
+            f"({report['rows_per_second']:.0f} lignes/s) : "
+            f"{report['created']} créés, {report['updated']} mis à jour, {report['errors']} erreurs."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import search, trigrams
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit les index de recherche des produits : trigrammes "
+        "(recherche tolérante aux fautes) et plein texte (FTS5)."
+    )
+
+    def handle(self, *args, **options):
+        count = trigrams.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Index de trigrammes reconstruit : {count} produits."))
+
+        if not search.is_available():
+            raise CommandError(
+                "Index FTS5 introuvable : lancez d'abord `python manage.py migrate catalog`."
+            )
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Index de recherche reconstruit : {count} produits."))
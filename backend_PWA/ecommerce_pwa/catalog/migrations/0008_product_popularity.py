@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_relatedproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='catalog.product')),
+                ('units_7d', models.PositiveIntegerField(default=0)),
+                ('units_30d', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Product popularity',
+                'verbose_name_plural': 'Product popularity',
+                'indexes': [models.Index(fields=['-units_7d'], name='popularity_7d_idx'), models.Index(fields=['-units_30d'], name='popularity_30d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSalesBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_buckets', to='catalog.product')),
+            ],
+            options={
+                'verbose_name': 'Product sales bucket',
+                'verbose_name_plural': 'Product sales buckets',
+                'indexes': [models.Index(fields=['day'], name='sales_bucket_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='sales_bucket_product_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:44
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copie figée de catalog.trigrams.name_trigrams (et de normalize) au moment
+# de cette migration : une évolution du code de l'app ne doit pas changer
+# ce qu'elle fait.
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def name_trigrams(name):
+    decomposed = unicodedata.normalize('NFKD', (name or '').casefold())
+    text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    grams = set()
+    for word in _WORD_RE.findall(text):
+        padded = f'  {word} '
+        grams |= {padded[i : i + 3] for i in range(len(padded) - 2)}
+    return grams
+
+
+def index_existing_products(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductTrigram = apps.get_model('catalog', 'ProductTrigram')
+    rows = Product.objects.filter(is_active=True).values_list('pk', 'name')
+    ProductTrigram.objects.bulk_create(
+        (
+            ProductTrigram(trigram=gram, product_id=pk)
+            for pk, name in rows.iterator(chunk_size=5000)
+            for gram in name_trigrams(name)
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_product_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.product')),
+            ],
+            options={
+                'verbose_name': 'Product trigram',
+                'verbose_name_plural': 'Product trigrams',
+                'constraints': [models.UniqueConstraint(fields=('trigram', 'product'), name='product_trigram_uniq')],
+            },
+        ),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
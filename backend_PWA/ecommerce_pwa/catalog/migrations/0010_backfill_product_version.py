@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_product_version(apps, schema_editor):
+    """
+    Les produits existants avant 0004 sont restés à version=0 : la synchro
+    delta (?since=0 filtre version > 0) les omettait. On leur donne une
+    vraie version, prise sur la ligne CatalogVersion (créée au besoin).
+    """
+    CatalogVersion = apps.get_model('catalog', 'CatalogVersion')
+    Product = apps.get_model('catalog', 'Product')
+    stale = Product.objects.filter(version=0)
+    if not stale.exists():
+        return
+    state, _ = CatalogVersion.objects.get_or_create(pk=1)
+    state.version += 1
+    state.updated_at = timezone.now()
+    state.save(update_fields=['version', 'updated_at'])
+    stale.update(version=state.version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_product_trigram'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_backfill_product_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogversion',
+            name='names_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
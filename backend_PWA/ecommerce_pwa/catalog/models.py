@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 #les models du Category et Product
@@ -22,6 +23,8 @@ class Product(models.Model):
         on_delete=models.CASCADE,
         related_name='products'
     )
+    # Référence stable du fournisseur (clé des imports en masse, voir import_products)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -29,10 +32,244 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     image_url = models.URLField(blank=True, null=True)
 
+    # Synchro delta (/api/products/changes/) : version du catalogue au
+    # moment de la dernière écriture de ce produit
+    version = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
         ordering = ['name']
+        indexes = [
+            # Index partiels (produits actifs seulement), dans l'ordre du tri
+            # de ProductViewSet (name, id). Sur SQLite, Django écrit
+            # is_active=True sous la forme `WHERE "is_active"` : un index
+            # composite (is_active, category, name) ne peut pas s'en servir
+            # comme préfixe d'égalité, alors que la condition d'un index
+            # partiel correspond exactement (voir benchmark_catalog_queries).
+            models.Index(
+                fields=['category', 'name', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_cat_name_idx',
+            ),
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_active=True),
+                name='product_active_name_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+    # Champs exposés par le catalogue (ETag, cache des réponses, synchro
+    # delta) : les modifier donne une nouvelle version. Le stock en fait
+    # partie, il est renvoyé par ProductSerializer et sert aux filtres
+    CATALOG_FIELDS = (
+        'category_id', 'sku', 'name', 'description', 'price', 'stock', 'is_active', 'image_url',
+    )
+
+    def changed_catalog_fields(self, update_fields=None) -> set:
+        """Champs de CATALOG_FIELDS modifiés par rapport à la base (tous à la création)."""
+        fields = self.CATALOG_FIELDS
+        if update_fields is not None:
+            wanted = set(update_fields)
+            fields = [f for f in fields if f in wanted or f.removesuffix('_id') in wanted]
+        if self._state.adding or self.pk is None:
+            return set(fields)
+        if not fields:
+            return set()
+        previous = Product.objects.filter(pk=self.pk).values(*fields).first()
+        if previous is None:
+            return set(fields)
+        # to_python : price="10.00" (str) et Decimal("10.00") sont égaux
+        return {
+            f for f in fields
+            if previous[f] != self._meta.get_field(f).to_python(getattr(self, f))
+        }
+
+    def save(self, *args, **kwargs):
+        # Nouvelle version du catalogue seulement si un champ visible change
+        # (un save() sans modification ne prend pas le verrou de CatalogVersion)
+        update_fields = kwargs.get('update_fields')
+        self._changed_catalog_fields = self.changed_catalog_fields(update_fields)
+        extra = {'updated_at'}
+        if self._changed_catalog_fields:
+            names = bool({'name', 'is_active'} & self._changed_catalog_fields)
+            self.version = CatalogVersion.bump(names=names)
+            extra.add('version')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
+
+class ProductTombstone(models.Model):
+    """
+    Trace d'un produit supprimé, pour que les clients en synchro delta
+    puissent le retirer de leur copie locale.
+    """
+    product_id = models.BigIntegerField(unique=True)
+    version = models.PositiveBigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Product tombstone"
+        verbose_name_plural = "Product tombstones"
+
+    def __str__(self):
+        return f"Produit #{self.product_id} supprimé (v{self.version})"
+
+
+class CatalogVersion(models.Model):
+    """
+    Tampon de version du catalogue (une seule ligne, pk=1).
+
+    Incrémenté à chaque création / modification / suppression d'un
+    Product ou d'une Category (voir Product.save et catalog/signals.py),
+    commandes comprises (catalog/inventory.py).
+    Sert à produire les ETag des endpoints du catalogue sans relire la
+    table des produits, et de curseur pour la synchro delta.
+
+    `names_version` n'avance que si un nom ou l'état actif change (produit
+    ou catégorie) : l'index d'autocomplétion ne se reconstruit que sur elle.
+    """
+    SINGLETON_PK = 1
+
+    version = models.PositiveBigIntegerField(default=0)
+    names_version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Catalog version"
+        verbose_name_plural = "Catalog version"
+
+    def __str__(self):
+        return f"Catalogue v{self.version}"
+
+    @classmethod
+    def bump(cls, names: bool = False) -> int:
+        """
+        Incrémente atomiquement la version (et names_version si `names`)
+        et retourne la nouvelle version.
+        """
+        changes = {'version': models.F('version') + 1, 'updated_at': timezone.now()}
+        if names:
+            changes['names_version'] = models.F('names_version') + 1
+        updated = cls.objects.filter(pk=cls.SINGLETON_PK).update(**changes)
+        if not updated:
+            cls.objects.get_or_create(pk=cls.SINGLETON_PK)
+            return cls.bump(names)
+        return cls.objects.values_list('version', flat=True).get(pk=cls.SINGLETON_PK)
+
+
+class RelatedProduct(models.Model):
+    """
+    "Souvent achetés ensemble" : les K meilleurs voisins de chaque produit,
+    précalculés à partir des OrderItem par `python manage.py compute_related_products`.
+    """
+    product = models.ForeignKey(
+        'catalog.Product',
+        on_delete=models.CASCADE,
+        related_name='related_links',
+    )
+    related = models.ForeignKey(
+        'catalog.Product',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    # nombre de commandes contenant les deux produits
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Related product"
+        verbose_name_plural = "Related products"
+        ordering = ['product', 'rank']
+        constraints = [
+            # sert aussi d'index pour /api/products/<id>/related/
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score})"
+
+
+class ProductSalesBucket(models.Model):
+    """
+    Unités vendues d'un produit sur une journée (seau quotidien).
+    Incrémenté par create_order, purgé après 30 jours par
+    `python manage.py compact_popularity` (voir catalog/popularity.py).
+    """
+    product = models.ForeignKey(
+        'catalog.Product',
+        on_delete=models.CASCADE,
+        related_name='sales_buckets',
+    )
+    day = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Product sales bucket"
+        verbose_name_plural = "Product sales buckets"
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='sales_bucket_product_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='sales_bucket_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} le {self.day} : {self.units}"
+
+
+class ProductPopularity(models.Model):
+    """
+    Meilleures ventes matérialisées : unités vendues sur 7 et 30 jours
+    glissants. Sert au tri ?ordering=popular de ProductViewSet sans
+    GROUP BY sur OrderItem.
+    """
+    product = models.OneToOneField(
+        'catalog.Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+    )
+    units_7d = models.PositiveIntegerField(default=0)
+    units_30d = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Product popularity"
+        verbose_name_plural = "Product popularity"
+        indexes = [
+            models.Index(fields=['-units_7d'], name='popularity_7d_idx'),
+            models.Index(fields=['-units_30d'], name='popularity_30d_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} : {self.units_7d} (7 j) / {self.units_30d} (30 j)"
+
+
+class ProductTrigram(models.Model):
+    """
+    Index de trigrammes des noms de produits actifs (un trigramme par ligne),
+    pour la recherche tolérante aux fautes de frappe (voir catalog/trigrams.py).
+    """
+    trigram = models.CharField(max_length=3)
+    product = models.ForeignKey(
+        'catalog.Product',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    class Meta:
+        verbose_name = "Product trigram"
+        verbose_name_plural = "Product trigrams"
+        constraints = [
+            # trigramme en tête : sert d'index pour la génération des candidats
+            models.UniqueConstraint(fields=['trigram', 'product'], name='product_trigram_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram!r} -> {self.product_id}"
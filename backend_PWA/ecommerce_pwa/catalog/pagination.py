@@ -0,0 +1,171 @@
+# catalog/pagination.py
+"""
+Pagination par curseur (keyset) pour le catalogue.
+
+Au lieu d'un OFFSET (qui oblige la base à relire toutes les lignes
+précédentes), on mémorise la dernière clé de tri renvoyée
+(ex: (name, id)) et on demande simplement les lignes "après" cette clé.
+La page N coûte donc autant que la page 1.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination opt-in : active seulement si ?limit= ou ?cursor= est présent.
+    Sans ces paramètres, la vue renvoie la liste complète (comportement
+    historique attendu par le frontend).
+
+      - GET /api/products/?limit=20
+      - GET /api/products/?limit=20&cursor=<next renvoyé par la page précédente>
+
+    Réponse paginée : {"next": <url ou null>, "results": [...]}
+    """
+
+    # Clé de tri : Meta.ordering = ['name'] + 'id' pour départager les doublons.
+    # La vue peut la remplacer (ex: ("-popularity", "name", "id")) ; un "-"
+    # indique un tri descendant.
+    ordering = ("name", "id")
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.limit_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        rows = list(self.get_page_queryset(queryset, request))
+        self.has_next = len(rows) > self.limit
+        self.page = rows[: self.limit]
+        return self.page
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Queryset (non évalué) de la page demandée : tri (`ordering`), condition
+        "après le curseur" et LIMIT. Réutilisé par le benchmark des requêtes.
+        """
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(queryset, position)
+            queryset = queryset.filter(self._after(position))
+        # On lit une ligne de plus pour savoir s'il existe une page suivante
+        return queryset[: self.get_limit(request) + 1]
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    @property
+    def ordering_fields(self):
+        """Noms des colonnes de la clé de tri, sans le "-" des tris descendants."""
+        return tuple(field.lstrip("-") for field in self.ordering)
+
+    # ------------------------------------------------------------------
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        # la page peut contenir des instances ou des dicts (.values(), FastSerializer)
+        if isinstance(last, dict):
+            position = [self._value(last[field]) for field in self.ordering_fields]
+        else:
+            position = [self._value(getattr(last, field)) for field in self.ordering_fields]
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (ValueError, TypeError):
+            raise NotFound("Curseur invalide.")
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound("Curseur invalide.")
+        return position
+
+    def clean_position(self, queryset, position):
+        """
+        Convertit les valeurs du curseur avec le champ de tri correspondant
+        (colonne du modèle ou annotation) : un curseur modifié à la main
+        donne un 404, pas une erreur de l'ORM ou de la base.
+        """
+        cleaned = []
+        for name, value in zip(self.ordering_fields, position):
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound("Curseur invalide.")
+            annotation = queryset.query.annotations.get(name)
+            try:
+                if annotation is not None:
+                    field = annotation.output_field
+                else:
+                    field = queryset.model._meta.get_field(name)
+                value = field.to_python(value)
+                # bornes des entiers de la base (IntegerField.validators)
+                field.run_validators(value)
+            except (FieldDoesNotExist, ValidationError, TypeError, ValueError, OverflowError):
+                raise NotFound("Curseur invalide.")
+            cleaned.append(value)
+        return cleaned
+
+    def _after(self, position):
+        """
+        Construit la condition "tuple après position" :
+          a >= x AND ((a > x) OR (a = x AND b > y) OR ...)
+        (< et <= pour les champs en tri descendant).
+        Le "a >= x" en tête permet à la base de démarrer un parcours
+        d'index sur (name, id) au lieu de filtrer toute la table.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        first = self.ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & condition
+
+    @staticmethod
+    def _value(value):
+        # Les valeurs doivent rester sérialisables en JSON dans le curseur
+        if isinstance(value, (str, int, float)) or value is None:
+            return value
+        return str(value)
@@ -0,0 +1,159 @@
+# catalog/popularity.py
+"""
+Meilleures ventes maintenues de façon incrémentale.
+
+  - ProductSalesBucket : unités vendues par produit et par jour
+  - ProductPopularity  : totaux glissants 7 / 30 jours par produit
+
+À chaque commande, record_sales() incrémente le seau du jour et les deux
+totaux (F() + n, dans la transaction de create_order) : aucun GROUP BY
+sur OrderItem, et un nombre de requêtes indépendant de la taille du panier.
+Le tri ?ordering=popular fait partie des réponses mises en cache : après
+commit, la version du catalogue est incrémentée (nouveaux ETag, nouvelles
+clés du cache de réponses dans tous les processus).
+
+Les totaux ne "vieillissent" pas tout seuls : compact() (lancé chaque
+jour par `python manage.py compact_popularity`) supprime les seaux de
+plus de 30 jours et recalcule les totaux depuis les seaux restants
+(au plus 30 lignes par produit vendu), sous les verrous des lignes produit.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, PositiveIntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, ProductPopularity, ProductSalesBucket
+from .signals import catalog_changed
+from .versioning import bump_catalog_version
+
+SHORT_WINDOW_DAYS = 7
+LONG_WINDOW_DAYS = 30
+
+# ?ordering=... -> colonne de ProductPopularity
+POPULAR_ORDERINGS = {
+    "popular": "units_7d",
+    "popular_30d": "units_30d",
+}
+
+
+def record_sales(quantities, day=None, publish=True):
+    """
+    quantities : {product_id: unités vendues}.
+
+    Nombre de requêtes constant quelle que soit la taille du panier
+    (voir _increment). À appeler dans la transaction de la commande,
+    lignes produit déjà verrouillées (select_for_update) : deux commandes
+    du même produit ne peuvent donc pas créer le même seau en parallèle.
+    Le classement n'est publié (nouvelle version du catalogue) qu'après
+    commit : une commande annulée ne change aucune réponse en cache.
+    publish=False si l'appelant publie déjà une nouvelle version après ce
+    même commit (create_order, via decrement_stock).
+    """
+    quantities = {pk: units for pk, units in quantities.items() if units > 0}
+    if not quantities:
+        return
+    day = day or timezone.localdate()
+    _increment(
+        ProductSalesBucket.objects.filter(day=day),
+        quantities,
+        ["units"],
+        lambda pk, units: ProductSalesBucket(product_id=pk, day=day, units=units),
+    )
+    _increment(
+        ProductPopularity.objects.all(),
+        quantities,
+        ["units_7d", "units_30d"],
+        lambda pk, units: ProductPopularity(product_id=pk, units_7d=units, units_30d=units),
+        updated_at=timezone.now(),
+    )
+    if publish:
+        transaction.on_commit(publish_sales)
+
+
+def publish_sales() -> None:
+    """Après commit : le tri ?ordering=popular a changé."""
+    bump_catalog_version()
+    catalog_changed()
+
+
+def _increment(queryset, quantities, fields, build, **extra):
+    """
+    Ajoute quantities[product_id] aux `fields` des lignes existantes
+    (un seul UPDATE ... CASE), puis crée les lignes manquantes (bulk_create).
+    """
+    existing = set(queryset.filter(product_id__in=quantities).values_list("product_id", flat=True))
+    if existing:
+        delta = Case(
+            *[When(product_id=pk, then=Value(quantities[pk])) for pk in existing],
+            output_field=PositiveIntegerField(),
+        )
+        queryset.filter(product_id__in=existing).update(
+            **{field: F(field) + delta for field in fields},
+            **extra,
+        )
+    missing = [build(pk, units) for pk, units in quantities.items() if pk not in existing]
+    if missing:
+        queryset.model.objects.bulk_create(missing)
+
+
+def compact(today=None):
+    """
+    Expire les seaux sortis de la fenêtre de 30 jours et recalcule les
+    totaux 7 / 30 jours. Retourne (seaux supprimés, produits classés).
+    """
+    today = today or timezone.localdate()
+    long_start = today - timedelta(days=LONG_WINDOW_DAYS - 1)
+    short_start = today - timedelta(days=SHORT_WINDOW_DAYS - 1)
+
+    with transaction.atomic():
+        # Verrouille les produits classés ou vendus, par pk croissant comme
+        # lock_products() : une commande en cours (qui tient déjà ces verrous)
+        # est attendue, une nouvelle attend la fin de la compaction. Aucun
+        # record_sales() ne s'intercale entre la lecture des seaux et
+        # l'écriture des totaux.
+        list(
+            Product.objects.select_for_update()
+            .filter(
+                Q(pk__in=ProductPopularity.objects.values("product_id"))
+                | Q(pk__in=ProductSalesBucket.objects.values("product_id"))
+            )
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        expired, _ = ProductSalesBucket.objects.filter(day__lt=long_start).delete()
+
+        totals = (
+            ProductSalesBucket.objects.filter(day__lte=today)
+            .values("product_id")
+            .annotate(
+                units_30d=Sum("units"),
+                units_7d=Coalesce(Sum("units", filter=Q(day__gte=short_start)), 0),
+            )
+        )
+        rows = [
+            ProductPopularity(product_id=row["product_id"], units_7d=row["units_7d"], units_30d=row["units_30d"])
+            for row in totals
+        ]
+        # produits sans aucune vente sur 30 jours : sortis du classement
+        ProductPopularity.objects.filter(
+            ~Exists(ProductSalesBucket.objects.filter(product_id=OuterRef("product_id")))
+        ).delete()
+        ProductPopularity.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["units_7d", "units_30d", "updated_at"],
+        )
+    return expired, len(rows)
+
+
+def annotate_popularity(queryset, ordering):
+    """
+    Ajoute la colonne `units_sold` (unités vendues sur la fenêtre demandée,
+    0 si jamais vendu) pour le tri ?ordering=popular / popular_30d.
+    """
+    column = POPULAR_ORDERINGS[ordering]
+    return queryset.annotate(units_sold=Coalesce(F(f"popularity__{column}"), 0))
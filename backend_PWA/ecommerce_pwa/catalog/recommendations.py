@@ -0,0 +1,113 @@
+# catalog/recommendations.py
+"""
+"Souvent achetés ensemble" : co-occurrence des produits dans les commandes.
+
+Calcul hors-ligne (`python manage.py compute_related_products`) :
+  1. on lit les couples (commande, produit) distincts de OrderItem
+  2. NumPy génère toutes les paires (a, b), a != b, à l'intérieur de
+     chaque commande, sans boucle Python (matrice de co-occurrence creuse
+     codée en clés a * n + b, comptées avec np.unique)
+  3. on garde les K meilleurs voisins de chaque produit dans RelatedProduct
+
+À la requête, /api/products/<id>/related/ n'est qu'une lecture indexée
+de RelatedProduct (product_id, rank).
+
+NumPy n'est nécessaire que pour ce calcul hors-ligne : il est importé
+dans compute_cooccurrence(), pas au chargement du module.
+"""
+from django.db import transaction
+
+from orders.models import OrderItem
+
+from .models import RelatedProduct
+from .versioning import bump_catalog_version
+
+
+def compute_cooccurrence(order_ids, product_ids, top_k=10, max_order_size=50):
+    """
+    order_ids / product_ids : tableaux alignés de couples (commande, produit)
+    distincts, triés par commande.
+
+    Retourne trois tableaux alignés (produit, voisin, score), limités aux
+    `top_k` meilleurs voisins par produit, triés par produit puis score
+    décroissant. Les commandes de plus de `max_order_size` produits sont
+    ignorées (paires en O(n²), peu informatives).
+    """
+    import numpy as np
+
+    orders = np.asarray(order_ids, dtype=np.int64)
+    products = np.asarray(product_ids, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    if orders.size == 0:
+        return empty, empty, empty
+
+    # bornes de chaque commande dans les tableaux triés
+    _, starts, sizes = np.unique(orders, return_index=True, return_counts=True)
+    keep = (sizes > 1) & (sizes <= max_order_size)
+    starts, sizes = starts[keep], sizes[keep]
+    if starts.size == 0:
+        return empty, empty, empty
+
+    # positions des lignes retenues, avec le début et la taille de leur commande
+    item_starts = np.repeat(starts, sizes)
+    item_sizes = np.repeat(sizes, sizes)
+    positions = item_starts + _offsets(sizes)
+
+    # chaque ligne d'une commande de taille s est couplée aux s lignes de la commande
+    left = np.repeat(positions, item_sizes)
+    right = np.repeat(item_starts, item_sizes) + _offsets(item_sizes)
+    distinct = left != right
+    a, b = products[left[distinct]], products[right[distinct]]
+
+    # matrice creuse : clé a * n + b, comptée une fois par commande
+    n = int(products.max()) + 1
+    keys, counts = np.unique(a * n + b, return_counts=True)
+    a, b = keys // n, keys % n
+
+    # top-K par produit : tri (produit, -score, voisin) puis rang dans le groupe
+    order = np.lexsort((b, -counts, a))
+    a, b, counts = a[order], b[order], counts[order]
+    group_starts = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+    rank = _offsets(np.diff(np.r_[group_starts, a.size]))
+    top = rank < top_k
+    return a[top], b[top], counts[top]
+
+
+def _offsets(sizes):
+    """[2, 3] -> [0, 1, 0, 1, 2] : position de chaque élément dans son bloc."""
+    import numpy as np
+
+    total = int(sizes.sum())
+    return np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+
+def rebuild_related_products(top_k=10, max_order_size=50) -> int:
+    """Recalcule entièrement RelatedProduct. Retourne le nombre de liens écrits."""
+    pairs = (
+        OrderItem.objects.values_list("order_id", "product_id")
+        .order_by("order_id", "product_id")
+        .distinct()
+    )
+    order_ids, product_ids = [], []
+    for order_id, product_id in pairs.iterator(chunk_size=10_000):
+        order_ids.append(order_id)
+        product_ids.append(product_id)
+
+    products, neighbours, scores = compute_cooccurrence(
+        order_ids, product_ids, top_k=top_k, max_order_size=max_order_size
+    )
+
+    links = []
+    previous, rank = None, 0
+    for product_id, related_id, score in zip(products.tolist(), neighbours.tolist(), scores.tolist()):
+        rank = rank + 1 if product_id == previous else 0
+        previous = product_id
+        links.append(RelatedProduct(product_id=product_id, related_id=related_id, score=score, rank=rank))
+
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(links, batch_size=5000)
+        # les réponses /related/ en cache dépendent de la version du catalogue :
+        # la nouvelle version change leurs clés dans TOUS les processus
+        bump_catalog_version()
+    return len(links)
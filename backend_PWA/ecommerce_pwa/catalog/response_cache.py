@@ -0,0 +1,115 @@
+# catalog/response_cache.py
+"""
+Cache des réponses JSON déjà rendues du catalogue (liste + détail).
+
+On garde en mémoire (par processus) les octets JSON produits par
+ProductSerializer, indexés par URL complète + version du catalogue.
+Une page "chaude" est donc resservie sans ORM ni sérialisation.
+
+  - borne configurable (nombre d'entrées et taille totale), éviction LRU
+  - invalidé à chaque écriture Product/Category (signaux + version dans la clé)
+  - compteurs hits / misses / evictions consultables via stats()
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .versioning import get_catalog_version
+
+
+class LRUResponseCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[bytes, str, dict]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, content: bytes, content_type: str, headers: dict | None = None) -> None:
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (content, content_type, headers or {})
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+response_cache = LRUResponseCache(
+    max_entries=getattr(settings, "CATALOG_RESPONSE_CACHE_MAX_ENTRIES", 512),
+    max_bytes=getattr(settings, "CATALOG_RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+)
+
+
+# en-têtes qui font partie de la représentation (rejoués avec le contenu)
+CACHED_HEADERS = ("X-Search-Max-Results", "X-Search-Truncated")
+
+
+class ResponseCacheMixin:
+    """
+    Mixin pour les ViewSets du catalogue : sert les GET depuis response_cache.
+    Ajoute l'en-tête X-Cache: HIT / MISS.
+
+    À placer APRÈS ConditionalGetMixin, qui fournit self.catalog_version
+    (évite de relire la version une deuxième fois).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        version = getattr(self, "catalog_version", None) or get_catalog_version()
+        key = f"v{version.version}:{request.get_full_path()}"
+
+        cached = response_cache.get(key)
+        if cached is not None:
+            content, content_type, headers = cached
+            response = HttpResponse(content, content_type=content_type, headers=headers)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, "render"):
+                response.render()
+            response_cache.set(key, response.content, response["Content-Type"], {
+                name: value for name, value in response.items() if name in CACHED_HEADERS
+            })
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,132 @@
+# catalog/search.py
+"""
+Index de recherche plein texte des produits (SQLite FTS5).
+
+La table virtuelle `catalog_product_fts` contient une ligne par produit
+actif (rowid = id du produit) avec son nom et sa description.
+Elle est créée par la migration 0002 et maintenue à jour par les signaux
+de catalog/signals.py.
+
+Si la base n'est pas SQLite (ou si FTS5 n'est pas compilé), la recherche
+retombe sur un simple `icontains` sur le nom et la description.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+FTS_TABLE = "catalog_product_fts"
+
+# Poids bm25 : un mot trouvé dans le nom compte plus que dans la description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_available() -> bool:
+    """Vrai si l'index FTS5 existe sur la base courante."""
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def build_match_query(text: str) -> str | None:
+    """
+    Transforme la saisie utilisateur en requête MATCH FTS5.
+
+    "rtx 30" -> '"rtx"* AND "30"*'  (tous les mots, en préfixe)
+    Les guillemets protègent contre la syntaxe FTS5 (NEAR, OR, -, ...).
+    """
+    words = _WORD_RE.findall(text or "")
+    if not words:
+        return None
+    return " AND ".join(f'"{word}"*' for word in words)
+
+
+def max_results() -> int:
+    """
+    Nombre maximum de résultats d'une recherche (CATALOG_SEARCH_MAX_RESULTS,
+    défaut 200) : le classement par pertinence passe par une liste d'ids.
+    Les réponses tronquées le signalent (en-têtes X-Search-*, voir
+    ProductViewSet.list).
+    """
+    return getattr(settings, "CATALOG_SEARCH_MAX_RESULTS", 200)
+
+
+def search_product_ids(text: str, limit: int | None = None) -> list[int]:
+    """
+    Retourne les ids des produits correspondant à `text`,
+    du plus pertinent au moins pertinent.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    if limit is None:
+        limit = max_results()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, %s, %s) LIMIT %s",
+            [match, NAME_WEIGHT, DESCRIPTION_WEIGHT, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_product(product) -> None:
+    """Ajoute / met à jour un produit dans l'index (ou le retire s'il est inactif)."""
+    if not product.is_active:
+        remove_product(product.pk)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+            [product.pk, product.name, product.description or ""],
+        )
+
+
+def index_products(products) -> None:
+    """Version groupée de index_product (imports en masse : pas de signaux)."""
+    products = list(products)
+    if not products:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [[product.pk] for product in products],
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+            [
+                [product.pk, product.name, product.description or ""]
+                for product in products
+                if product.is_active
+            ],
+        )
+
+
+def remove_product(product_id: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+
+def rebuild_index() -> int:
+    """Vide puis reconstruit entièrement l'index. Retourne le nombre de produits indexés."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+            f"SELECT id, name, description FROM catalog_product WHERE is_active"
+        )
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        count = cursor.fetchone()[0]
+        # fusionne les segments FTS5 pour garder des requêtes rapides
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
@@ -3,6 +3,31 @@
 from rest_framework import serializers
 from .models import Category, Product
 
+
+class SparseFieldsetMixin:
+    """
+    Permet de restreindre les champs sérialisés :
+      ProductSerializer(qs, many=True, fields=['id', 'name'])
+      ProductSerializer(qs, many=True, omit=['description'])
+
+    Utilisé par ProductViewSet pour ?fields= / ?omit=.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+    def get_orm_paths(self):
+        """Chemins ORM des champs restants (pour .only()), ex: 'category.name' -> 'category__name'."""
+        return [field.source.replace('.', '__') for field in self.fields.values()]
+
 class CategorySerializer(serializers.ModelSerializer):
     """
     Serializer read-only pour les catégories.
@@ -18,13 +43,15 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer read-only pour les produits.
 
     Rôle :
       - Envoyer la liste des produits / détails au frontend.
       - Empêcher toute création ou modification de produit depuis React.
+
+    Accepte fields= / omit= (voir SparseFieldsetMixin).
     """
 
     # Option : exposer le nom de la catégorie directement (plus pratique côté UI)
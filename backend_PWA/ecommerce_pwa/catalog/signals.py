@@ -0,0 +1,69 @@
+# catalog/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search, trigrams
+from .autocomplete import autocomplete_index
+from .models import Category, Product, ProductTombstone
+from .response_cache import response_cache
+from .stock_cache import stock_cache
+from .versioning import bump_catalog_version
+
+
+def catalog_changed():
+    # les anciennes entrées ne seraient plus jamais lues (version dans la clé) :
+    # on libère tout de suite la mémoire de ce processus
+    response_cache.clear()
+    # l'index d'autocomplétion relira la version au prochain appel
+    autocomplete_index.invalidate()
+
+
+@receiver(post_save, sender=Product)
+def product_post_save(sender, instance: Product, update_fields=None, **kwargs):
+    """
+    Garde les index de recherche synchronisés avec le produit
+    (un produit désactivé en est retiré).
+    La version du catalogue est déjà incrémentée par Product.save(),
+    seulement si un champ du catalogue a changé.
+    """
+    changed = getattr(instance, "_changed_catalog_fields", None)
+    if changed is None:
+        changed = set(Product.CATALOG_FIELDS)
+    if search.is_available() and {"name", "description", "is_active"} & changed:
+        search.index_product(instance)
+    # trigrammes : seulement si le nom ou l'état actif a changé
+    if {"name", "is_active"} & changed:
+        trigrams.index_product(instance)
+    # stock "live" à jour tout de suite (admin, create_order)
+    stock_cache.set(instance.pk, instance.stock if instance.is_active else None)
+    if changed:
+        catalog_changed()
+
+
+@receiver(post_delete, sender=Product)
+def product_post_delete(sender, instance: Product, **kwargs):
+    if search.is_available():
+        search.remove_product(instance.pk)
+    stock_cache.set(instance.pk, None)
+    # tombstone pour la synchro delta (/api/products/changes/)
+    ProductTombstone.objects.update_or_create(
+        product_id=instance.pk,
+        defaults={"version": bump_catalog_version(names=True)},
+    )
+    catalog_changed()
+
+
+@receiver(post_save, sender=Category)
+def category_post_save(sender, instance: Category, **kwargs):
+    # le nom de catégorie est exposé dans chaque produit (category_name) :
+    # ses produits doivent repartir dans la prochaine synchro delta
+    version = bump_catalog_version(names=True)
+    Product.objects.filter(category=instance).update(version=version)
+    catalog_changed()
+
+
+@receiver(post_delete, sender=Category)
+def category_post_delete(sender, instance: Category, **kwargs):
+    # les produits de la catégorie ont déjà leur tombstone (suppression en cascade)
+    bump_catalog_version(names=True)
+    catalog_changed()
@@ -0,0 +1,147 @@
+# catalog/snapshot.py
+"""
+Snapshot statique du catalogue complet (catégories + produits actifs).
+
+`python manage.py build_catalog_snapshot` écrit :
+  - catalog-<hash>.json      (contenu adressé par hash -> fichier immuable)
+  - catalog-<hash>.json.gz   (pré-compressé gzip)
+  - catalog-<hash>.json.br   (pré-compressé brotli, si le module `brotli` est installé)
+  - current.json             (pointeur vers le dernier snapshot + sa version)
+
+Le service worker peut pré-cacher ce fichier à l'installation, puis
+rattraper les changements via /api/products/changes/?since=<version>.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import Category, Product
+from .serializers import CategorySerializer, ProductSerializer
+from .versioning import get_catalog_version
+
+try:
+    import brotli
+except ImportError:  # dépendance optionnelle
+    brotli = None
+
+POINTER_FILE = "current.json"
+SNAPSHOT_NAME_RE = re.compile(r"^catalog-[0-9a-f]{16}\.json$")
+
+
+def get_snapshot_dir() -> Path:
+    return Path(getattr(settings, "CATALOG_SNAPSHOT_DIR", settings.BASE_DIR / "snapshots"))
+
+
+def render_catalog() -> tuple[bytes, int]:
+    """Retourne (JSON du catalogue, version du catalogue au moment du rendu)."""
+    version = get_catalog_version().version
+    categories = Category.objects.order_by("name", "id")
+    products = (
+        Product.objects.filter(is_active=True)
+        .select_related("category")
+        .order_by("name", "id")
+    )
+    data = {
+        "version": version,
+        "categories": CategorySerializer(categories, many=True).data,
+        "products": ProductSerializer(products, many=True).data,
+    }
+    return JSONRenderer().render(data), version
+
+
+def build_snapshot(keep: int = 3) -> dict:
+    """
+    Génère un nouveau snapshot (s'il a changé), met à jour le pointeur
+    et ne conserve que les `keep` snapshots les plus récents.
+    """
+    directory = get_snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    content, version = render_catalog()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = f"catalog-{digest}.json"
+    path = directory / name
+
+    if not path.exists():
+        # le .json en dernier : s'il existe, les variantes compressées aussi
+        _write_atomic(directory / f"{name}.gz", gzip.compress(content, compresslevel=9))
+        if brotli is not None:
+            _write_atomic(directory / f"{name}.br", brotli.compress(content))
+        _write_atomic(path, content)
+    else:
+        # catalogue inchangé : on le marque comme le plus récent pour le nettoyage
+        path.touch()
+
+    pointer = {
+        "file": name,
+        "version": version,
+        "size": len(content),
+        "created_at": timezone.now().isoformat(),
+    }
+    _write_atomic(directory / POINTER_FILE, json.dumps(pointer).encode("utf-8"))
+
+    _prune_old_snapshots(directory, keep=max(keep, 1))
+    return pointer
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """
+    Écrit dans un fichier temporaire du même dossier puis le renomme
+    (os.replace est atomique) : un lecteur concurrent voit l'ancien
+    fichier ou le nouveau, jamais un fichier tronqué.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(tmp, 0o644)  # mkstemp crée en 0600 : fichiers servis tels quels
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _prune_old_snapshots(directory: Path, keep: int) -> None:
+    snapshots = sorted(
+        (p for p in directory.iterdir() if SNAPSHOT_NAME_RE.match(p.name)),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in snapshots[keep:]:
+        for suffix in ("", ".gz", ".br"):
+            Path(f"{old}{suffix}").unlink(missing_ok=True)
+
+
+def current_snapshot() -> dict | None:
+    """Lit le pointeur current.json (None si aucun snapshot n'a été généré)."""
+    try:
+        return json.loads((get_snapshot_dir() / POINTER_FILE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def snapshot_file(name: str, accept_encoding: str) -> tuple[Path, str | None] | None:
+    """
+    Choisit la meilleure variante pré-compressée acceptée par le client.
+    Retourne (chemin, Content-Encoding) ou None si le snapshot n'existe pas.
+    """
+    if not SNAPSHOT_NAME_RE.match(name):
+        return None
+    path = get_snapshot_dir() / name
+    if not path.exists():
+        return None
+
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        variant = Path(f"{path}{suffix}")
+        if encoding in accepted and variant.exists():
+            return variant, encoding
+    return path, None
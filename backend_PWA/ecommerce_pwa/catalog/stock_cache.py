@@ -0,0 +1,71 @@
+# catalog/stock_cache.py
+"""
+Cache mémoire (par processus) du stock des produits : {product_id: stock}.
+
+Sert /api/products/stock/?ids=... que la page panier interroge en boucle.
+  - mis à jour directement quand un produit est enregistré (admin,
+    create_order, ...) via les signaux de catalog/signals.py
+  - chaque entrée expire après CATALOG_STOCK_CACHE_TTL secondes (défaut 5s) :
+    les autres processus finissent toujours par voir le bon stock
+  - les entrées manquantes / expirées sont rechargées en UNE requête pk__in
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Product
+
+# Valeur mise en cache pour un produit inexistant ou désactivé
+UNAVAILABLE = None
+
+
+class StockCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[int, tuple[int | None, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, ids: list[int]) -> dict[int, int | None]:
+        """Retourne {id: stock} (None = inexistant ou désactivé)."""
+        now = time.monotonic()
+        result = {}
+        stale = []
+        with self._lock:
+            for pk in ids:
+                entry = self._entries.get(pk)
+                if entry is not None and entry[1] > now:
+                    result[pk] = entry[0]
+                else:
+                    stale.append(pk)
+
+        if stale:
+            loaded = dict.fromkeys(stale, UNAVAILABLE)
+            rows = Product.objects.filter(pk__in=stale, is_active=True).values_list("pk", "stock")
+            loaded.update(rows)
+            self.set_many(loaded)
+            result.update(loaded)
+        return result
+
+    def set(self, pk: int, stock: int | None) -> None:
+        self.set_many({pk: stock})
+
+    def set_many(self, stocks: dict[int, int | None]) -> None:
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if len(self._entries) + len(stocks) > self.max_entries:
+                self._entries.clear()
+            for pk, stock in stocks.items():
+                self._entries[pk] = (stock, expires)
+
+    def invalidate(self, ids) -> None:
+        with self._lock:
+            for pk in ids:
+                self._entries.pop(pk, None)
+
+
+stock_cache = StockCache(
+    ttl=getattr(settings, "CATALOG_STOCK_CACHE_TTL", 5),
+    max_entries=getattr(settings, "CATALOG_STOCK_CACHE_MAX_ENTRIES", 50_000),
+)
@@ -1,3 +1,729 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ecommerce_pwa.fast_serializers import FastSerializer
+from ecommerce_pwa.streaming import iter_json_array
+from orders.models import Order, OrderItem
+
+from . import search as product_search
+from . import trigrams
+from .autocomplete import AutocompleteIndex, PrefixIndex
+from .importer import ProductImporter, read_rows
+from .models import CatalogVersion, Category, Product
+from .pagination import KeysetPagination
+from .popularity import record_sales
+from .recommendations import compute_cooccurrence, rebuild_related_products
+from .response_cache import LRUResponseCache, response_cache
+from .serializers import ProductSerializer
+from .stock_cache import StockCache
+from .versioning import bump_catalog_version
+from .views import ProductViewSet
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.shoes = Category.objects.create(name="Chaussures")
+        self.bags = Category.objects.create(name="Sacs")
+
+    def product(self, name, price="10.00", stock=5, category=None, **kwargs):
+        return Product.objects.create(
+            name=name, price=price, stock=stock, category=category or self.shoes, **kwargs
+        )
+
+    def names(self, response):
+        data = response.data
+        return [item["name"] for item in (data["results"] if isinstance(data, dict) else data)]
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    def walk(self, url):
+        """Suit les liens `next` ; retourne les noms page par page."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(self.names(response))
+            url = response.data["next"]
+        return pages
+
+    def test_without_limit_returns_full_list(self):
+        for name in ("b", "a", "c"):
+            self.product(name)
+
+        response = self.client.get("/api/products/")
+
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(self.names(response), ["a", "b", "c"])
+
+    def test_cursor_pages_follow_name_order(self):
+        # noms en double : départagés par id
+        for name in ("Sac", "Basket", "Sac", "Tong", "Basket", "Sandale", "Sac"):
+            self.product(name)
+        self.product("Inactif", is_active=False)
+
+        pages = self.walk("/api/products/?limit=3")
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(
+            sum(pages, []),
+            ["Basket", "Basket", "Sac", "Sac", "Sac", "Sandale", "Tong"],
+        )
+
+    def test_pages_keep_filters(self):
+        for index in range(5):
+            self.product(f"Chaussure {index}")
+            self.product(f"Sac {index}", category=self.bags)
+
+        pages = self.walk(f"/api/products/?limit=2&category={self.bags.pk}")
+
+        self.assertEqual(sum(pages, []), [f"Sac {index}" for index in range(5)])
+
+    def test_limit_is_capped(self):
+        for index in range(120):
+            self.product(f"P{index:03}")
+        response = self.client.get("/api/products/?limit=1000")
+        self.assertEqual(len(response.data["results"]), 100)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get("/api/products/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_is_404(self):
+        self.product("Basket")
+        pagination = KeysetPagination()
+        positions = [["a", "x"], ["a", {"k": 1}], [None, None], ["a", 10**30], ["a"], "a"]
+        for position in positions:
+            with self.subTest(position=position):
+                cursor = pagination.encode_cursor(position)
+                response = self.client.get(f"/api/products/?limit=2&cursor={cursor}")
+                self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_on_popular_ordering_is_404(self):
+        cursor = KeysetPagination().encode_cursor(["beaucoup", "a", 1])
+        response = self.client.get(f"/api/products/?ordering=popular&limit=2&cursor={cursor}")
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductFilterTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product("Basket", price="49.90", stock=0)
+        self.product("Sandale", price="20.00")
+        self.product("Sac", price="99.00", category=self.bags)
+
+    def get(self, query):
+        return self.client.get(f"/api/products/?{query}")
+
+    def test_filters(self):
+        self.assertEqual(self.names(self.get("min_price=20&max_price=50")), ["Basket", "Sandale"])
+        self.assertEqual(self.names(self.get("in_stock=1")), ["Sac", "Sandale"])
+        self.assertEqual(
+            self.names(self.get(f"category={self.shoes.pk},{self.bags.pk}&max_price=49.90")),
+            ["Basket", "Sandale"],
+        )
+        self.assertEqual(self.names(self.get(f"category={self.shoes.pk}&in_stock=0")), ["Basket"])
+
+    def test_invalid_values_are_400(self):
+        cases = {
+            "min_price": ["abc", "NaN", "sNaN", "Infinity", "-inf"],
+            "max_price": ["1,5", "Infinity"],
+            "category": ["chaussures", "2,x", "99999999999999999999", "0"],
+            "in_stock": ["peut-etre"],
+        }
+        for name, values in cases.items():
+            for value in values:
+                with self.subTest(name=name, value=value):
+                    response = self.get(f"{name}={value}")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(name, response.data)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    url = "/api/products/"
+
+    def setUp(self):
+        super().setUp()
+        self.basket = self.product("Basket")
+
+    def test_matching_etag_is_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Cache-Control"], "no-cache")
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(again.content, b"")
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(f"{self.url}?category={self.shoes.pk}", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_catalog_change_invalidates_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.basket.price = "12.00"
+        self.basket.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data[0]["price"], "12.00")
+
+    def test_stock_change_invalidates_etag_and_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+        self.basket.stock = 1
+        self.basket.save(update_fields=["stock"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data[0]["stock"], 1)
+
+    def test_unchanged_save_keeps_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.basket.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class DeltaSyncTests(CatalogTestCase):
+    def changes(self, since):
+        response = self.client.get(f"/api/products/changes/?since={since}")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_only_changed_products_are_synced(self):
+        basket = self.product("Basket")
+        sac = self.product("Sac")
+        tong = self.product("Tong")
+        full = self.changes(0)
+        self.assertEqual([item["name"] for item in full["updated"]], ["Basket", "Sac", "Tong"])
+
+        sac.save()  # rien de modifié
+        self.assertEqual(self.changes(full["version"])["updated"], [])
+
+        basket.name = "Basket montante"
+        basket.save(update_fields=["name"])
+        tong.stock = 0
+        tong.save(update_fields=["stock"])
+        sac_pk = sac.pk
+        sac.delete()
+        delta = self.changes(full["version"])
+        self.assertEqual(
+            [(item["name"], item["stock"]) for item in delta["updated"]],
+            [("Basket montante", 5), ("Tong", 0)],
+        )
+        self.assertEqual(delta["deleted"], [sac_pk])
+        self.assertGreater(delta["version"], full["version"])
+
+
+class BatchLookupTests(CatalogTestCase):
+    def test_batch_keeps_requested_order(self):
+        basket = self.product("Basket")
+        sac = self.product("Sac", is_active=False)
+
+        response = self.client.get(f"/api/products/batch/?ids={basket.pk},999,{sac.pk},{basket.pk}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [basket.pk])
+        self.assertEqual(response.data["missing"], [999])
+        self.assertEqual(response.data["inactive"], [sac.pk])
+
+    def test_invalid_ids_are_400(self):
+        for url in ("/api/products/batch/", "/api/products/stock/"):
+            for ids in ("1,x", "99999999999999999999", "-3", ",".join(str(pk) for pk in range(1, 102))):
+                with self.subTest(url=url, ids=ids):
+                    response = self.client.get(f"{url}?ids={ids}")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("ids", response.data)
+
+
+class ProductImportTests(CatalogTestCase):
+    def feed(self, content: bytes, suffix: str) -> str:
+        handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        with handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def run_import(self, path, fmt, **kwargs):
+        importer = ProductImporter(**kwargs)
+        report = importer.run(read_rows(path, fmt))
+        return importer, report
+
+    def test_invalid_records_are_skipped_and_reported(self):
+        lines = [
+            json.dumps({"sku": "A1", "name": "Basket", "price": "49.90", "category": "Chaussures"}),
+            "{pas du json",
+            json.dumps(["une", "liste"]),
+            "42",
+            json.dumps({"sku": "A2", "name": "Sac", "price": "zz", "category": "Sacs"}),
+            json.dumps({"sku": "A3", "name": "Tong", "price": "NaN", "category": "Sacs"}),
+            json.dumps({"sku": 7, "name": "Sandale", "price": 20, "category": "Chaussures"}),
+        ]
+        content = "\n".join(lines).encode() + b"\n\xff\xfe\n"
+        path = self.feed(content, ".jsonl")
+
+        importer, report = self.run_import(path, "jsonl")
+
+        self.assertEqual(set(Product.objects.values_list("sku", flat=True)), {"A1", "7"})
+        self.assertEqual((report["created"], report["errors"]), (2, 6))
+        self.assertEqual(
+            [error.split(":")[0] for error in importer.errors],
+            ["ligne 2", "ligne 3", "ligne 4", "ligne 5", "ligne 6", "ligne 8"],
+        )
+
+    def test_csv_with_undecodable_line(self):
+        content = (
+            b"sku,name,price,category\n"
+            b"C1,Basket,10.00,Chaussures\n"
+            b"C2,Caf\xe9,3.00,Chaussures\n"
+            b"C3,Sac,15.00,Sacs\n"
+        )
+        importer, report = self.run_import(self.feed(content, ".csv"), "csv")
+
+        self.assertEqual(set(Product.objects.values_list("sku", flat=True)), {"C1", "C3"})
+        self.assertEqual(importer.errors, ["ligne 3: encodage UTF-8 invalide"])
+
+    def test_upsert_by_sku(self):
+        existing = self.product("Basket", price="10.00", stock=5, sku="S1")
+        content = (
+            b"sku,price,stock\n"
+            b"S1,12.50,\n"
+            b"S2,8.00,3\n"
+        )
+        # S2 n'a ni nom ni catégorie : création refusée
+        importer, report = self.run_import(self.feed(content, ".csv"), "csv")
+        self.assertEqual((report["created"], report["updated"]), (0, 1))
+        self.assertIn("champs requis manquants", importer.errors[0])
+
+        existing.refresh_from_db()
+        self.assertEqual((str(existing.price), existing.stock, existing.name), ("12.50", 5, "Basket"))
+
+        content = b'{"sku": "S2", "name": "Sac", "price": "8.00", "category": "Sacs"}\n'
+        _, report = self.run_import(self.feed(content, ".jsonl"), "jsonl")
+        self.assertEqual((report["created"], report["updated"]), (1, 0))
+        self.assertEqual(Product.objects.get(sku="S2").category, self.bags)
+
+    def test_chunk_boundaries(self):
+        rows = [{"sku": f"S{i}", "name": f"Produit {i}", "price": "1.00", "category": "Sacs"} for i in range(5)]
+        rows.append({"sku": "S1", "name": "Produit 1 bis"})  # paquet suivant : mise à jour
+        content = "\n".join(json.dumps(row) for row in rows).encode()
+
+        _, report = self.run_import(self.feed(content, ".jsonl"), "jsonl", chunk_size=2)
+
+        self.assertEqual((report["rows"], report["created"], report["updated"]), (6, 5, 1))
+        self.assertEqual(Product.objects.get(sku="S1").name, "Produit 1 bis")
+        # une nouvelle version par paquet : la synchro delta voit chaque produit
+        self.assertFalse(Product.objects.filter(version=0).exists())
+
+
+class PopularOrderingTests(CatalogTestCase):
+    def test_recorded_sales_refresh_cached_ranking(self):
+        pegasus, vomero = self.product("Pegasus"), self.product("Vomero")
+        url = "/api/products/?ordering=popular"
+        first = self.client.get(url)
+        self.assertEqual(self.names(first), ["Pegasus", "Vomero"])
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_sales({vomero.pk: 3, pegasus.pk: 1})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(self.names(response), ["Vomero", "Pegasus"])
+
+    def test_rolled_back_sales_publish_nothing(self):
+        pegasus = self.product("Pegasus")
+        version = CatalogVersion.objects.get().version
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    record_sales({pegasus.pk: 1})
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CatalogVersion.objects.get().version, version)
+
+
+class FastSerializerTests(CatalogTestCase):
+    def assertSameAsDrf(self, queryset, **kwargs):
+        fast = FastSerializer.for_serializer(ProductSerializer, **kwargs)
+        self.assertEqual(fast.serialize(fast.values(queryset)), ProductSerializer(queryset, many=True, **kwargs).data)
+
+    def test_products_match_drf_output(self):
+        self.product("Pegasus", price="99.9", description="Running", image_url="https://cdn.example.com/p.jpg")
+        self.product("Sac", price="0.05", stock=0, category=self.bags, is_active=False)  # image_url NULL
+        queryset = Product.objects.order_by("pk")
+
+        self.assertSameAsDrf(queryset)
+        self.assertSameAsDrf(queryset, fields=["id", "price", "category_name"])
+        self.assertSameAsDrf(queryset, omit=["description"])
+        fast = FastSerializer.for_serializer(ProductSerializer)
+        self.assertEqual([row["price"] for row in fast.serialize(fast.values(queryset))], ["99.90", "0.05"])
+
+
+class SearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        if not product_search.is_available():
+            self.skipTest("index FTS5 indisponible")
+
+    def test_name_matches_rank_before_description_matches(self):
+        self.product("Chaussettes", description="Assorties aux baskets running")
+        self.product("Running Pegasus")
+        self.product("Sac à dos")
+
+        response = self.client.get("/api/products/?search=run")
+
+        self.assertEqual(self.names(response), ["Running Pegasus", "Chaussettes"])
+        self.assertEqual(response["X-Search-Truncated"], "0")
+
+    def test_all_words_must_match(self):
+        self.product("Pegasus 40")
+        self.product("Pegasus Trail")
+        self.assertEqual(self.names(self.client.get("/api/products/?search=pegasus tra")), ["Pegasus Trail"])
+        # la syntaxe FTS5 saisie par l'utilisateur est neutralisée
+        self.assertEqual(self.client.get('/api/products/?search="NEAR(-').status_code, 200)
+
+    def test_index_follows_product_changes(self):
+        pegasus = self.product("Pegasus")
+        pegasus.name = "Vomero"
+        pegasus.save()
+        self.assertEqual(self.names(self.client.get("/api/products/?search=pegasus")), [])
+        self.assertEqual(self.names(self.client.get("/api/products/?search=vomero")), ["Vomero"])
+
+        pegasus.is_active = False
+        pegasus.save()
+        self.assertEqual(product_search.search_product_ids("vomero"), [])
+
+    @override_settings(CATALOG_SEARCH_MAX_RESULTS=2)
+    def test_results_are_capped(self):
+        for size in (38, 39, 40):
+            self.product(f"Pegasus {size}")
+
+        response = self.client.get("/api/products/?search=pegasus")
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response["X-Search-Max-Results"], "2")
+        self.assertEqual(response["X-Search-Truncated"], "1")
+
+
+class ResponseCacheTests(CatalogTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUResponseCache(max_entries=2, max_bytes=1024)
+        cache.set("a", b"1", "application/json")
+        cache.set("b", b"2", "application/json")
+        cache.get("a")  # "b" devient le plus ancien
+        cache.set("c", b"3", "application/json")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 1, "evictions": 1, "entries": 2, "bytes": 2})
+
+    def test_size_bound(self):
+        cache = LRUResponseCache(max_entries=10, max_bytes=10)
+        cache.set("a", b"x" * 4, "application/json")
+        cache.set("b", b"x" * 4, "application/json")
+        cache.set("a", b"x" * 2, "application/json")  # remplacement : l'ancienne taille est rendue
+        self.assertEqual(cache.stats()["bytes"], 6)
+
+        cache.set("c", b"x" * 6, "application/json")
+        self.assertEqual((cache.stats()["evictions"], cache.stats()["bytes"]), (1, 8))
+        self.assertIsNone(cache.get("b"))
+
+        cache.set("big", b"x" * 11, "application/json")  # plus grand que le cache : ignoré
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertIsNone(cache.get("big"))
+
+    def test_key_contains_catalog_version(self):
+        self.product("Pegasus")
+        version = CatalogVersion.objects.get().version
+        self.assertEqual(self.client.get("/api/products/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/products/")["X-Cache"], "HIT")
+        self.assertIsNotNone(response_cache.get(f"v{version}:/api/products/"))
+
+        # nouvelle version sans vider le cache (ex: autre processus) : ancienne entrée ignorée
+        bump_catalog_version()
+        self.assertEqual(self.client.get("/api/products/")["X-Cache"], "MISS")
+        self.assertIsNotNone(response_cache.get(f"v{version + 1}:/api/products/"))
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pegasus = self.product("Pegasus", description="x" * 500)
+        self.vomero = self.product("Vomero")
+
+    def test_fields_on_list_and_detail(self):
+        response = self.client.get("/api/products/?fields=id,price")
+        self.assertEqual(response.data, [
+            {"id": self.pegasus.pk, "price": "10.00"},
+            {"id": self.vomero.pk, "price": "10.00"},
+        ])
+        response = self.client.get(f"/api/products/{self.pegasus.pk}/?fields=name")
+        self.assertEqual(response.data, {"name": "Pegasus"})
+
+    def test_omit_and_batch(self):
+        response = self.client.get("/api/products/?omit=description,category_name")
+        self.assertNotIn("description", response.data[0])
+        self.assertNotIn("category_name", response.data[0])
+        self.assertIn("stock", response.data[0])
+
+        response = self.client.get(f"/api/products/batch/?ids={self.pegasus.pk}&fields=id,stock")
+        self.assertEqual(response.data["results"], [{"id": self.pegasus.pk, "stock": 5}])
+
+    def test_cursor_still_works_without_ordering_fields(self):
+        first = self.client.get("/api/products/?fields=price&limit=1")
+        self.assertEqual(first.data["results"], [{"price": "10.00"}])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+    def test_only_requested_columns_are_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/products/?fields=id,name")
+        sql = " ".join(query["sql"] for query in queries if "catalog_product" in query["sql"])
+        self.assertNotIn("description", sql)
+        self.assertNotIn("catalog_category", sql)
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get("/api/products/?fields=id,password")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.data["fields"])
+
+
+class StockCacheTests(CatalogTestCase):
+    def test_fresh_entries_skip_the_database(self):
+        pegasus, vomero = self.product("Pegasus", stock=3), self.product("Vomero", stock=0)
+        cache = StockCache(ttl=60, max_entries=100)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(cache.get_many([pegasus.pk, vomero.pk, 999]), {pegasus.pk: 3, vomero.pk: 0, 999: None})
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.get_many([pegasus.pk, 999]), {pegasus.pk: 3, 999: None})
+
+    def test_entries_expire_after_ttl(self):
+        pegasus = self.product("Pegasus", stock=3)
+        cache = StockCache(ttl=5, max_entries=100)
+        with mock.patch("catalog.stock_cache.time.monotonic", return_value=1000.0):
+            cache.get_many([pegasus.pk])
+        Product.objects.filter(pk=pegasus.pk).update(stock=1)  # sans signal (autre processus)
+
+        with mock.patch("catalog.stock_cache.time.monotonic", return_value=1004.0):
+            self.assertEqual(cache.get_many([pegasus.pk]), {pegasus.pk: 3})
+        with mock.patch("catalog.stock_cache.time.monotonic", return_value=1005.0):
+            self.assertEqual(cache.get_many([pegasus.pk]), {pegasus.pk: 1})
+
+    def test_overflow_starts_over(self):
+        cache = StockCache(ttl=60, max_entries=2)
+        cache.set_many({1: 1, 2: 2})
+        cache.set(3, 3)
+        with self.assertNumQueries(1):
+            cache.get_many([1, 3])
+
+    def test_endpoint_follows_saves(self):
+        pegasus = self.product("Pegasus", stock=3)
+        sac = self.product("Sac", stock=2)
+        url = f"/api/products/stock/?ids={pegasus.pk},{sac.pk}"
+        self.assertEqual(self.client.get(url).data, {"stock": {str(pegasus.pk): 3, str(sac.pk): 2}, "missing": []})
+
+        pegasus.stock = 0
+        pegasus.save()
+        sac.is_active = False
+        sac.save()
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {"stock": {str(pegasus.pk): 0}, "missing": [sac.pk]})
+
+
+class StreamingTests(CatalogTestCase):
+    def streamed(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["X-Cache"], "MISS")  # jamais mis en cache
+        return b"".join(response.streaming_content)
+
+    def test_stream_matches_regular_list(self):
+        for index in range(5):
+            self.product(f"Produit {index}", price=f"{index}.5", description="Très \"bon\"")
+        self.product("Inactif", is_active=False)
+
+        for query in ("", "&fields=id,price", "&omit=description&category=%d" % self.shoes.pk):
+            regular = self.client.get(f"/api/products/?{query.lstrip('&')}")
+            self.assertEqual(self.streamed(f"/api/products/?stream=1{query}"), regular.content)
+
+    def test_chunks_are_joined_into_one_array(self):
+        for index in range(5):
+            self.product(f"Produit {index}")
+        queryset = Product.objects.order_by("pk")
+        expected = JSONRenderer().render(ProductSerializer(queryset, many=True).data)
+
+        for chunk_size in (1, 2, 5, 10):
+            self.assertEqual(b"".join(iter_json_array(queryset, ProductSerializer, chunk_size)), expected)
+        self.assertEqual(b"".join(iter_json_array(Product.objects.none(), ProductSerializer)), b"[]")
+
+
+class RelatedProductTests(CatalogTestCase):
+    def test_cooccurrence_counts_pairs_once_per_order(self):
+        # commande 1 : 1, 2, 3 / commande 2 : 1, 2 / commande 3 : 1 seul / commande 4 : trop grande
+        order_ids = [1, 1, 1, 2, 2, 3, 4, 4, 4, 4]
+        product_ids = [1, 2, 3, 1, 2, 1, 1, 3, 5, 6]
+
+        products, neighbours, scores = compute_cooccurrence(order_ids, product_ids, top_k=2, max_order_size=3)
+
+        self.assertEqual(
+            list(zip(products.tolist(), neighbours.tolist(), scores.tolist())),
+            [(1, 2, 2), (1, 3, 1), (2, 1, 2), (2, 3, 1), (3, 1, 1), (3, 2, 1)],
+        )
+        products, _, _ = compute_cooccurrence(order_ids, product_ids, top_k=1, max_order_size=3)
+        self.assertEqual(products.tolist(), [1, 2, 3])
+        self.assertEqual(len(compute_cooccurrence([], [])[0]), 0)
+
+    def test_related_endpoint_ranks_by_cooccurrence(self):
+        pegasus, socks, bag, cap = (self.product(name) for name in ("Pegasus", "Chaussettes", "Sac", "Casquette"))
+        user = get_user_model().objects.create_user(username="alice", password="x")
+        for basket in ([pegasus, socks, bag], [pegasus, socks], [pegasus, bag, cap], [pegasus, socks]):
+            order = Order.objects.create(user=user)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, quantity=1, unit_price=product.price) for product in basket
+            )
+        url = f"/api/products/{pegasus.pk}/related/"
+        self.assertEqual(self.names(self.client.get(url)), [])
+
+        self.assertEqual(rebuild_related_products(top_k=2), 8)
+
+        # nouvelle version du catalogue : la réponse vide en cache n'est plus servie
+        self.assertEqual(self.names(self.client.get(url)), ["Chaussettes", "Sac"])
+        # égalité de score : le plus petit id d'abord
+        self.assertEqual(self.names(self.client.get(f"/api/products/{bag.pk}/related/")), ["Pegasus", "Chaussettes"])
+        socks.is_active = False
+        socks.save()
+        self.assertEqual(self.names(self.client.get(url)), ["Sac"])
+
+
+class AutocompleteTests(CatalogTestCase):
+    def test_prefix_index(self):
+        index = PrefixIndex([(1, "Écran 27 pouces"), (2, "Nvidia RTX 4090"), (3, "Écouteurs"), (4, "RTX Cable")])
+
+        self.assertEqual(index.search("ec", 10), [(3, "Écouteurs"), (1, "Écran 27 pouces")])
+        # les noms qui commencent par le préfixe d'abord, puis les mots
+        self.assertEqual(index.search("rtx", 10), [(4, "RTX Cable"), (2, "Nvidia RTX 4090")])
+        self.assertEqual(index.search("rtx", 1), [(4, "RTX Cable")])
+        self.assertEqual(index.search("zz", 10), [])
+
+    def test_rebuilt_only_when_names_change(self):
+        pegasus = self.product("Pegasus")
+        index = AutocompleteIndex(check_interval=60)
+        self.assertEqual(index.search("peg", 5)["products"], [{"id": pegasus.pk, "name": "Pegasus"}])
+
+        with self.assertNumQueries(0):
+            index.search("peg", 5)
+
+        pegasus.price = "12.00"
+        pegasus.save()
+        index.invalidate()
+        with self.assertNumQueries(1):  # version relue, noms inchangés : pas de reconstruction
+            index.search("peg", 5)
+
+        pegasus.name = "Vomero"
+        pegasus.save()
+        index.invalidate()
+        self.assertEqual(index.search("peg", 5)["products"], [])
+        self.assertEqual(index.search("vom", 5)["products"], [{"id": pegasus.pk, "name": "Vomero"}])
+
+    def test_endpoint_sees_writes_immediately(self):
+        self.product("Écran")
+        response = self.client.get("/api/catalog/autocomplete/?q=ECR")
+        self.assertEqual([item["name"] for item in response.data["products"]], ["Écran"])
+        self.assertEqual(response.data["categories"], [])
+
+        self.product("Écrou", category=self.bags)
+        self.bags.name = "Écrins"
+        self.bags.save()
+        response = self.client.get("/api/catalog/autocomplete/?q=ecr")
+        self.assertEqual([item["name"] for item in response.data["products"]], ["Écran", "Écrou"])
+        self.assertEqual([item["name"] for item in response.data["categories"]], ["Écrins"])
+
+
+class TypoFallbackTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nike = self.product("Nike Air Max")
+        self.adidas = self.product("Adidas Samba")
+        self.nikon = self.product("Nikon Coolpix")
+
+    def test_transposed_letters_find_the_product(self):
+        self.assertEqual(trigrams.transpositions("nkie"), ["knie", "nike", "nkei"])
+        # Nikon ressemble aussi à "nkie", mais moins
+        self.assertEqual(self.names(self.client.get("/api/products/?search=nkie")), ["Nike Air Max", "Nikon Coolpix"])
+
+    def test_misspelling_falls_back_to_trigrams(self):
+        self.assertEqual(self.names(self.client.get("/api/products/?search=addidas")), ["Adidas Samba"])
+        self.assertEqual(self.names(self.client.get("/api/products/?search=xyzzy")), [])
+
+    def test_exact_matches_skip_the_fallback(self):
+        self.assertIn(self.nikon.pk, trigrams.similar_product_ids("nike"))
+        self.assertEqual(self.names(self.client.get("/api/products/?search=nike")), ["Nike Air Max"])
+
+    def test_trigrams_follow_product_changes(self):
+        self.nike.name = "Puma Suede"
+        self.nike.save()
+        self.assertNotIn(self.nike.pk, trigrams.similar_product_ids("nkie"))
+        self.assertEqual(trigrams.similar_product_ids("pmua"), [self.nike.pk])
+
+        self.nike.is_active = False
+        self.nike.save()
+        self.assertEqual(trigrams.similar_product_ids("pmua"), [])
+
+
+class QueryPlanTests(CatalogTestCase):
+    """
+    Les requêtes de liste passent par les index partiels (Product.Meta.indexes) :
+    pas de parcours de table ni de tri temporaire.
+    """
+
+    def plan(self, url):
+        request = Request(APIRequestFactory().get(url))
+        view = ProductViewSet(request=request, action="list", format_kwarg=None, kwargs={})
+        return KeysetPagination().get_page_queryset(view.get_queryset(), request).explain()
+
+    def test_list_queries_use_partial_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("plans SQLite")
+        for index in range(3):
+            self.product(f"Produit {index}")
+        cursor = KeysetPagination().encode_cursor(["Produit 1", 2])
+
+        for url, index in (
+            ("/api/products/?limit=20", "product_active_name_id_idx"),
+            (f"/api/products/?limit=20&cursor={cursor}", "product_active_name_id_idx"),
+            (f"/api/products/?category={self.shoes.pk}&limit=20", "product_active_cat_name_idx"),
+            (f"/api/products/?category={self.shoes.pk}&limit=20&cursor={cursor}", "product_active_cat_name_idx"),
+        ):
+            plan = self.plan(url)
+            self.assertIn(index, plan, url)
+            self.assertNotIn("TEMP B-TREE", plan, url)
@@ -0,0 +1,155 @@
+# catalog/trigrams.py
+"""
+Recherche tolérante aux fautes de frappe ("addidas", "nkie") par trigrammes.
+
+Chaque mot du nom d'un produit actif est découpé en trigrammes, à la
+manière de pg_trgm ("nike" -> "  n", " ni", "nik", "ike", "ke ") et stocké
+dans la table ProductTrigram (trigramme, produit), maintenue par les
+signaux de catalog/signals.py et par l'import en masse.
+
+Recherche en deux temps :
+  1. candidats via l'index : produits partageant le plus de trigrammes
+     avec la saisie (GROUP BY sur les seules lignes des trigrammes de la
+     requête, au plus CATALOG_TRIGRAM_CANDIDATES produits)
+  2. classement des candidats en Python par similarité mot à mot
+     (Jaccard des trigrammes), seuil CATALOG_TRIGRAM_MIN_SIMILARITY
+
+Les inversions de deux lettres voisines ("nkie") cassent presque tous les
+trigrammes d'un mot court : la requête inclut donc aussi les trigrammes
+de ces variantes ("nike", "knie", ...), légèrement pénalisées au classement.
+
+Sert de repli à ?search= quand la recherche exacte ne trouve rien
+(voir ProductViewSet.filter_search).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .autocomplete import normalize
+from .models import Product, ProductTrigram
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Les variantes par inversion ne sont générées que pour les mots courts
+MAX_VARIANT_LENGTH = 12
+VARIANT_PENALTY = 0.9
+# Trigrammes communs minimum pour qu'un produit soit candidat
+MIN_SHARED_TRIGRAMS = 2
+
+
+def words(text: str) -> list[str]:
+    return _WORD_RE.findall(normalize(text or ""))
+
+
+def word_trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def name_trigrams(name: str) -> set[str]:
+    grams = set()
+    for word in words(name):
+        grams |= word_trigrams(word)
+    return grams
+
+
+def transpositions(word: str) -> list[str]:
+    """"nkie" -> ["knie", "nike", "nkei"] (deux lettres voisines inversées)."""
+    if len(word) > MAX_VARIANT_LENGTH:
+        return []
+    variants = []
+    for i in range(len(word) - 1):
+        if word[i] != word[i + 1]:
+            variants.append(word[:i] + word[i + 1] + word[i] + word[i + 2 :])
+    return variants
+
+
+def similarity(query_words: list[str], name: str) -> float:
+    """Moyenne, sur les mots de la saisie, de la meilleure similarité avec un mot du nom."""
+    name_grams = [word_trigrams(word) for word in words(name)]
+    if not query_words or not name_grams:
+        return 0.0
+    total = 0.0
+    for word in query_words:
+        candidates = [(word_trigrams(word), 1.0)]
+        candidates += [(word_trigrams(variant), VARIANT_PENALTY) for variant in transpositions(word)]
+        total += max(
+            weight * len(grams & other) / len(grams | other)
+            for grams, weight in candidates
+            for other in name_grams
+        )
+    return total / len(query_words)
+
+
+def similar_product_ids(text: str, limit: int | None = None) -> list[int]:
+    """Ids des produits actifs dont le nom ressemble à `text`, du plus proche au moins proche."""
+    query_words = words(text)
+    grams = set()
+    for word in query_words:
+        grams |= word_trigrams(word)
+        for variant in transpositions(word):
+            grams |= word_trigrams(variant)
+    if not grams:
+        return []
+    if limit is None:
+        limit = getattr(settings, "CATALOG_SEARCH_MAX_RESULTS", 200)
+
+    candidates = (
+        ProductTrigram.objects.filter(trigram__in=grams)
+        .values("product_id")
+        .annotate(shared=Count("id"))
+        .filter(shared__gte=MIN_SHARED_TRIGRAMS)
+        .order_by("-shared")[: getattr(settings, "CATALOG_TRIGRAM_CANDIDATES", 500)]
+    )
+    names = Product.objects.filter(
+        pk__in=[row["product_id"] for row in candidates],
+        is_active=True,
+    ).values_list("pk", "name")
+
+    threshold = getattr(settings, "CATALOG_TRIGRAM_MIN_SIMILARITY", 0.3)
+    scored = [(similarity(query_words, name), name, pk) for pk, name in names]
+    scored = sorted((item for item in scored if item[0] >= threshold), key=lambda item: (-item[0], item[1]))
+    return [pk for _, _, pk in scored[:limit]]
+
+
+def index_product(product) -> None:
+    """Recalcule les trigrammes d'un produit (aucun s'il est inactif)."""
+    index_products([product])
+
+
+def index_products(products) -> None:
+    """Version groupée de index_product (imports en masse : pas de signaux)."""
+    products = list(products)
+    if not products:
+        return
+    with transaction.atomic():
+        ProductTrigram.objects.filter(product_id__in=[product.pk for product in products]).delete()
+        ProductTrigram.objects.bulk_create(
+            (
+                ProductTrigram(trigram=gram, product_id=product.pk)
+                for product in products
+                if product.is_active
+                for gram in name_trigrams(product.name)
+            ),
+            batch_size=5000,
+        )
+
+
+def rebuild_index() -> int:
+    """Vide puis reconstruit entièrement l'index. Retourne le nombre de produits indexés."""
+    table = ProductTrigram._meta.db_table
+    rows = Product.objects.filter(is_active=True).values_list("pk", "name")
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table}")
+        batch = []
+        for pk, name in rows.iterator(chunk_size=5000):
+            batch.extend((gram, pk) for gram in name_trigrams(name))
+            count += 1
+            if len(batch) >= 50_000:
+                cursor.executemany(f"INSERT INTO {table} (trigram, product_id) VALUES (%s, %s)", batch)
+                batch = []
+        cursor.executemany(f"INSERT INTO {table} (trigram, product_id) VALUES (%s, %s)", batch)
+    return count
@@ -1,11 +1,21 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet
+from .views import (
+    CategoryViewSet,
+    ProductViewSet,
+    catalog_autocomplete,
+    catalog_snapshot,
+    catalog_snapshot_file,
+    product_stock,
+)
 
 """
 Routes API du catalogue :
   - /api/categories/
   - /api/products/
+  - /api/products/stock/    (stock "live" depuis le cache mémoire)
+  - /api/catalog/snapshot/  (snapshot statique pré-compressé)
+  - /api/catalog/autocomplete/?q=  (suggestions depuis l'index mémoire)
 """
 
 router = DefaultRouter()
@@ -13,5 +23,10 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'products', ProductViewSet, basename='product')
 
 urlpatterns = [
+    # avant le router : sinon "stock" serait pris pour un <pk> de produit
+    path('products/stock/', product_stock, name='product-stock'),
+    path('catalog/autocomplete/', catalog_autocomplete, name='catalog-autocomplete'),
+    path('catalog/snapshot/', catalog_snapshot, name='catalog-snapshot'),
+    path('catalog/snapshot/<str:name>', catalog_snapshot_file, name='catalog-snapshot-file'),
     path('', include(router.urls)),
 ]
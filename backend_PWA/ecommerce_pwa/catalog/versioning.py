@@ -0,0 +1,76 @@
+# catalog/versioning.py
+"""
+Version du catalogue + GET conditionnels (ETag / Last-Modified / 304).
+
+Le service worker (NetworkFirst) redemande /api/products/ et
+/api/categories/ à chaque navigation. Comme le catalogue change rarement,
+on répond 304 Not Modified dès que le client possède déjà la bonne version,
+en ne lisant que la ligne unique de CatalogVersion (jamais la table produit).
+"""
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+
+from .models import CatalogVersion
+
+def get_catalog_version() -> CatalogVersion:
+    version, _ = CatalogVersion.objects.get_or_create(pk=CatalogVersion.SINGLETON_PK)
+    return version
+
+
+def bump_catalog_version(names: bool = False) -> int:
+    """
+    Incrémente atomiquement la version (appelé par les signaux Product/Category).
+    names=True si des noms affichés par l'autocomplétion ont pu changer.
+    """
+    return CatalogVersion.bump(names)
+
+
+def catalog_etag(version: CatalogVersion, request) -> str:
+    """
+    ETag fort : version du catalogue + URL complète (les query params
+    changent la représentation, ex: ?category=2 ou ?limit=20).
+    """
+    digest = hashlib.md5(request.get_full_path().encode("utf-8")).hexdigest()[:16]
+    return f'"v{version.version}-{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Mixin pour les ViewSets du catalogue :
+      - ajoute ETag, Last-Modified et Cache-Control: no-cache aux réponses GET 200
+      - répond 304 si If-None-Match (ou, à défaut, If-Modified-Since) correspond,
+        avant toute requête sur les produits.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        version = self.catalog_version = get_catalog_version()
+        etag = catalog_etag(version, request)
+        last_modified = int(version.updated_at.timestamp())
+
+        if self._is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    @staticmethod
+    def _is_not_modified(request, etag, last_modified) -> bool:
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            # If-None-Match est prioritaire sur If-Modified-Since (RFC 9110)
+            etags = parse_etags(if_none_match)
+            return "*" in etags or etag in etags
+
+        if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+        return if_modified_since is not None and last_modified <= if_modified_since
@@ -8,29 +8,55 @@ exécute de la logique métier (lire DB, créer une commande, etc.)
 
 renvoie une réponse HTTP (JSON pour une API)."""
 
+from django.conf import settings
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.http import FileResponse, Http404
+from django.shortcuts import redirect
 from rest_framework import viewsets
-from .models import Category, Product
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from ecommerce_pwa.fast_serializers import FastSerializer
+from ecommerce_pwa.streaming import stream_json_response, wants_stream
+from . import search as product_search
+from . import trigrams
+from .autocomplete import autocomplete_index
+from .facets import compute_facets
+from .filters import apply_product_filters, parse_ids, parse_product_filters
+from .models import Category, Product, ProductTombstone, RelatedProduct
 from .serializers import CategorySerializer, ProductSerializer
+from .pagination import KeysetPagination
+from .popularity import POPULAR_ORDERINGS, annotate_popularity
+from .response_cache import ResponseCacheMixin
+from .snapshot import current_snapshot, snapshot_file
+from .stock_cache import stock_cache
+from .versioning import ConditionalGetMixin
 from rest_framework.permissions import AllowAny
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet en lecture seule pour les catégories.
 
     URL générées (via router) :
       - GET /api/categories/        -> liste des catégories
       - GET /api/categories/<id>/   -> détail d'une catégorie
+      - GET /api/categories/?limit=20&cursor=...  -> pagination par curseur (optionnelle)
 
     Rôle :
       - Donner au frontend les catégories disponibles pour filtrer les produits.
       - Aucune création/modification via cette API publique.
+
+    Les réponses portent un ETag / Last-Modified basé sur la version du
+    catalogue (catalog/versioning.py) : If-None-Match -> 304 sans requête SQL
+    sur les catégories.
     """
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(ConditionalGetMixin, ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet en lecture seule pour les produits.
 
@@ -38,9 +64,49 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
       - GET /api/products/          -> liste des produits actifs
       - GET /api/products/<id>/     -> détail d'un produit
 
-    Filtres possibles via query params :
-      - /api/products/?category=2   -> produits d'une catégorie
-      - /api/products/?search=rtx   -> recherche par nom
+    Filtres possibles via query params (voir catalog/filters.py) :
+      - /api/products/?category=2   -> produits d'une catégorie (ou ?category=2,5)
+      - /api/products/?min_price=10&max_price=100 -> fourchette de prix
+      - /api/products/?in_stock=1   -> produits en stock
+      - /api/products/?search=rtx   -> recherche plein texte (nom + description),
+                                       par préfixe, triée par pertinence ;
+                                       sans résultat, repli tolérant aux
+                                       fautes de frappe ("addidas", "nkie")
+
+    Tri (optionnel, par défaut par nom) :
+      - /api/products/?ordering=popular      -> meilleures ventes sur 7 jours
+      - /api/products/?ordering=popular_30d  -> meilleures ventes sur 30 jours
+        (table matérialisée, voir catalog/popularity.py)
+
+    Lot de produits (réhydratation du panier, une seule requête) :
+      - /api/products/batch/?ids=1,5,9      -> produits dans l'ordre demandé
+
+    Recommandations ("souvent achetés ensemble", voir catalog/recommendations.py) :
+      - /api/products/<id>/related/         -> produits les plus co-achetés
+
+    Synchro delta (PWA hors-ligne) :
+      - /api/products/changes/?since=<version> -> produits modifiés / supprimés
+        depuis la version donnée
+
+    Champs partiels (moins de JSON et moins de colonnes lues en SQL) :
+      - /api/products/?fields=id,name,price,image_url,stock
+      - /api/products/?omit=description
+
+    Export en streaming (mémoire constante, pour les gros volumes) :
+      - /api/products/?stream=1     -> tableau JSON émis par paquets
+
+    Facettes (optionnelles) :
+      - /api/products/?facets=1     -> {"results": [...], "facets": {...}}
+        avec le nombre de produits par catégorie, tranche de prix et stock
+
+    Pagination (optionnelle) :
+      - /api/products/?limit=20             -> première page
+      - /api/products/?limit=20&cursor=...  -> page suivante (lien "next")
+
+    GET conditionnels : ETag / Last-Modified basés sur la version du
+    catalogue, If-None-Match -> 304 sans toucher à la table des produits.
+    Les réponses 200 sont ensuite servies depuis un cache LRU en mémoire
+    (catalog/response_cache.py), invalidé à chaque écriture du catalogue.
 
     Rôle :
       - Fournir le catalogue à la page React (Home, catégorie, détails).
@@ -48,20 +114,351 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    pagination_class = KeysetPagination
+    # list() sérialise depuis .values() via FastSerializer (même JSON, moins de CPU)
+    fast_serialization = True
+    # Clé de tri (et de curseur) des tris ?ordering=popular / popular_30d
+    POPULAR_KEYSET = ("-units_sold", "name", "id")
+    # Clé de tri (et de curseur) de ?search= : rang de pertinence, puis name, id
+    SEARCH_KEYSET = ("search_rank", "name", "id")
 
     def get_queryset(self):
         """
         Permet de filtrer dynamiquement les produits
         selon les paramètres de la requête HTTP.
         """
+        qs = self.get_search_queryset()
+        filters = parse_product_filters(self.request.query_params)
+        qs = apply_product_filters(qs, filters)
+        ordering = self.get_ordering()
+        if ordering in POPULAR_ORDERINGS:
+            qs = annotate_popularity(qs, ordering).order_by(*self.POPULAR_KEYSET)
+        return self.restrict_columns(qs)
+
+    def get_ordering(self):
+        """Lit ?ordering= : None (tri par nom) ou une clé de POPULAR_ORDERINGS."""
+        ordering = self.request.query_params.get('ordering')
+        if ordering in (None, '', 'name'):
+            return None
+        if ordering not in POPULAR_ORDERINGS:
+            choices = ', '.join(['name', *POPULAR_ORDERINGS])
+            raise ValidationError({'ordering': f"Tri inconnu. Tris possibles : {choices}."})
+        return ordering
+
+    @property
+    def paginator(self):
+        paginator = super().paginator
+        # le curseur suit le tri demandé (unités vendues, ou pertinence de la
+        # recherche, puis name, id) : paginer ne re-trie pas par nom
+        if paginator is not None:
+            if self.get_ordering() in POPULAR_ORDERINGS:
+                paginator.ordering = self.POPULAR_KEYSET
+            elif self.request.query_params.get('search'):
+                paginator.ordering = self.SEARCH_KEYSET
+        return paginator
+
+    def get_sparse_fieldset(self):
+        """
+        Lit ?fields= / ?omit= (listes séparées par des virgules).
+        Retourne les kwargs à passer au serializer.
+        """
+        allowed = ProductSerializer.Meta.fields
+        sparse = {}
+        for param in ('fields', 'omit'):
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            names = [name.strip() for name in value.split(',') if name.strip()]
+            unknown = [name for name in names if name not in allowed]
+            if unknown:
+                raise ValidationError({param: f"Champs inconnus : {', '.join(unknown)}. Champs possibles : {', '.join(allowed)}."})
+            sparse[param] = names
+        return sparse
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'batch', 'related'):
+            kwargs.update(self.get_sparse_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+    def restrict_columns(self, qs, keep=('id', 'name')):
+        """
+        Ne lit en SQL que les colonnes des champs demandés (.only()),
+        et joint la catégorie seulement si category_name est affiché.
+        `keep` : colonnes toujours lues (par défaut id + name, nécessaires
+        au curseur de pagination (name, id)).
+        """
+        serializer = ProductSerializer(**self.get_sparse_fieldset())
+        paths = serializer.get_orm_paths()
+        if 'category__name' in paths:
+            qs = qs.select_related('category')
+        if self.request.query_params.get('fields') is None and self.request.query_params.get('omit') is None:
+            return qs
+        return qs.only(*keep, *paths)
+
+    def get_search_queryset(self):
+        """Produits actifs restreints par ?search= (base commune à la liste et aux facettes)."""
         qs = super().get_queryset()
-        category_id = self.request.query_params.get('category')
         search = self.request.query_params.get('search')
-        
-
-        if category_id:
-            qs = qs.filter(category_id=category_id)
         if search:
-            qs = qs.filter(name__icontains=search)
-
+            qs = self.filter_search(qs, search)
         return qs
+
+    def list(self, request, *args, **kwargs):
+        if wants_stream(request):
+            # export complet en mémoire constante (ni pagination ni facettes)
+            return stream_json_response(
+                self.filter_queryset(self.get_queryset()),
+                ProductSerializer,
+                context=self.get_serializer_context(),
+                **self.get_sparse_fieldset(),
+            )
+
+        if self.fast_serialization:
+            response = self.fast_list()
+        else:
+            response = super().list(request, *args, **kwargs)
+
+        if request.query_params.get('search'):
+            # plafond du nombre de résultats : exposé plutôt que silencieux
+            response['X-Search-Max-Results'] = str(product_search.max_results())
+            response['X-Search-Truncated'] = '1' if getattr(self, 'search_truncated', False) else '0'
+
+        if request.query_params.get('facets') in ('1', 'true'):
+            facets = compute_facets(
+                self.get_search_queryset(),
+                parse_product_filters(request.query_params),
+                request.query_params.get('search'),
+            )
+            if isinstance(response.data, list):
+                response.data = {"results": response.data, "facets": facets}
+            else:
+                response.data["facets"] = facets
+
+        return response
+
+    def fast_list(self):
+        """Équivalent de ListModelMixin.list() sans instances de modèle ni ModelSerializer."""
+        fast = FastSerializer.for_serializer(ProductSerializer, **self.get_sparse_fieldset())
+        rows = fast.values(
+            self.filter_queryset(self.get_queryset()),
+            keep=self.paginator.ordering_fields,
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(rows))
+
+    def filter_search(self, qs, search):
+        """
+        Recherche via l'index FTS5 (catalog/search.py) : les résultats sont
+        triés par pertinence (annotation `search_rank`, aussi clé du curseur
+        de pagination). Sans index (autre base que SQLite), on retombe sur un
+        icontains sur le nom et la description (rang 0 : tri par nom).
+        Si rien ne correspond, repli tolérant aux fautes de frappe sur
+        l'index de trigrammes (catalog/trigrams.py), trié par similarité.
+
+        Au plus CATALOG_SEARCH_MAX_RESULTS résultats classés ;
+        self.search_truncated indique s'il y en avait plus.
+        """
+        self.search_truncated = False
+        if product_search.is_available():
+            ids = self._capped(product_search.search_product_ids, search)
+        else:
+            matches = qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
+            if matches.exists():
+                return matches.annotate(search_rank=Value(0)).order_by(*self.SEARCH_KEYSET)
+            ids = []
+
+        if not ids:
+            ids = self._capped(trigrams.similar_product_ids, search)
+        ranking = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            default=Value(len(ids)),
+            output_field=IntegerField(),
+        )
+        return qs.filter(pk__in=ids).annotate(search_rank=ranking).order_by(*self.SEARCH_KEYSET)
+
+    def _capped(self, search_ids, search):
+        """Ids classés, au plus max_results() ; note si la liste a été tronquée."""
+        cap = product_search.max_results()
+        ids = search_ids(search, cap + 1)
+        if len(ids) > cap:
+            self.search_truncated = True
+        return ids[:cap]
+
+    @action(detail=False, methods=["get"], url_path="batch", pagination_class=None)
+    def batch(self, request):
+        """
+        GET /api/products/batch/?ids=1,5,9
+
+        Résout tous les produits en UNE requête (pk__in) :
+          {
+            "results": [produits actifs, dans l'ordre des ids demandés],
+            "missing": [ids inexistants],
+            "inactive": [ids désactivés]
+          }
+        Accepte aussi ?fields= / ?omit=.
+        """
+        ids = _ids_param(request)
+
+        # volontairement sans filtre is_active : on veut distinguer inactifs et inexistants
+        qs = self.restrict_columns(
+            Product.objects.filter(pk__in=ids).order_by(),
+            keep=('id', 'is_active'),
+        )
+        found = {product.pk: product for product in qs}
+
+        active = [found[pk] for pk in ids if pk in found and found[pk].is_active]
+        return Response({
+            "results": self.get_serializer(active, many=True).data,
+            "missing": [pk for pk in ids if pk not in found],
+            "inactive": [pk for pk in ids if pk in found and not found[pk].is_active],
+        })
+
+    @action(detail=True, methods=["get"], url_path="related", pagination_class=None)
+    def related(self, request, pk=None):
+        """
+        GET /api/products/<id>/related/
+
+        Produits "souvent achetés ensemble", précalculés par
+        `python manage.py compute_related_products` : une seule requête
+        indexée sur RelatedProduct (product_id, rank), jointe au produit
+        et à sa catégorie. Accepte aussi ?fields= / ?omit=.
+        """
+        product = self.get_object()
+        links = (
+            RelatedProduct.objects.filter(product=product, related__is_active=True)
+            .select_related("related__category")
+            .order_by("rank")
+        )
+        related = [link.related for link in links]
+        return Response(self.get_serializer(related, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="changes", pagination_class=None)
+    def changes(self, request):
+        """
+        GET /api/products/changes/?since=<version>
+
+        Retourne seulement ce qui a changé depuis `since` :
+          {
+            "version": <version actuelle, à renvoyer au prochain appel>,
+            "updated": [produits actifs modifiés, format ProductSerializer],
+            "deleted": [ids des produits supprimés ou désactivés],
+            "reset": true si le client doit tout recharger
+          }
+        """
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            raise ValidationError({"since": "Entier attendu."})
+
+        current = self.catalog_version.version
+        if since > current:
+            # version inconnue du serveur (base réinitialisée) : resynchro complète
+            return Response({"version": current, "updated": [], "deleted": [], "reset": True})
+
+        changed = (
+            Product.objects.filter(version__gt=since)
+            .select_related("category")
+            .order_by("version")
+        )
+        updated = [product for product in changed if product.is_active]
+        deleted = [product.pk for product in changed if not product.is_active]
+        deleted += ProductTombstone.objects.filter(version__gt=since).values_list(
+            "product_id", flat=True
+        )
+
+        return Response({
+            "version": current,
+            "updated": self.get_serializer(updated, many=True).data,
+            "deleted": deleted,
+            "reset": False,
+        })
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def catalog_snapshot(request):
+    """
+    GET /api/catalog/snapshot/
+    -> redirige vers le dernier snapshot immuable du catalogue
+       (généré par `python manage.py build_catalog_snapshot`).
+    """
+    pointer = current_snapshot()
+    if pointer is None:
+        return Response({"detail": "Aucun snapshot du catalogue."}, status=404)
+
+    response = redirect("catalog-snapshot-file", name=pointer["file"])
+    response["Cache-Control"] = "no-cache"
+    response["X-Catalog-Version"] = str(pointer["version"])
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def catalog_snapshot_file(request, name):
+    """
+    GET /api/catalog/snapshot/<catalog-hash.json>
+    -> sert la variante pré-compressée (br / gzip) acceptée par le client.
+       Le nom contient le hash du contenu : cache navigateur illimité.
+    """
+    found = snapshot_file(name, request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if found is None:
+        raise Http404("Snapshot introuvable.")
+
+    path, encoding = found
+    response = FileResponse(path.open("rb"), content_type="application/json")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def _ids_param(request) -> list[int]:
+    """?ids=1,5,9 de /products/batch/ et /products/stock/ (400 si invalide)."""
+    return parse_ids(
+        request.query_params.get("ids", ""),
+        "ids",
+        max_ids=getattr(settings, "CATALOG_BATCH_MAX_IDS", 100),
+    )
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def product_stock(request):
+    """
+    GET /api/products/stock/?ids=1,5,9
+    -> {"stock": {"1": 4, "5": 0}, "missing": [9]}
+
+    Stock "live" pour la page panier / checkout, servi depuis le cache
+    mémoire catalog/stock_cache.py (pas de requête SQL tant qu'il est frais).
+    """
+    ids = _ids_param(request)
+    stocks = stock_cache.get_many(ids)
+    response = Response({
+        "stock": {str(pk): stocks[pk] for pk in ids if stocks[pk] is not None},
+        "missing": [pk for pk in ids if stocks[pk] is None],
+    })
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def catalog_autocomplete(request):
+    """
+    GET /api/catalog/autocomplete/?q=ecr&limit=8
+    -> {"products": [{"id", "name"}, ...], "categories": [{"id", "name"}, ...]}
+
+    Suggestions pendant la frappe, servies depuis l'index mémoire
+    catalog/autocomplete.py (pas de requête SQL par frappe clavier).
+    """
+    try:
+        limit = int(request.query_params.get("limit", 8))
+    except ValueError:
+        raise ValidationError({"limit": "Entier attendu."})
+    max_limit = getattr(settings, "CATALOG_AUTOCOMPLETE_MAX_RESULTS", 20)
+    limit = max(1, min(limit, max_limit))
+
+    return Response(autocomplete_index.search(request.query_params.get("q", ""), limit))
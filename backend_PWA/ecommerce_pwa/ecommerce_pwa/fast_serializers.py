@@ -0,0 +1,175 @@
+# ecommerce_pwa/fast_serializers.py
+"""
+Chemin de sérialisation rapide, en lecture seule.
+
+DRF (ModelSerializer) appelle, pour chaque objet et chaque champ,
+get_attribute() puis to_representation() : sur une liste de plusieurs
+milliers d'objets, c'est ce qui coûte le plus de CPU.
+
+FastSerializer analyse UNE FOIS un serializer DRF existant et en tire une
+table (nom de sortie, chemin ORM pour .values(), convertisseur). Ensuite :
+  - la requête utilise .values(...) : pas d'instances de modèle
+  - chaque ligne devient un dict avec les convertisseurs précalculés
+  - les serializers imbriqués (many=True) sont résolus en UNE requête
+    supplémentaire par niveau (filtre <fk>__in)
+
+La sortie est identique à celle du serializer DRF d'origine (même
+formatage Decimal / datetime). Un champ de type inconnu garde son
+to_representation() DRF : plus lent, mais toujours identique.
+
+    fast = FastSerializer.for_serializer(ProductSerializer, fields=["id", "name"])
+    data = fast.serialize(fast.values(queryset))
+"""
+import decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# Taille des paquets pour les filtres <fk>__in des serializers imbriqués
+NESTED_BATCH_SIZE = 500
+
+
+def _identity(value):
+    return value
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.normalize_output:
+        return field.to_representation
+    if field.decimal_places is None:
+        exponent = context = None
+    else:
+        exponent = decimal.Decimal(".1") ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        if exponent is not None:
+            value = value.quantize(exponent, rounding=rounding, context=context)
+        return f"{value:f}" if coerce_to_string else value
+
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != "iso-8601" or hasattr(field, "timezone"):
+        return field.to_representation
+
+    def convert(value):
+        if not settings.USE_TZ:
+            return field.to_representation(value)
+        value = value.astimezone(timezone.get_current_timezone())
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return convert
+
+
+def build_converter(field):
+    """Convertisseur précalculé équivalent à field.to_representation(value)."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            raise ImproperlyConfigured(f"{field.field_name}: pk_field non supporté par FastSerializer.")
+        # .values('<fk>') renvoie déjà l'identifiant
+        return _identity
+    if isinstance(field, serializers.ChoiceField):
+        return field.to_representation
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.CharField):  # inclut URLField, EmailField...
+        return str
+    return field.to_representation
+
+
+class FastSerializer:
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk_name = self.model._meta.pk.attname
+        self.columns = []  # (nom de sortie, chemin .values(), convertisseur)
+        self.nested = []   # (nom de sortie, FastSerializer enfant, champ FK de l'enfant)
+
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                child = FastSerializer(field.child)
+                self.nested.append((name, child, relation.field.attname))
+            elif isinstance(field, (serializers.Serializer, serializers.SerializerMethodField)):
+                raise ImproperlyConfigured(f"{name}: champ non supporté par FastSerializer.")
+            else:
+                self.columns.append((name, field.source.replace(".", "__"), build_converter(field)))
+
+        self.paths = [path for _, path, _ in self.columns]
+
+    @classmethod
+    def for_serializer(cls, serializer_class, fields=None, omit=None):
+        """Table mise en cache par (serializer, champs demandés)."""
+        return _cached_fast_serializer(
+            serializer_class,
+            tuple(fields) if fields is not None else None,
+            tuple(omit) if omit is not None else None,
+        )
+
+    def values(self, queryset, keep=()):
+        """
+        queryset.values(...) avec les colonnes nécessaires
+        (+ `keep`, ex: id/name pour le curseur de pagination).
+        """
+        paths = [*self.paths, *keep]
+        if self.nested:
+            paths.append(self.pk_name)
+        return queryset.values(*dict.fromkeys(paths))
+
+    def serialize(self, rows) -> list[dict]:
+        rows = list(rows)
+        columns = self.columns
+        data = [
+            {
+                name: None if (value := row[path]) is None else convert(value)
+                for name, path, convert in columns
+            }
+            for row in rows
+        ]
+        for name, child, link in self.nested:
+            grouped = child.serialize_grouped([row[self.pk_name] for row in rows], link)
+            for item, row in zip(data, rows):
+                item[name] = grouped.get(row[self.pk_name], [])
+        return data
+
+    def serialize_grouped(self, parent_ids, link) -> dict:
+        """Sérialise les enfants de plusieurs parents : {parent_id: [dicts]}."""
+        grouped = {}
+        for start in range(0, len(parent_ids), NESTED_BATCH_SIZE):
+            batch = parent_ids[start : start + NESTED_BATCH_SIZE]
+            qs = self.model._default_manager.filter(**{f"{link}__in": batch}).order_by(self.pk_name)
+            rows = list(self.values(qs, keep=(link,)))
+            for row, item in zip(rows, self.serialize(rows)):
+                grouped.setdefault(row[link], []).append(item)
+        return grouped
+
+
+@lru_cache(maxsize=128)
+def _cached_fast_serializer(serializer_class, fields, omit):
+    kwargs = {}
+    if fields is not None:
+        kwargs["fields"] = fields
+    if omit is not None:
+        kwargs["omit"] = omit
+    return FastSerializer(serializer_class(**kwargs))
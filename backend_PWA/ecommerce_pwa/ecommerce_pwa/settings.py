@@ -164,6 +164,18 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
+    "if-none-match",
+    "if-modified-since",
+    "idempotency-key",
+]
+# GET conditionnels du catalogue (ETag / 304) + rejeux de commandes
+# + plafond des résultats de ?search= (CATALOG_SEARCH_MAX_RESULTS)
+CORS_EXPOSE_HEADERS = [
+    "etag",
+    "last-modified",
+    "idempotent-replayed",
+    "x-search-max-results",
+    "x-search-truncated",
 ]
 
 
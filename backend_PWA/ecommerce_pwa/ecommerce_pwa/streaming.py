@@ -0,0 +1,51 @@
+# ecommerce_pwa/streaming.py
+"""
+Rendu JSON en streaming pour les grosses listes (exports, clients non paginés).
+
+Au lieu de construire toute la liste `serializer.data` puis un seul gros
+bloc d'octets, on parcourt le queryset par paquets (.iterator(chunk_size))
+et on émet le tableau JSON au fur et à mesure via StreamingHttpResponse :
+la mémoire reste constante quelle que soit la taille du résultat.
+
+Le JSON produit est identique à celui de JSONRenderer (mêmes séparateurs,
+mêmes encodages Decimal / datetime).
+
+Utilisé par ProductViewSet.list, list_my_orders et NotificationListAPIView
+avec ?stream=1.
+"""
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+TRUE_VALUES = {"1", "true", "yes"}
+DEFAULT_CHUNK_SIZE = 500
+
+
+def wants_stream(request) -> bool:
+    return (request.query_params.get("stream") or "").lower() in TRUE_VALUES
+
+
+def iter_json_array(queryset, serializer_class, chunk_size=DEFAULT_CHUNK_SIZE, **serializer_kwargs):
+    """Générateur d'octets : b"[", puis les objets par paquets, puis b"]"."""
+    renderer = JSONRenderer()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    first = True
+
+    yield b"["
+    while chunk := list(islice(rows, chunk_size)):
+        data = serializer_class(chunk, many=True, **serializer_kwargs).data
+        # render(list) -> b"[a,b,c]" : on retire les crochets pour concaténer les paquets
+        body = renderer.render(data)[1:-1]
+        if not first:
+            yield b","
+        yield body
+        first = False
+    yield b"]"
+
+
+def stream_json_response(queryset, serializer_class, chunk_size=DEFAULT_CHUNK_SIZE, **serializer_kwargs):
+    return StreamingHttpResponse(
+        iter_json_array(queryset, serializer_class, chunk_size, **serializer_kwargs),
+        content_type="application/json",
+    )
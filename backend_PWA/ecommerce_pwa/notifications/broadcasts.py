@@ -0,0 +1,97 @@
+# notifications/broadcasts.py
+"""
+Broadcasts "fan-out on read".
+
+Une promo envoyée à tout le monde est UNE Notification avec user = None
+(1 écriture, quel que soit le nombre d'utilisateurs). Elle n'est pas
+recopiée dans chaque boîte : la boîte de réception est fusionnée à la
+lecture :
+
+    notifications de l'utilisateur  UNION  broadcasts créés après son inscription
+
+et l'état "lu" d'un broadcast vient de BroadcastReadState (une ligne par
+utilisateur, créée au premier "lu") :
+  - read_up_to : filigrane, tous les broadcasts d'id <= read_up_to sont lus
+  - read_ids   : exceptions, broadcasts plus récents lus un par un
+
+Quand les broadcasts qui suivent le filigrane sont lus, il avance et les
+exceptions correspondantes disparaissent : la ligne reste petite.
+Les deux branches de la requête utilisent l'index (user, -created_at).
+"""
+from django.db import transaction
+from django.db.models import BooleanField, Case, Max, Q, Value, When
+
+from . import counters
+from .models import BroadcastReadState, Notification
+
+
+def visible_to(user) -> Q:
+    """Notifications personnelles + broadcasts reçus depuis l'inscription."""
+    return Q(user=user) | Q(user__isnull=True, created_at__gte=user.date_joined)
+
+
+def read_state(user) -> BroadcastReadState:
+    """État de lecture (non enregistré s'il n'existe pas encore : rien de lu)."""
+    try:
+        return BroadcastReadState.objects.get(user=user)
+    except BroadcastReadState.DoesNotExist:
+        return BroadcastReadState(user=user)
+
+
+def inbox(user):
+    """
+    Boîte de réception du user, annotée de `user_is_read` : is_read pour
+    ses notifications, état de BroadcastReadState pour les broadcasts.
+    """
+    state = read_state(user)
+    read = [When(user__isnull=False, then="is_read"), When(pk__lte=state.read_up_to, then=Value(True))]
+    if state.read_ids:
+        read.append(When(pk__in=state.read_ids, then=Value(True)))
+    return Notification.objects.filter(visible_to(user)).annotate(
+        user_is_read=Case(*read, default=Value(False), output_field=BooleanField())
+    )
+
+
+def _broadcasts_after(user, notification_id: int):
+    return Notification.objects.filter(
+        user__isnull=True, created_at__gte=user.date_joined, pk__gt=notification_id
+    )
+
+
+@transaction.atomic
+def mark_read(user, notification: Notification) -> None:
+    """Marque un broadcast comme lu pour `user` (1 écriture au plus)."""
+    state, _ = BroadcastReadState.objects.select_for_update().get_or_create(user=user)
+    if state.has_read(notification.pk):
+        return
+
+    pending = set(state.read_ids)
+    pending.add(notification.pk)
+    # avance le filigrane sur les broadcasts lus qui le suivent directement
+    following = _broadcasts_after(user, state.read_up_to).order_by("pk").values_list("pk", flat=True)
+    for pk in following[: len(pending)]:
+        if pk not in pending:
+            break
+        state.read_up_to = pk
+        pending.discard(pk)
+    state.read_ids = sorted(pk for pk in pending if pk > state.read_up_to)
+    state.save()
+    counters.broadcast_seen(user)
+
+
+@transaction.atomic
+def mark_all_read(user) -> int:
+    """
+    Tout marquer comme lu : 1 UPDATE pour les notifications personnelles,
+    le filigrane passe au dernier broadcast. Retourne le nombre de
+    notifications personnelles modifiées.
+    """
+    updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    latest = _broadcasts_after(user, 0).aggregate(latest=Max("pk"))["latest"]
+    if latest is not None:
+        BroadcastReadState.objects.update_or_create(
+            user=user, defaults={"read_up_to": latest, "read_ids": []}
+        )
+    # .update() ne déclenche pas les signaux : le compteur est remis à zéro ici
+    counters.all_read(user)
+    return updated
@@ -0,0 +1,98 @@
+# notifications/counters.py
+"""
+Compteur de notifications non lues (badge de la cloche).
+
+Le frontend interroge /api/notifications/unread-count/ régulièrement : la
+réponse ne lit que deux lignes par clé primaire (UnreadCounter du user,
+BroadcastCounter), jamais la table des notifications.
+
+Les compteurs sont tenus à jour à l'écriture :
+  - signaux post_save / post_delete de Notification (notifications/signals.py) :
+    création, passage lu / non lu, suppression (broadcast_deleted pour un
+    broadcast : seuls ceux qui ne l'avaient pas lu voient leur badge baisser)
+  - broadcasts.mark_read / mark_all_read (l'état de lecture des broadcasts
+    n'est pas une Notification, et mark_all_read passe par .update())
+
+Le compteur d'un user est créé au premier appel par recount() (les COUNT
+ne sont faits qu'une fois). En cas de dérive (bulk_create, .update() sur
+les notifications...) : `python manage.py recount_unread_notifications`.
+"""
+from django.db.models import F, Q
+
+from .models import BroadcastCounter, BroadcastReadState, Notification, UnreadCounter
+
+
+def broadcast_total() -> int:
+    counter = BroadcastCounter.objects.filter(pk=BroadcastCounter.SINGLETON_PK).first()
+    if counter is None:
+        # première utilisation : seul COUNT des broadcasts
+        counter, _ = BroadcastCounter.objects.get_or_create(
+            pk=BroadcastCounter.SINGLETON_PK,
+            defaults={"total": Notification.objects.filter(user__isnull=True).count()},
+        )
+    return counter.total
+
+
+def recount(user) -> UnreadCounter:
+    """(Re)calcule le compteur du user à partir des tables."""
+    unread = Notification.objects.filter(user=user, is_read=False).count()
+    visible = Notification.objects.filter(user__isnull=True, created_at__gte=user.date_joined)
+    state = BroadcastReadState.objects.filter(user=user).first()
+    unread_broadcasts = visible.count()
+    if state is not None:
+        unread_broadcasts -= visible.filter(Q(pk__lte=state.read_up_to) | Q(pk__in=state.read_ids)).count()
+    counter, _ = UnreadCounter.objects.update_or_create(
+        user=user,
+        defaults={"unread": unread, "broadcasts_seen": broadcast_total() - unread_broadcasts},
+    )
+    return counter
+
+
+def unread_count(user) -> int:
+    counter = UnreadCounter.objects.filter(user=user).first()
+    if counter is None:
+        counter = recount(user)
+    # max(..., 0) : garde-fou si les compteurs ont dérivé (voir recount_unread_notifications)
+    return max(counter.unread, 0) + max(broadcast_total() - counter.broadcasts_seen, 0)
+
+
+def add_unread(user_id: int, delta: int) -> None:
+    # pas encore de compteur : il sera calculé (à jour) au premier appel
+    UnreadCounter.objects.filter(user_id=user_id).update(unread=F("unread") + delta)
+
+
+def add_broadcasts(delta: int) -> None:
+    BroadcastCounter.objects.filter(pk=BroadcastCounter.SINGLETON_PK).update(total=F("total") + delta)
+
+
+def broadcast_deleted(notification: Notification) -> None:
+    """
+    Broadcast supprimé : le total baisse de 1. Pour qui l'avait déjà lu (ou
+    s'est inscrit après : il ne lui était pas visible), il comptait aussi
+    dans broadcasts_seen, qui baisse donc de 1 : son badge ne bouge pas.
+    """
+    add_broadcasts(-1)
+    pk = notification.pk
+    # read_ids ne contient que des ids > read_up_to, et il y a peu d'exceptions
+    exceptions = [
+        user_id
+        for user_id, read_ids in BroadcastReadState.objects.filter(read_up_to__lt=pk)
+        .exclude(read_ids=[])
+        .values_list("user_id", "read_ids")
+        if pk in read_ids
+    ]
+    seen = (
+        Q(user__date_joined__gt=notification.created_at)
+        | Q(user_id__in=BroadcastReadState.objects.filter(read_up_to__gte=pk).values("user_id"))
+        | Q(user_id__in=exceptions)
+    )
+    UnreadCounter.objects.filter(seen).update(broadcasts_seen=F("broadcasts_seen") - 1)
+
+
+def broadcast_seen(user, count: int = 1) -> None:
+    UnreadCounter.objects.filter(user=user).update(broadcasts_seen=F("broadcasts_seen") + count)
+
+
+def all_read(user) -> None:
+    """Après mark_all_read : plus rien de non lu."""
+    UnreadCounter.objects.filter(user=user).update(unread=0, broadcasts_seen=broadcast_total())
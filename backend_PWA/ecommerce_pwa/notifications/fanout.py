@@ -0,0 +1,176 @@
+# notifications/fanout.py
+"""
+Envoi web-push en parallèle, avec une limite par service push.
+
+Avant : un appel pywebpush.webpush() après l'autre, chacun ouvrant une
+nouvelle connexion HTTPS. Un broadcast à 50 000 appareils prenait des
+heures (latence réseau x nombre d'abonnements).
+
+Ici :
+  - les messages sont regroupés par hôte du service push (fcm.googleapis.com,
+    updates.push.services.mozilla.com...) ;
+  - chaque hôte a au plus N envois simultanés (NOTIFICATIONS_PUSH_PER_HOST,
+    défaut 8, surchargeable hôte par hôte via NOTIFICATIONS_PUSH_HOST_LIMITS),
+    pour ne pas se faire limiter (429) par un service ;
+  - au total, au plus NOTIFICATIONS_PUSH_CONCURRENCY threads (défaut 32) ;
+  - une requests.Session par hôte, gardée pour toute la vie du processus :
+    les connexions HTTPS (keep-alive) sont réutilisées d'un envoi à l'autre.
+
+Aucun accès à la base dans les threads : les abonnements arrivent déjà
+chargés, et c'est l'appelant qui traite les résultats (suppression des
+abonnements morts, nouvelles tentatives).
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from pywebpush import WebPushException, webpush
+from requests.adapters import HTTPAdapter
+
+from .vapid import audience, vapid_headers
+
+
+@dataclass
+class PushResult:
+    """Résultat d'un envoi : status = code HTTP, None si erreur réseau."""
+    subscription: object
+    status: int | None
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 300
+
+    @property
+    def gone(self) -> bool:
+        """Abonnement mort (404/410) : à supprimer."""
+        return self.status in (404, 410)
+
+    @property
+    def retryable(self) -> bool:
+        """Échec temporaire : réseau, 429, 5xx."""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def host_limit(host: str) -> int:
+    limits = _setting("NOTIFICATIONS_PUSH_HOST_LIMITS", {})
+    return max(int(limits.get(host, _setting("NOTIFICATIONS_PUSH_PER_HOST", 8))), 1)
+
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(host: str) -> requests.Session:
+    """Session HTTP persistante de l'hôte (pool de connexions = sa limite)."""
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                size = host_limit(host)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[host] = session
+    return session
+
+
+def close_sessions() -> None:
+    """Ferme les connexions gardées (tests, benchmark, arrêt du worker)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def send_one(subscription, data: str, session=None) -> PushResult:
+    """Un envoi webpush ; ne lève pas d'exception, retourne un PushResult."""
+    aud = audience(subscription.endpoint)
+    if not aud:
+        return PushResult(subscription, 400, f"Endpoint invalide: {subscription.endpoint}")
+
+    try:
+        # JWT VAPID signé une fois par audience (notifications/vapid.py)
+        # plutôt qu'à chaque envoi par pywebpush
+        response = webpush(
+            subscription_info={
+                "endpoint": subscription.endpoint,
+                "keys": {"p256dh": subscription.p256dh, "auth": subscription.auth},
+            },
+            data=data,
+            headers=vapid_headers(aud),
+            timeout=_setting("NOTIFICATIONS_PUSH_TIMEOUT", 10),
+            requests_session=session,
+        )
+        return PushResult(subscription, response.status_code)
+    except WebPushException as e:
+        status_code = e.response.status_code if getattr(e, "response", None) is not None else None
+        return PushResult(subscription, status_code, str(e))
+    except requests.RequestException as e:
+        # timeout, connexion refusée... : le service push sera retenté
+        return PushResult(subscription, None, str(e))
+    except Exception as e:
+        # clés p256dh/auth corrompues, etc. : inutile de retenter
+        return PushResult(subscription, 400, str(e))
+
+
+def send_all(messages, max_workers: int | None = None) -> list[PushResult]:
+    """
+    Envoie des (abonnement, données JSON) en parallèle.
+    Retourne les résultats dans l'ordre des messages.
+
+    Chaque hôte reçoit min(limite, nb de messages) "voies" : une voie est
+    une tâche du pool qui envoie les messages de son hôte l'un après
+    l'autre. Un hôte lent n'occupe donc jamais plus de threads que sa
+    limite, et aucun thread n'attend un sémaphore.
+    """
+    messages = list(messages)
+    results: list[PushResult | None] = [None] * len(messages)
+    if not messages:
+        return []
+
+    queues: dict[str, deque] = {}
+    for position, (subscription, data) in enumerate(messages):
+        host = urlparse(subscription.endpoint).netloc
+        queues.setdefault(host, deque()).append((position, subscription, data))
+
+    def lane(host: str, queue: deque) -> None:
+        session = session_for(host) if host else None
+        while True:
+            try:
+                position, subscription, data = queue.popleft()  # deque : thread-safe
+            except IndexError:
+                return
+            results[position] = send_one(subscription, data, session)
+
+    # voies entrelacées entre hôtes : si le pool est plus petit que le
+    # total des voies, chaque hôte démarre quand même tout de suite
+    counts = {host: min(host_limit(host), len(queue)) for host, queue in queues.items()}
+    lanes = [
+        (host, queues[host])
+        for rank in range(max(counts.values()))
+        for host in queues
+        if rank < counts[host]
+    ]
+    if max_workers is None:
+        max_workers = _setting("NOTIFICATIONS_PUSH_CONCURRENCY", 32)
+    workers = max(min(max_workers, len(lanes)), 1)
+
+    if workers == 1:
+        for host, queue in lanes:
+            lane(host, queue)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webpush") as pool:
+            for future in [pool.submit(lane, host, queue) for host, queue in lanes]:
+                future.result()
+    return results
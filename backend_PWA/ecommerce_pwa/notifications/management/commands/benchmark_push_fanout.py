@@ -0,0 +1,141 @@
+import base64
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from notifications.fanout import close_sessions, send_all, send_one
+from notifications.models import PushSubscription
+
+
+class StubPushHandler(BaseHTTPRequestHandler):
+    """Faux service push : attend `latency` secondes puis répond 201."""
+    protocol_version = "HTTP/1.1"  # keep-alive, comme les vrais services push
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPushHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare l'envoi web-push en série (une connexion par envoi, comme avant) "
+        "au fan-out parallèle de notifications/fanout.py, contre des faux services "
+        "push locaux (un par hôte simulé). Aucune donnée n'est écrite en base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscriptions", type=int, default=1000, help="Abonnements simulés (défaut : 1000).")
+        parser.add_argument("--hosts", type=int, default=2, help="Services push simulés (défaut : 2).")
+        parser.add_argument("--latency", type=float, default=50, help="Latence du faux service, en ms (défaut : 50).")
+        parser.add_argument("--per-host", type=int, default=8, help="Envois simultanés par hôte (défaut : 8).")
+        parser.add_argument("--concurrency", type=int, default=32, help="Threads au total (défaut : 32).")
+        parser.add_argument(
+            "--serial-sample",
+            type=int,
+            default=100,
+            help="Envois mesurés en série, extrapolés au total (défaut : 100).",
+        )
+
+    def handle(self, *args, **options):
+        count = options["subscriptions"]
+        if count < 1 or options["hosts"] < 1:
+            raise CommandError("--subscriptions et --hosts doivent être >= 1.")
+
+        servers = [start_stub(options["latency"] / 1000) for _ in range(options["hosts"])]
+        # une seule paire de clés navigateur : le chiffrement reste fait à chaque envoi
+        public_key = ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )
+        subscriptions = [
+            PushSubscription(
+                endpoint=f"http://127.0.0.1:{servers[i % len(servers)].server_port}/push/{i}",
+                p256dh=b64(public_key),
+                auth=b64(os.urandom(16)),
+            )
+            for i in range(count)
+        ]
+        data = json.dumps({"title": "Promo 🔥", "body": "Benchmark fan-out", "url": "/"})
+        messages = [(sub, data) for sub in subscriptions]
+
+        try:
+            sample = messages[: max(min(options["serial_sample"], count), 1)]
+            started = time.perf_counter()
+            serial = [send_one(sub, payload) for sub, payload in sample]
+            serial_seconds = (time.perf_counter() - started) * count / len(sample)
+            serial_connections = self.reset_connections(servers)
+            self.ensure_ok(serial, "série")
+
+            with override_settings(
+                NOTIFICATIONS_PUSH_PER_HOST=options["per_host"],
+                NOTIFICATIONS_PUSH_CONCURRENCY=options["concurrency"],
+            ):
+                close_sessions()
+                started = time.perf_counter()
+                fanout = send_all(messages)
+                fanout_seconds = time.perf_counter() - started
+            fanout_connections = self.reset_connections(servers)
+            self.ensure_ok(fanout, "fan-out")
+        finally:
+            close_sessions()
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+        self.stdout.write(
+            f"{count} push, {len(servers)} hôte(s), latence {options['latency']:.0f} ms, "
+            f"{options['per_host']}/hôte, {options['concurrency']} threads max"
+        )
+        self.stdout.write(
+            f"  série   : {serial_seconds:8.2f} s (extrapolé depuis {len(sample)}) | "
+            f"{count / serial_seconds:8.0f} push/s | {serial_connections * count // len(sample)} connexions"
+        )
+        self.stdout.write(
+            f"  fan-out : {fanout_seconds:8.2f} s | {count / fanout_seconds:8.0f} push/s | "
+            f"{fanout_connections} connexions"
+        )
+        self.stdout.write(self.style.SUCCESS(f"x{serial_seconds / fanout_seconds:.1f}"))
+
+    def reset_connections(self, servers) -> int:
+        total = 0
+        for server in servers:
+            with server.lock:
+                total += server.connections
+                server.connections = 0
+        return total
+
+    def ensure_ok(self, results, label):
+        failed = [result for result in results if not result.ok]
+        if failed:
+            raise CommandError(f"{label} : {len(failed)} envois en échec ({failed[0].error}).")
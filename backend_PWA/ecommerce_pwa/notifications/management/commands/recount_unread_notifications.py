@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notifications.models import BroadcastCounter, Notification, UnreadCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les compteurs de notifications non lues (badge). Les compteurs "
+        "par utilisateur sont supprimés puis recalculés à leur prochaine lecture. "
+        "À lancer après des écritures qui contournent les signaux "
+        "(bulk_create, .update() sur les notifications)."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = Notification.objects.filter(user__isnull=True).count()
+            BroadcastCounter.objects.update_or_create(
+                pk=BroadcastCounter.SINGLETON_PK, defaults={"total": total}
+            )
+            deleted, _ = UnreadCounter.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} broadcasts ; {deleted} compteurs utilisateur à recalculer."
+        ))
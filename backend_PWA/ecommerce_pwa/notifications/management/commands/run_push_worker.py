@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les notifications push en attente dans l'outbox (par paquets, "
+        "avec nouvelles tentatives en backoff exponentiel). Tourne en boucle, "
+        "ou vide la file puis s'arrête avec --once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Lignes par paquet (défaut : 100).")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Pause en secondes quand la file est vide (défaut : 1).",
+        )
+        parser.add_argument("--once", action="store_true", help="Vide la file puis s'arrête.")
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        total = 0
+        try:
+            while True:
+                processed = process_batch(batch_size)
+                total += processed
+                if processed:
+                    self.stdout.write(f"{processed} push traitées.")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Worker arrêté : {total} push traitées."))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('notifications', '0008_broadcast_read_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Broadcast counter',
+                'verbose_name_plural': 'Broadcast counter',
+            },
+        ),
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('broadcasts_seen', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Notification(models.Model):
    
@@ -42,11 +43,81 @@ class Notification(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            # boîte de réception : user = X (ou user IS NULL pour les
+            # broadcasts) ORDER BY created_at DESC
+            models.Index(fields=["user", "-created_at"], name="notif_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} → {self.user.username if self.user else 'Tous les utilisateurs'}"
 
 
+class BroadcastReadState(models.Model):
+    """
+    Ce qu'un utilisateur a lu parmi les broadcasts (Notification.user = None).
+
+    Un broadcast est UNE ligne partagée par tout le monde : son champ
+    is_read ne veut rien dire. L'état de lecture de chaque utilisateur tient
+    ici, en une ligne compacte (voir notifications/broadcasts.py) :
+      - read_up_to : tous les broadcasts d'id <= read_up_to sont lus
+      - read_ids   : broadcasts plus récents lus un par un
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="broadcast_read_state",
+    )
+    read_up_to = models.PositiveBigIntegerField(default=0)
+    read_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Broadcasts lus par {self.user_id} (<= {self.read_up_to} + {len(self.read_ids)})"
+
+    def has_read(self, notification_id: int) -> bool:
+        return notification_id <= self.read_up_to or notification_id in self.read_ids
+
+
+class UnreadCounter(models.Model):
+    """
+    Compteur de non-lues d'un utilisateur (badge de la cloche), tenu à jour
+    à l'écriture pour que /api/notifications/unread-count/ ne fasse jamais
+    de COUNT(*) (voir notifications/counters.py).
+
+    non-lues = unread + (BroadcastCounter.total - broadcasts_seen)
+      - unread          : notifications personnelles non lues
+      - broadcasts_seen : broadcasts "consommés" = créés avant l'inscription + lus
+    Un broadcast n'écrit donc qu'une ligne (BroadcastCounter), pas une par user.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="unread_counter",
+    )
+    unread = models.IntegerField(default=0)
+    broadcasts_seen = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Non-lues de {self.user_id} : {self.unread} (+ broadcasts)"
+
+
+class BroadcastCounter(models.Model):
+    """Nombre de broadcasts existants (une seule ligne, pk=1)."""
+    SINGLETON_PK = 1
+
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Broadcast counter"
+        verbose_name_plural = "Broadcast counter"
+
+    def __str__(self):
+        return f"{self.total} broadcasts"
+
+
 class PushSubscription(models.Model):
     """
     Stocke les abonnements push navigateur (pour pywebpush).
@@ -65,4 +136,47 @@ class PushSubscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"PushSub {self.user or 'anonyme'}"
\ No newline at end of file
+        return f"PushSub {self.user or 'anonyme'}"
+
+class PushOutbox(models.Model):
+    """
+    File d'envoi des push (outbox transactionnelle).
+
+    Une ligne par Notification, écrite dans la même transaction qu'elle
+    (signal post_save), puis envoyée APRÈS commit par
+    `python manage.py run_push_worker` (voir notifications/outbox.py).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En attente"),
+        (STATUS_SENT, "Envoyée"),
+        (STATUS_FAILED, "Abandonnée"),
+    ]
+
+    # OneToOne : une notification n'est mise en file (et envoyée) qu'une fois
+    notification = models.OneToOneField(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name="outbox",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # abonnements à retenter après un échec temporaire (None = tous)
+    retry_subscription_ids = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Push outbox"
+        verbose_name_plural = "Push outbox"
+        indexes = [
+            # lignes à envoyer : status = pending ORDER BY next_attempt_at
+            models.Index(fields=["status", "next_attempt_at"], name="push_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"Push #{self.notification_id} ({self.status}, {self.attempts} essais)"
@@ -0,0 +1,156 @@
+# notifications/outbox.py
+"""
+Outbox transactionnelle des notifications push.
+
+Avant : créer une Notification déclenchait un envoi webpush bloquant
+(HTTPS vers le service push) dans le signal post_save, donc DANS la
+transaction de create_order, verrous du stock encore posés.
+
+Maintenant :
+  1. enqueue() écrit une ligne PushOutbox dans la même transaction que la
+     Notification (rien n'est envoyé si la commande est annulée)
+  2. `python manage.py run_push_worker` relit les lignes dues APRÈS commit,
+     par paquets, et les envoie hors de toute transaction
+
+Garanties :
+  - une seule ligne par notification (OneToOne) : pas de double envoi
+  - une ligne "réservée" par un worker voit son next_attempt_at repoussé
+    de CLAIM_LEASE : un autre worker ne la prend pas, et si le worker
+    meurt, elle redevient due après le bail
+  - tous les envois d'un paquet partent ensemble, en parallèle
+    (notifications/fanout.py), pas ligne par ligne
+  - échec temporaire : nouvel essai après RETRY_BASE * 2^(essais-1)
+    (plafonné à RETRY_MAX, avec un peu d'aléa), seulement vers les
+    abonnements en échec ; abandon après MAX_ATTEMPTS essais
+"""
+import json
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, PushOutbox, PushSubscription
+from .fanout import send_all
+from .utils import build_payload, summarize
+
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(notification) -> None:
+    """Met la notification en file (à appeler dans la transaction qui la crée)."""
+    PushOutbox.objects.create(notification=notification)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff exponentiel : base, 2*base, 4*base... plafonné, +/- 10 %."""
+    base = _setting("NOTIFICATIONS_PUSH_RETRY_BASE", 30)
+    ceiling = _setting("NOTIFICATIONS_PUSH_RETRY_MAX", 60 * 60)
+    delay = min(base * 2 ** (attempts - 1), ceiling)
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def claim_batch(size: int) -> list[PushOutbox]:
+    """
+    Réserve jusqu'à `size` lignes dues, dans une transaction courte.
+    SKIP LOCKED : plusieurs workers peuvent tourner en parallèle.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PushOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=PushOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:size]
+        )
+        if rows:
+            PushOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+    return rows
+
+
+def _subscriptions_by_row(rows, notifications):
+    """
+    Abonnements ciblés par chaque ligne, en deux requêtes max pour tout
+    le paquet (abonnements des utilisateurs + broadcast).
+    """
+    user_ids = {n.user_id for n in notifications.values() if n.user_id}
+    by_user = {}
+    for sub in PushSubscription.objects.filter(user_id__in=user_ids):
+        by_user.setdefault(sub.user_id, []).append(sub)
+    everyone = None
+    if any(n.user_id is None for n in notifications.values()):
+        everyone = list(PushSubscription.objects.all())
+
+    targets = {}
+    for row in rows:
+        notification = notifications[row.notification_id]
+        subs = by_user.get(notification.user_id, []) if notification.user_id else everyone
+        if row.retry_subscription_ids is not None:
+            wanted = set(row.retry_subscription_ids)
+            subs = [sub for sub in subs if sub.pk in wanted]
+        targets[row.pk] = subs
+    return targets
+
+
+def process_batch(size: int = 100) -> int:
+    """Envoie un paquet de lignes dues. Retourne le nombre de lignes traitées."""
+    rows = claim_batch(size)
+    if not rows:
+        return 0
+
+    claimed = len(rows)
+    notifications = Notification.objects.in_bulk([row.notification_id for row in rows])
+    orphans = [row.pk for row in rows if row.notification_id not in notifications]
+    if orphans:
+        # notification supprimée entre claim_batch et l'envoi : rien à envoyer
+        # (la cascade a pu retirer la ligne déjà, le delete est alors vide)
+        PushOutbox.objects.filter(pk__in=orphans).delete()
+        rows = [row for row in rows if row.notification_id in notifications]
+    targets = _subscriptions_by_row(rows, notifications)
+    max_attempts = _setting("NOTIFICATIONS_PUSH_MAX_ATTEMPTS", 8)
+
+    # un seul fan-out pour tout le paquet ; spans[row.pk] = tranche de ses résultats
+    messages, spans = [], {}
+    for row in rows:
+        data = json.dumps(build_payload(notifications[row.notification_id]))
+        start = len(messages)
+        messages.extend((sub, data) for sub in targets[row.pk])
+        spans[row.pk] = (start, len(messages))
+    results = send_all(messages)
+
+    for row in rows:
+        notification = notifications[row.notification_id]
+        start, end = spans[row.pk]
+        _, errors, retry = summarize(results[start:end])
+        row.attempts += 1
+        row.last_error = "\n".join(errors)[:2000]
+        now = timezone.now()
+
+        if not retry:
+            # envoyé (les abonnements morts sont supprimés, pas retentés)
+            row.status = PushOutbox.STATUS_SENT
+            row.sent_at = now
+            row.retry_subscription_ids = None
+            Notification.objects.filter(pk=notification.pk).update(sent_at=now)
+        elif row.attempts >= max_attempts:
+            row.status = PushOutbox.STATUS_FAILED
+        else:
+            row.retry_subscription_ids = retry
+            row.next_attempt_at = now + retry_delay(row.attempts)
+        # .update() et pas save(update_fields=...) : si la notification a été
+        # supprimée pendant l'envoi, la ligne a disparu (cascade), on l'ignore
+        PushOutbox.objects.filter(pk=row.pk).update(
+            status=row.status,
+            attempts=row.attempts,
+            last_error=row.last_error,
+            sent_at=row.sent_at,
+            retry_subscription_ids=row.retry_subscription_ids,
+            next_attempt_at=row.next_attempt_at,
+        )
+    return claimed
@@ -0,0 +1,18 @@
+# notifications/pagination.py
+from catalog.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Boîte de réception par curseur, du plus récent au plus ancien
+    (même fonctionnement que le catalogue, voir catalog/pagination.py) :
+
+      - GET /api/notifications/?limit=20
+      - GET /api/notifications/?limit=20&cursor=<next>
+
+    `id` départage les notifications créées dans la même microseconde.
+    """
+
+    ordering = ("-created_at", "-id")
+    default_limit = 20
+    max_limit = 100
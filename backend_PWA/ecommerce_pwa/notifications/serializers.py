@@ -34,3 +34,13 @@ class NotificationReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ["is_read"]
+
+
+class InboxNotificationSerializer(NotificationSerializer):
+    """
+    Boîte de réception (voir notifications/broadcasts.py) : is_read vient
+    de l'annotation `user_is_read`, qui tient compte de l'état de lecture
+    du user pour les broadcasts.
+    """
+
+    is_read = serializers.BooleanField(source="user_is_read", read_only=True)
@@ -1,20 +1,59 @@
 # notifications/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from . import counters, outbox
 from .models import Notification
-from .utils import send_push_for_notification
+
+
+def _unread_owner(user_id, is_read):
+    """User dont le compteur compte cette notification (None : broadcast ou lue)."""
+    return user_id if user_id is not None and not is_read else None
+
+
+@receiver(pre_save, sender=Notification)
+def notification_pre_save(sender, instance: Notification, **kwargs):
+    # état avant modification, pour ajuster le compteur de non-lues en post_save
+    instance._unread_owner_before = None
+    if instance.pk is not None:
+        previous = Notification.objects.filter(pk=instance.pk).values_list("user_id", "is_read").first()
+        if previous is not None:
+            instance._unread_owner_before = _unread_owner(*previous)
 
 
 @receiver(post_save, sender=Notification)
 def notification_post_save(sender, instance: Notification, created: bool, **kwargs):
     """
-    À chaque fois qu'une Notification est créée, on envoie la push correspondante.
+    À chaque fois qu'une Notification est créée, on met la push correspondante
+    en file (outbox), dans la transaction de l'appelant : elle est envoyée
+    après commit par `python manage.py run_push_worker`.
+
+    Les compteurs de non-lues suivent (voir notifications/counters.py).
     """
+    before = getattr(instance, "_unread_owner_before", None)
+    after = _unread_owner(instance.user_id, instance.is_read)
+    if before != after:
+        if before is not None:
+            counters.add_unread(before, -1)
+        if after is not None:
+            counters.add_unread(after, 1)
+
     if not created:
         return
 
-    # Tu peux mettre des conditions ici si tu ne veux pas tout envoyer
-    # ex: if instance.type in ["promo", "order"]: ...
-    success, errors = send_push_for_notification(instance)
-    print(f"[PUSH] Notification #{instance.id} → {success} envois, erreurs={errors}")
+    if instance.user_id is None:
+        counters.add_broadcasts(1)
+
+    # déjà envoyée à la main (ex: send_test_push) : rien à mettre en file
+    if instance.sent_at is not None:
+        return
+
+    outbox.enqueue(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_post_delete(sender, instance: Notification, **kwargs):
+    if instance.user_id is None:
+        counters.broadcast_deleted(instance)
+    elif not instance.is_read:
+        counters.add_unread(instance.user_id, -1)
@@ -1,3 +1,551 @@
-from django.test import TestCase
+import threading
+import time
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlparse
 
-# Create your tests here.
+import requests
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from pywebpush import WebPushException
+from rest_framework.test import APIClient
+
+from ecommerce_pwa.fast_serializers import FastSerializer
+
+from . import broadcasts, counters, fanout, outbox, vapid
+from .fanout import PushResult
+from .models import BroadcastReadState, Notification, PushOutbox, PushSubscription
+from .pagination import NotificationPagination
+from .serializers import InboxNotificationSerializer, NotificationSerializer
+
+
+class FakePush:
+    """Remplace fanout.send_all : statut HTTP par endpoint, envois mémorisés."""
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+        self.sent = []
+
+    def __call__(self, messages):
+        results = []
+        for subscription, data in messages:
+            self.sent.append(subscription.endpoint)
+            status = self.statuses.get(subscription.endpoint, 201)
+            results.append(PushResult(subscription, status, "" if status < 300 else f"HTTP {status}"))
+        return results
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="alice", password="x")
+        self.phone = PushSubscription.objects.create(
+            user=self.user, endpoint="https://fcm.googleapis.com/fcm/send/phone", p256dh="p", auth="a"
+        )
+        self.laptop = PushSubscription.objects.create(
+            user=self.user, endpoint="https://updates.push.services.mozilla.com/laptop", p256dh="p", auth="a"
+        )
+
+    def notify(self, **kwargs):
+        return Notification.objects.create(user=self.user, title="Commande", message="Confirmée", **kwargs)
+
+    def process(self, push):
+        with mock.patch.object(outbox, "send_all", push):
+            return outbox.process_batch()
+
+    def make_due(self):
+        PushOutbox.objects.update(next_attempt_at=timezone.now())
+
+    def test_notification_is_enqueued(self):
+        notification = self.notify()
+        row = PushOutbox.objects.get()
+        self.assertEqual(row.notification, notification)
+        self.assertEqual(row.status, PushOutbox.STATUS_PENDING)
+
+    def test_already_sent_notification_is_not_enqueued(self):
+        self.notify(sent_at=timezone.now())
+        self.assertFalse(PushOutbox.objects.exists())
+
+    def test_claim_leases_rows(self):
+        self.notify()
+        self.notify()
+        PushOutbox.objects.filter(pk=PushOutbox.objects.last().pk).update(
+            next_attempt_at=timezone.now() + timedelta(hours=1)
+        )
+
+        claimed = outbox.claim_batch(10)
+
+        self.assertEqual(len(claimed), 1)
+        leased = PushOutbox.objects.get(pk=claimed[0].pk)
+        self.assertGreater(leased.next_attempt_at, timezone.now() + outbox.CLAIM_LEASE - timedelta(minutes=1))
+        # réservée : un autre worker ne la reprend pas pendant le bail
+        self.assertEqual(outbox.claim_batch(10), [])
+
+    def test_sent_to_every_subscription(self):
+        notification = self.notify()
+        push = FakePush()
+
+        self.assertEqual(self.process(push), 1)
+
+        self.assertCountEqual(push.sent, [self.phone.endpoint, self.laptop.endpoint])
+        row = PushOutbox.objects.get()
+        self.assertEqual(row.status, PushOutbox.STATUS_SENT)
+        self.assertEqual(row.attempts, 1)
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.sent_at)
+
+    def test_gone_subscription_is_deleted_not_retried(self):
+        self.notify()
+        self.process(FakePush({self.laptop.endpoint: 410}))
+
+        self.assertEqual(PushOutbox.objects.get().status, PushOutbox.STATUS_SENT)
+        self.assertFalse(PushSubscription.objects.filter(pk=self.laptop.pk).exists())
+
+    @override_settings(NOTIFICATIONS_PUSH_RETRY_BASE=30)
+    def test_temporary_failure_retries_failed_subscriptions_only(self):
+        self.notify()
+        before = timezone.now()
+        self.process(FakePush({self.laptop.endpoint: 503}))
+
+        row = PushOutbox.objects.get()
+        self.assertEqual(row.status, PushOutbox.STATUS_PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.retry_subscription_ids, [self.laptop.pk])
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=27))
+        # pas encore dû : rien à traiter
+        self.assertEqual(self.process(FakePush()), 0)
+
+        self.make_due()
+        push = FakePush()
+        self.process(push)
+
+        self.assertEqual(push.sent, [self.laptop.endpoint])
+        row.refresh_from_db()
+        self.assertEqual(row.status, PushOutbox.STATUS_SENT)
+        self.assertEqual(row.attempts, 2)
+
+    @override_settings(NOTIFICATIONS_PUSH_MAX_ATTEMPTS=2)
+    def test_gives_up_after_max_attempts(self):
+        self.notify()
+        failing = FakePush({self.phone.endpoint: 500, self.laptop.endpoint: 429})
+        self.process(failing)
+        self.make_due()
+        self.process(failing)
+
+        row = PushOutbox.objects.get()
+        self.assertEqual(row.status, PushOutbox.STATUS_FAILED)
+        self.assertEqual(row.attempts, 2)
+        self.assertIn("HTTP 500", row.last_error)
+        self.make_due()
+        self.assertEqual(outbox.claim_batch(10), [])
+
+    def test_worker_retries_through_real_fanout(self):
+        notification = self.notify()
+        failing = FakeWebpush({self.laptop.endpoint: 503}, delay=0)
+        out = StringIO()
+        with mock.patch.object(fanout, "webpush", failing), mock.patch.object(fanout, "vapid_headers", return_value={}):
+            call_command("run_push_worker", "--once", stdout=out)
+            # nouvelle tentative pas encore due : le worker s'arrête
+            self.assertIn("1 push traitées", out.getvalue())
+            self.assertEqual(PushOutbox.objects.get().retry_subscription_ids, [self.laptop.pk])
+
+            self.make_due()
+            working = FakeWebpush(delay=0)
+            with mock.patch.object(fanout, "webpush", working):
+                call_command("run_push_worker", "--once", stdout=StringIO())
+        self.addCleanup(fanout.close_sessions)
+
+        self.assertEqual(set(working.sessions), {"updates.push.services.mozilla.com"})
+        row = PushOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), (PushOutbox.STATUS_SENT, 2))
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.sent_at)
+
+    @override_settings(NOTIFICATIONS_PUSH_RETRY_BASE=30, NOTIFICATIONS_PUSH_RETRY_MAX=200)
+    def test_retry_delay_backoff(self):
+        with mock.patch.object(outbox.random, "uniform", return_value=1.0):
+            delays = [outbox.retry_delay(attempts).total_seconds() for attempts in range(1, 6)]
+        self.assertEqual(delays, [30, 60, 120, 200, 200])
+
+    def test_deleted_notification_is_skipped(self):
+        gone = self.notify()
+        kept = self.notify()
+        claim_batch = outbox.claim_batch
+
+        def claim_then_delete(size):
+            rows = claim_batch(size)
+            gone.delete()
+            return rows
+
+        push = FakePush()
+        with mock.patch.object(outbox, "claim_batch", claim_then_delete):
+            self.assertEqual(self.process(push), 2)
+
+        self.assertEqual(len(push.sent), 2)
+        self.assertEqual(
+            list(PushOutbox.objects.values_list("notification_id", "status")),
+            [(kept.pk, PushOutbox.STATUS_SENT)],
+        )
+
+
+class InboxTestCase(TestCase):
+    def setUp(self):
+        joined = timezone.now() - timedelta(days=1)
+        User = get_user_model()
+        self.alice = User.objects.create_user(username="alice", password="x", date_joined=joined)
+        self.bob = User.objects.create_user(username="bob", password="x", date_joined=joined)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def broadcast(self, title="Promo"):
+        return Notification.objects.create(title=title, message="-20 %", type="promo")
+
+    def personal(self, user=None, **kwargs):
+        return Notification.objects.create(user=user or self.alice, title="Commande", message="Confirmée", **kwargs)
+
+    def inbox_state(self, user=None):
+        """{id: lue ?} de la boîte de réception de `user`."""
+        return dict(broadcasts.inbox(user or self.alice).values_list("pk", "user_is_read"))
+
+
+class BroadcastTests(InboxTestCase):
+    def test_inbox_merges_broadcasts_since_signup(self):
+        promo = self.broadcast()
+        order = self.personal()
+        self.personal(user=self.bob)
+        newcomer = get_user_model().objects.create_user(username="carol", password="x")
+
+        response = self.client.get("/api/notifications/")
+
+        self.assertEqual([item["id"] for item in response.data], [order.pk, promo.pk])
+        self.assertEqual(self.inbox_state(newcomer), {})
+
+    def test_mark_read_is_per_user(self):
+        promo = self.broadcast()
+
+        response = self.client.post(f"/api/notifications/{promo.pk}/read/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.inbox_state(), {promo.pk: True})
+        self.assertEqual(self.inbox_state(self.bob), {promo.pk: False})
+        promo.refresh_from_db()
+        self.assertFalse(promo.is_read)
+
+    def test_watermark_absorbs_read_exceptions(self):
+        first, second, third = self.broadcast("1"), self.broadcast("2"), self.broadcast("3")
+
+        broadcasts.mark_read(self.alice, first)
+        broadcasts.mark_read(self.alice, third)
+        state = BroadcastReadState.objects.get(user=self.alice)
+        self.assertEqual((state.read_up_to, state.read_ids), (first.pk, [third.pk]))
+
+        broadcasts.mark_read(self.alice, second)
+        state.refresh_from_db()
+        self.assertEqual((state.read_up_to, state.read_ids), (third.pk, []))
+        self.assertEqual(self.inbox_state(), {first.pk: True, second.pk: True, third.pk: True})
+
+    def test_mark_read_twice_is_a_no_op(self):
+        promo = self.broadcast()
+        broadcasts.mark_read(self.alice, promo)
+        with self.assertNumQueries(3):  # savepoint, lecture de l'état, savepoint
+            broadcasts.mark_read(self.alice, promo)
+
+    def test_cannot_read_someone_elses_notification(self):
+        other = self.personal(user=self.bob)
+
+        response = self.client.post(f"/api/notifications/{other.pk}/read/")
+
+        self.assertEqual(response.status_code, 404)
+        other.refresh_from_db()
+        self.assertFalse(other.is_read)
+
+    def test_mark_all_read(self):
+        promos = [self.broadcast(), self.broadcast()]
+        orders = [self.personal(), self.personal()]
+        bobs = self.personal(user=self.bob)
+
+        response = self.client.post("/api/notifications/read-all/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(self.inbox_state().values()))
+        self.assertEqual(len(self.inbox_state()), len(promos) + len(orders))
+        bobs.refresh_from_db()
+        self.assertFalse(bobs.is_read)
+        # un broadcast envoyé ensuite reste non lu
+        later = self.broadcast()
+        self.assertFalse(self.inbox_state()[later.pk])
+
+
+class UnreadCounterTests(InboxTestCase):
+    def unread(self, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        response = self.client.get("/api/notifications/unread-count/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["unread"]
+
+    def assertMatchesRecount(self, user):
+        expected = self.unread(user)
+        counters.recount(user)
+        self.assertEqual(self.unread(user), expected)
+
+    def test_first_read_counts_from_tables(self):
+        self.personal()
+        self.personal(is_read=True)
+        self.broadcast()
+        self.assertEqual(self.unread(), 2)
+
+    def test_transitions(self):
+        self.assertEqual(self.unread(), 0)
+
+        order = self.personal()
+        promo = self.broadcast()
+        self.assertEqual(self.unread(), 2)
+
+        self.client.post(f"/api/notifications/{order.pk}/read/")
+        self.assertEqual(self.unread(), 1)
+        self.client.post(f"/api/notifications/{promo.pk}/read/")
+        self.assertEqual(self.unread(), 0)
+        # deuxième "lu" : pas de double décompte
+        self.client.post(f"/api/notifications/{promo.pk}/read/")
+        self.assertEqual(self.unread(), 0)
+
+        order.is_read = False
+        order.save()
+        self.assertEqual(self.unread(), 1)
+        order.delete()
+        self.assertEqual(self.unread(), 0)
+        self.assertMatchesRecount(self.alice)
+
+    def test_mark_all_read_resets(self):
+        self.personal()
+        self.broadcast()
+        self.broadcast()
+        self.assertEqual(self.unread(), 3)
+
+        self.client.post("/api/notifications/read-all/")
+
+        self.assertEqual(self.unread(), 0)
+        self.broadcast()
+        self.assertEqual(self.unread(), 1)
+
+    def test_deleting_a_broadcast_only_lowers_unread_badges(self):
+        kept = self.broadcast()
+        promo = self.broadcast()
+        self.assertEqual((self.unread(self.alice), self.unread(self.bob)), (2, 2))
+        broadcasts.mark_read(self.alice, promo)
+        newcomer = get_user_model().objects.create_user(username="carol", password="x")
+        self.assertEqual(self.unread(newcomer), 0)
+
+        promo.delete()
+
+        self.assertEqual((self.unread(self.alice), self.unread(self.bob)), (1, 1))
+        self.assertEqual(self.unread(newcomer), 0)
+        broadcasts.mark_read(self.alice, kept)
+        self.assertEqual(self.unread(self.alice), 0)
+        for user in (self.alice, self.bob, newcomer):
+            self.assertMatchesRecount(user)
+
+    def test_other_users_notifications_do_not_count(self):
+        self.personal(user=self.bob)
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(self.unread(self.bob), 1)
+
+
+class InboxPaginationTests(InboxTestCase):
+    def test_cursor_pages_cover_inbox_once(self):
+        created = [self.personal() if i % 3 else self.broadcast() for i in range(7)]
+
+        seen, url = [], "/api/notifications/?limit=3"
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            seen += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, [n.pk for n in reversed(created)])
+
+    def test_tampered_cursor_is_404(self):
+        self.personal()
+        pagination = NotificationPagination()
+        for position in (["not-a-date", 1], ["2026-01-01T00:00:00+00:00", "x"], [None, None]):
+            with self.subTest(position=position):
+                cursor = pagination.encode_cursor(position)
+                response = self.client.get(f"/api/notifications/?limit=2&cursor={cursor}")
+                self.assertEqual(response.status_code, 404)
+
+
+class FastSerializerTests(InboxTestCase):
+    def test_inbox_matches_drf_output(self):
+        promo = self.broadcast()  # user NULL, url NULL, sent_at NULL
+        self.personal(url="https://shop.example.com/orders/1", sent_at=timezone.now())
+        broadcasts.mark_read(self.alice, promo)
+        queryset = broadcasts.inbox(self.alice).order_by("pk")
+
+        fast = FastSerializer.for_serializer(InboxNotificationSerializer)
+        data = fast.serialize(fast.values(queryset))
+
+        self.assertEqual(data, InboxNotificationSerializer(queryset, many=True).data)
+        self.assertEqual([item["is_read"] for item in data], [True, False])
+
+    def test_null_foreign_key_matches_drf_output(self):
+        class WithUserSerializer(NotificationSerializer):
+            class Meta(NotificationSerializer.Meta):
+                fields = [*NotificationSerializer.Meta.fields, "user"]
+
+        self.broadcast()
+        self.personal()
+        queryset = Notification.objects.order_by("pk")
+
+        fast = FastSerializer.for_serializer(WithUserSerializer)
+        data = fast.serialize(fast.values(queryset))
+
+        self.assertEqual(data, WithUserSerializer(queryset, many=True).data)
+        self.assertEqual([item["user"] for item in data], [None, self.alice.pk])
+
+
+class StreamingTests(InboxTestCase):
+    def test_stream_matches_regular_inbox(self):
+        broadcasts.mark_read(self.alice, self.broadcast())
+        self.personal(url="https://shop.example.com/orders/1")
+        self.personal(user=self.bob)
+
+        streamed = self.client.get("/api/notifications/?stream=1")
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join(streamed.streaming_content), self.client.get("/api/notifications/").content)
+
+
+class FakeWebpush:
+    """Remplace pywebpush.webpush : statut par endpoint, sessions et concurrence par hôte notées."""
+
+    def __init__(self, statuses=None, delay=0.05):
+        self.statuses = statuses or {}
+        self.delay = delay
+        self.sessions = {}
+        self.running = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, subscription_info, requests_session=None, **kwargs):
+        endpoint = subscription_info["endpoint"]
+        host = urlparse(endpoint).netloc
+        with self.lock:
+            self.sessions.setdefault(host, set()).add(id(requests_session))
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.running[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.running[host] -= 1
+
+        status = self.statuses.get(endpoint, 201)
+        if status == "timeout":
+            raise requests.ConnectionError("timeout")
+        response = mock.Mock(status_code=status)
+        if status >= 400:
+            raise WebPushException(f"Push failed: {status}", response=response)
+        return response
+
+
+@override_settings(NOTIFICATIONS_PUSH_PER_HOST=2, NOTIFICATIONS_PUSH_HOST_LIMITS={"slow.example.com": 1})
+class FanoutTests(TestCase):
+    def setUp(self):
+        self.addCleanup(fanout.close_sessions)
+        headers = mock.patch.object(fanout, "vapid_headers", return_value={"Authorization": "vapid t=x"})
+        headers.start()
+        self.addCleanup(headers.stop)
+
+    def messages(self, endpoints):
+        return [
+            (PushSubscription(endpoint=endpoint, p256dh="p", auth="a"), '{"title": "Promo"}')
+            for endpoint in endpoints
+        ]
+
+    def send(self, endpoints, webpush=None, **kwargs):
+        webpush = webpush or FakeWebpush()
+        with mock.patch.object(fanout, "webpush", webpush):
+            return fanout.send_all(self.messages(endpoints), **kwargs), webpush
+
+    def test_results_keep_message_order(self):
+        endpoints = [f"https://{host}/sub/{i}" for i in range(4) for host in ("fcm.example.com", "moz.example.com")]
+        endpoints.append("pas-une-url")
+        webpush = FakeWebpush({endpoints[1]: 410, endpoints[2]: 503, endpoints[3]: "timeout"})
+
+        results, _ = self.send(endpoints, webpush)
+
+        self.assertEqual([result.subscription.endpoint for result in results], endpoints)
+        self.assertEqual([result.status for result in results][:4], [201, 410, 503, None])
+        self.assertTrue(results[1].gone)
+        self.assertTrue(results[2].retryable and results[3].retryable)
+        self.assertEqual((results[-1].status, results[-1].retryable), (400, False))
+
+    def test_per_host_limit_and_session_reuse(self):
+        endpoints = [f"https://{host}/sub/{i}" for i in range(6) for host in ("fcm.example.com", "slow.example.com")]
+
+        _, webpush = self.send(endpoints)
+
+        self.assertEqual(webpush.peak, {"fcm.example.com": 2, "slow.example.com": 1})
+        # une session par hôte, partagée par toutes ses voies
+        self.assertEqual({host: len(ids) for host, ids in webpush.sessions.items()},
+                         {"fcm.example.com": 1, "slow.example.com": 1})
+        first = fanout.session_for("fcm.example.com")
+
+        _, webpush = self.send(endpoints[:2])
+
+        self.assertEqual(webpush.sessions["fcm.example.com"], {id(first)})
+        self.assertIsNot(first, fanout.session_for("slow.example.com"))
+
+    def test_single_worker_sends_sequentially(self):
+        endpoints = [f"https://fcm.example.com/sub/{i}" for i in range(3)]
+        results, webpush = self.send(endpoints, max_workers=1)
+        self.assertEqual(webpush.peak, {"fcm.example.com": 1})
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(fanout.send_all([]), [])
+
+
+@override_settings(NOTIFICATIONS_VAPID_TTL=3600, NOTIFICATIONS_VAPID_REFRESH_MARGIN=300)
+class VapidTests(TestCase):
+    def setUp(self):
+        vapid.clear()
+        self.addCleanup(vapid.clear)
+        sign = mock.patch.object(vapid.Vapid, "sign", autospec=True, side_effect=self.fake_sign)
+        self.sign = sign.start()
+        self.addCleanup(sign.stop)
+
+    @staticmethod
+    def fake_sign(key, claims):
+        return {"Authorization": f"vapid t={claims['aud']}:{claims['exp']}"}
+
+    def headers_at(self, now, aud="https://fcm.googleapis.com"):
+        with mock.patch.object(vapid.time, "time", return_value=now):
+            return vapid.vapid_headers(aud)
+
+    def test_signed_once_per_audience_within_ttl(self):
+        first = self.headers_at(1000)
+        self.assertEqual(first, {"Authorization": "vapid t=https://fcm.googleapis.com:4600"})
+        self.assertIs(self.headers_at(1000 + 3600 - 301), first)
+        self.headers_at(1000, aud="https://updates.push.services.mozilla.com")
+        self.assertEqual(self.sign.call_count, 2)
+        self.assertEqual(self.sign.call_args.args[1]["sub"], settings.WEBPUSH_VAPID_CLAIMS)
+
+    def test_resigned_before_expiry(self):
+        self.headers_at(1000)
+        renewed = self.headers_at(1000 + 3600 - 300)
+        self.assertEqual(renewed, {"Authorization": "vapid t=https://fcm.googleapis.com:7900"})
+        self.assertEqual(self.sign.call_count, 2)
+
+    def test_clear_and_key_rotation(self):
+        self.headers_at(1000)
+        vapid.clear()
+        self.headers_at(1000)
+        with override_settings(WEBPUSH_VAPID_CLAIMS="mailto:ops@example.com"):
+            self.headers_at(1000)
+        self.assertEqual(self.sign.call_count, 3)
+
+    def test_audience(self):
+        self.assertEqual(vapid.audience("https://fcm.googleapis.com/fcm/send/abc"), "https://fcm.googleapis.com")
+        self.assertIsNone(vapid.audience("pas-une-url"))
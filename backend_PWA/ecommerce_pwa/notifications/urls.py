@@ -1,6 +1,6 @@
 # notifications/urls.py
 from django.urls import path
-from .views import NotificationListAPIView, NotificationMarkReadAPIView,notify_cart_add
+from .views import NotificationListAPIView, NotificationMarkReadAPIView, NotificationMarkAllReadAPIView, NotificationUnreadCountAPIView, notify_cart_add
 from . import views
 app_name = "notifications"
 
@@ -9,7 +9,13 @@ urlpatterns = [
     # GET  /api/notifications/
     path("", NotificationListAPIView.as_view(), name="list"),
     path("notify-cart-add/", views.notify_cart_add, name="notify-cart-add"),
+    # Nombre de non-lues (badge de la cloche)
+    # GET  /api/notifications/unread-count/
+    path("unread-count/", NotificationUnreadCountAPIView.as_view(), name="unread-count"),
     # Marquer une notification comme lue
     # POST /api/notifications/<id>/read/
     path("<int:pk>/read/", NotificationMarkReadAPIView.as_view(), name="mark-read"),
+    # Tout marquer comme lu (broadcasts compris)
+    # POST /api/notifications/read-all/
+    path("read-all/", NotificationMarkAllReadAPIView.as_view(), name="mark-all-read"),
 ]
@@ -1,69 +1,62 @@
 # notifications/utils.py
 import json
-from urllib.parse import urlparse
 
 from django.conf import settings
-from pywebpush import webpush, WebPushException
 
+from .fanout import send_all
 from .models import PushSubscription
 
 
-def _get_aud_from_endpoint(endpoint: str) -> str | None:
-    """Retourne 'aud' pour VAPID à partir de l'endpoint FCM."""
-    try:
-        parsed = urlparse(endpoint)
-        return f"{parsed.scheme}://{parsed.netloc}"
-    except Exception:
-        return None
-
-
 def _send_payload_to_subscriptions(subscriptions, payload: dict) -> tuple[int, list[str]]:
     """
     Envoie un payload webpush à une liste de PushSubscription.
     Retourne (nombre_envoyé, liste_erreurs).
     """
-    success = 0
-    errors: list[str] = []
+    success, errors, _ = deliver_payload(subscriptions, payload)
+    return success, errors
 
-    for sub in subscriptions:
-        aud = _get_aud_from_endpoint(sub.endpoint)
-        if not aud:
-            errors.append(f"Endpoint invalide: {sub.endpoint}")
-            continue
 
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
-                },
-                data=json.dumps(payload),
-                vapid_private_key=settings.WEBPUSH_VAPID_PRIVATE_KEY,
-                vapid_claims={
-                    "sub": settings.WEBPUSH_VAPID_CLAIMS,
-                    "aud": aud,
-                },
-            )
-            success += 1
-        except WebPushException as e:
-            # si l'abonnement est mort (404/410), on le supprime
-            if getattr(e, "response", None) is not None and e.response.status_code in (404, 410):
-                sub.delete()
-            errors.append(str(e))
+def deliver_payload(subscriptions, payload: dict) -> tuple[int, list[str], list[int]]:
+    """
+    Comme _send_payload_to_subscriptions, mais retourne aussi les ids des
+    abonnements à retenter (échec temporaire : réseau, 429, 5xx).
+    Les abonnements morts (404/410) sont supprimés, pas retentés.
 
-    return success, errors
+    Les envois partent en parallèle (voir notifications/fanout.py).
+    """
+    data = json.dumps(payload)
+    return summarize(send_all((sub, data) for sub in subscriptions))
 
 
-def send_push_for_notification(notification) -> tuple[int, list[str]]:
+def summarize(results) -> tuple[int, list[str], list[int]]:
     """
-    Envoie une push pour une instance de Notification.
-
-    - Si notification.user est défini → envoie à tous ses PushSubscription
-    - Si notification.user est None → broadcast à tous les abonnés
+    (nombre_envoyé, erreurs, ids à retenter) pour une liste de PushResult,
+    et suppression des abonnements morts en une seule requête.
     """
-    # 1) Construire le payload à partir de l'objet Notification
+    success = 0
+    errors: list[str] = []
+    retry: list[int] = []
+    gone: list[int] = []
+
+    for result in results:
+        if result.ok:
+            success += 1
+            continue
+        errors.append(result.error)
+        if result.gone:
+            gone.append(result.subscription.pk)
+        elif result.retryable:
+            retry.append(result.subscription.pk)
+
+    if gone:
+        PushSubscription.objects.filter(pk__in=gone).delete()
+    return success, errors, retry
+
+
+def build_payload(notification) -> dict:
+    """Payload JSON reçu par le service worker pour une Notification."""
     url = notification.url or "http://127.0.0.1:5173/"
-    payload = {
+    return {
         "title": notification.title,
         "body": notification.message,
         "url": url,
@@ -71,22 +64,34 @@ def send_push_for_notification(notification) -> tuple[int, list[str]]:
         "id": notification.id,
     }
 
-    if notification.user:
-        subs = PushSubscription.objects.filter(user=notification.user)
-    else:
-        subs = PushSubscription.objects.all()  # 👈 broadcast
 
-    return _send_payload_to_subscriptions(subs, payload)
+def subscriptions_for(notification):
+    """Abonnements de l'utilisateur, ou de tout le monde si notification.user est None."""
+    if notification.user_id:
+        return PushSubscription.objects.filter(user_id=notification.user_id)
+    return PushSubscription.objects.all()  # 👈 broadcast
+
+
+def send_push_for_notification(notification) -> tuple[int, list[str]]:
+    """
+    Envoie une push pour une instance de Notification (appel bloquant).
+
+    - Si notification.user est défini → envoie à tous ses PushSubscription
+    - Si notification.user est None → broadcast à tous les abonnés
+
+    Les vues passent par l'outbox (notifications/outbox.py) : cette
+    fonction reste pour les envois manuels (shell, admin).
+    """
+    return _send_payload_to_subscriptions(subscriptions_for(notification), build_payload(notification))
 
     # notifications/utils.py
 
 from django.conf import settings
 from .models import Notification
-from .views import send_push_for_notification  # si la fonction est là
 
 def notify_order_validated(order):
     """
-    Crée une Notification + envoie un push pour une commande validée.
+    Crée une Notification (+ push via l'outbox) pour une commande validée.
     """
     user = order.user
 
@@ -98,14 +103,12 @@ def notify_order_validated(order):
     )
     url = f"{frontend_order_url}/{order.id}"
 
-    notif = Notification.objects.create(
+    # la push est mise en file par le signal post_save (outbox) et
+    # envoyée après commit par run_push_worker
+    return Notification.objects.create(
         user=user,
         title="Commande validée ✅",
         message=f"Merci {user.username}, ta commande #{order.id} est confirmée.",
         type="order",
         url=url,
     )
-
-    # réutilise ta fonction qui parcourt PushSubscription et envoie le push
-    sent, errors = send_push_for_notification(notif)
-    return sent, errors
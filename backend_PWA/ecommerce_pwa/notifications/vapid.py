@@ -0,0 +1,68 @@
+# notifications/vapid.py
+"""
+En-têtes VAPID (JWT ES256) signés une fois par audience, puis réutilisés.
+
+pywebpush.webpush() relit la clé privée et signe un nouveau JWT à chaque
+envoi. Or le JWT ne dépend que de l'audience (scheme://hôte du service
+push : FCM, Mozilla, Apple...) et de son expiration : pour un broadcast,
+ce sont des milliers de signatures ECDSA identiques.
+
+Ici, l'en-tête Authorization de chaque audience est gardé en mémoire
+jusqu'à NOTIFICATIONS_VAPID_REFRESH_MARGIN secondes (défaut 5 min) avant
+son `exp` (NOTIFICATIONS_VAPID_TTL, défaut 12 h, comme pywebpush ; la
+spécification impose au plus 24 h).
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from py_vapid import Vapid
+
+_cache: dict[tuple, tuple[dict, int]] = {}
+_keys: dict[str, Vapid] = {}
+_lock = threading.Lock()
+
+
+def audience(endpoint: str) -> str | None:
+    """'aud' VAPID d'un endpoint : https://fcm.googleapis.com/fcm/send/... -> https://fcm.googleapis.com"""
+    parsed = urlparse(endpoint)
+    if not parsed.scheme or not parsed.netloc:
+        return None
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _signing_key(private_key: str) -> Vapid:
+    key = _keys.get(private_key)
+    if key is None:
+        key = _keys[private_key] = Vapid.from_string(private_key=private_key)
+    return key
+
+
+def vapid_headers(aud: str) -> dict:
+    """En-têtes VAPID (Authorization) pour l'audience, signés au plus une fois par période."""
+    private_key = settings.WEBPUSH_VAPID_PRIVATE_KEY
+    subject = settings.WEBPUSH_VAPID_CLAIMS
+    cache_key = (private_key, subject, aud)
+    now = int(time.time())
+    margin = getattr(settings, "NOTIFICATIONS_VAPID_REFRESH_MARGIN", 5 * 60)
+
+    cached = _cache.get(cache_key)
+    if cached is not None and cached[1] - margin > now:
+        return cached[0]
+
+    with _lock:
+        cached = _cache.get(cache_key)
+        if cached is not None and cached[1] - margin > now:
+            return cached[0]
+        exp = now + getattr(settings, "NOTIFICATIONS_VAPID_TTL", 12 * 60 * 60)
+        headers = _signing_key(private_key).sign({"sub": subject, "aud": aud, "exp": exp})
+        _cache[cache_key] = (headers, exp)
+        return headers
+
+
+def clear() -> None:
+    """Oublie les JWT signés (rotation de la clé VAPID, tests)."""
+    with _lock:
+        _cache.clear()
+        _keys.clear()
@@ -4,21 +4,24 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.views.decorators.csrf import csrf_exempt
 from .models import Notification
-from .serializers import NotificationSerializer, NotificationReadSerializer
+from .serializers import InboxNotificationSerializer, NotificationReadSerializer
 from .models import PushSubscription
 from django.http import JsonResponse   
 import json
-from pywebpush import webpush, WebPushException
 from django.conf import settings 
-from urllib.parse import urlparse
 from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from catalog.models import Product
-from notifications.utils import send_push_for_notification
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from ecommerce_pwa.fast_serializers import FastSerializer
+from ecommerce_pwa.streaming import stream_json_response, wants_stream
+from . import broadcasts, counters
+from .fanout import send_all
+from .pagination import NotificationPagination
+from .utils import summarize
 
 User = get_user_model()
 
@@ -27,35 +30,78 @@ User = get_user_model()
 class NotificationListAPIView(APIView):
     """
     GET /api/notifications/
-    → Retourne les notifications du user connecté (triées du plus récent au plus ancien)
+    → Retourne les notifications du user connecté (triées du plus récent au plus ancien),
+      broadcasts compris (fusionnés à la lecture, voir notifications/broadcasts.py)
+    ?limit=20[&cursor=...] → pagination par curseur sur (created_at, id) :
+      {"next": <url ou null>, "results": [...]}
+    ?stream=1 → tableau JSON émis par paquets (mémoire constante)
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+    # sérialisation depuis .values() (voir ecommerce_pwa/fast_serializers.py)
+    fast_serialization = True
 
     def get(self, request, *args, **kwargs):
-        # Notifications du user connecté
-        qs = Notification.objects.filter(user=request.user).order_by("-created_at")
-        serializer = NotificationSerializer(qs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Notifications du user connecté + broadcasts
+        qs = broadcasts.inbox(request.user)
+        paginator = self.pagination_class()
+        if wants_stream(request):
+            return stream_json_response(qs.order_by(*paginator.ordering), InboxNotificationSerializer)
+        if self.fast_serialization:
+            fast = FastSerializer.for_serializer(InboxNotificationSerializer)
+            qs = fast.values(qs, keep=paginator.ordering_fields)
+        page = paginator.paginate_queryset(qs, request, view=self)
+        rows = page if page is not None else qs.order_by(*paginator.ordering)
+        if self.fast_serialization:
+            data = fast.serialize(rows)
+        else:
+            data = InboxNotificationSerializer(rows, many=True).data
+        if page is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class NotificationUnreadCountAPIView(APIView):
+    """
+    GET /api/notifications/unread-count/
+    → {"unread": <nombre>} pour le badge de la cloche.
+      Lu depuis les compteurs (notifications/counters.py), sans COUNT(*).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        response = Response({"unread": counters.unread_count(request.user)}, status=status.HTTP_200_OK)
+        response["Cache-Control"] = "no-cache"
+        return response
 
 
 class NotificationMarkReadAPIView(APIView):
     """
     POST /api/notifications/<id>/read/
     → Marque UNE notification comme lue pour le user connecté.
+      Pour un broadcast, seul l'état de lecture du user change.
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk, *args, **kwargs):
         try:
-            notif = Notification.objects.get(pk=pk, user=request.user)
+            notif = Notification.objects.filter(broadcasts.visible_to(request.user)).get(pk=pk)
         except Notification.DoesNotExist:
             return Response(
                 {"detail": "Notification introuvable."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        if notif.user_id is None:
+            broadcasts.mark_read(request.user, notif)
+            return Response(
+                {"detail": "Notification marquée comme lue."},
+                status=status.HTTP_200_OK,
+            )
+
         serializer = NotificationReadSerializer(
             notif, data={"is_read": True}, partial=True
         )
@@ -69,6 +115,23 @@ class NotificationMarkReadAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class NotificationMarkAllReadAPIView(APIView):
+    """
+    POST /api/notifications/read-all/
+    → Marque toutes les notifications du user connecté comme lues
+      (1 UPDATE + le filigrane des broadcasts, quel que soit leur nombre).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        updated = broadcasts.mark_all_read(request.user)
+        return Response(
+            {"detail": "Notifications marquées comme lues.", "updated": updated},
+            status=status.HTTP_200_OK,
+        )
+
+
 @csrf_exempt
 @csrf_exempt
 def save_subscription(request):
@@ -121,17 +184,8 @@ def save_subscription(request):
     return JsonResponse({"status": "ok"})
 
 
-def _get_aud_from_endpoint(endpoint):
-    parsed = urlparse(endpoint)
-    if not parsed.scheme or not parsed.netloc:
-        return None
-    return f"{parsed.scheme}://{parsed.netloc}"
-
-
-
 def send_test_push(request):
-    success = 0
-    errors = []
+    messages = []
 
     for sub in PushSubscription.objects.all():
 
@@ -163,31 +217,10 @@ def send_test_push(request):
 
         # 2) SAUVEGARDER EN BASE dans ton modèle Notification
        
-        # 3) Envoyer la notif push comme avant
-        aud = _get_aud_from_endpoint(sub.endpoint)
-        if not aud:
-            errors.append(f"Endpoint invalide: {sub.endpoint}")
-            continue
+        # 3) Préparer l'envoi (les push partent toutes ensemble, en parallèle)
+        messages.append((sub, json.dumps(payload)))
 
-        try:
-            webpush(
-                subscription_info={
-                    "endpoint": sub.endpoint,
-                    "keys": {"p256dh": sub.p256dh, "auth": sub.auth},
-                },
-                data=json.dumps(payload),
-                vapid_private_key=settings.WEBPUSH_VAPID_PRIVATE_KEY,
-                vapid_claims={
-                    "sub": settings.WEBPUSH_VAPID_CLAIMS,
-                    "aud": aud,
-                },
-            )
-            success += 1
-        except WebPushException as e:
-            # Abonnement mort → on le supprime
-            if hasattr(e, "response") and e.response is not None and e.response.status_code in (404, 410):
-                sub.delete()
-            errors.append(str(e))
+    success, errors, _ = summarize(send_all(messages))
 
     return JsonResponse({"status": "sent", "count": success, "errors": errors})
 
@@ -215,6 +248,7 @@ def notify_cart_add(request):
     )
 
     # 1) Créer la Notification en base
+    # 2) La push part via l'outbox (signal post_save + run_push_worker)
     notif = Notification.objects.create(
         user=user,
         title="Produit ajouté au panier 🛒",
@@ -223,11 +257,8 @@ def notify_cart_add(request):
         url=frontend_cart_url,
     )
 
-    # 2) Envoi push
-    sent, errors = send_push_for_notification(notif)
-
     return Response({
         "status": "ok",
-        "sent": sent,
-        "errors": errors,
+        "queued": True,
+        "notification": notif.id,
     })
\ No newline at end of file
@@ -0,0 +1,76 @@
+# orders/idempotency.py
+"""
+Clés d'idempotence pour POST /api/orders/create/ (en-tête Idempotency-Key).
+
+Le service worker rejoue les commandes mises en file hors-ligne
+(processQueuedOrders) : sur un réseau instable, la même commande peut
+arriver deux fois. Le front envoie donc une clé unique par panier validé :
+
+  - 1er envoi  : la commande est créée, et sa réponse (201) est enregistrée
+                 avec la clé DANS la même transaction
+  - rejeu      : la réponse enregistrée est renvoyée telle quelle, avec
+                 l'en-tête Idempotent-Replayed: true, sans rouvrir de
+                 transaction ni reverrouiller le stock
+  - même clé, autre panier : 422
+
+Seules les commandes créées sont mémorisées : un refus (stock insuffisant)
+peut être retenté avec la même clé. Les clés expirent après
+ORDERS_IDEMPOTENCY_TTL secondes (défaut 24 h) ; les lignes expirées sont
+ignorées puis supprimées par `python manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(data) -> str:
+    """Empreinte stable du corps de la requête (ordre des clés JSON ignoré)."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lookup(user, key: str, request_hash: str) -> Response | None:
+    """Réponse à rejouer pour cette clé, ou None si la clé est nouvelle (ou expirée)."""
+    stored = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if stored is None:
+        return None
+    if stored.expires_at <= timezone.now():
+        stored.delete()
+        return None
+    if stored.request_hash != request_hash:
+        return Response(
+            {"detail": f"{HEADER} déjà utilisée pour une autre commande."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = Response(stored.response, status=stored.status_code)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def store(user, key: str, request_hash: str, status_code: int, data) -> None:
+    """À appeler dans la transaction de la commande (contrainte unique (user, key))."""
+    ttl = getattr(settings, "ORDERS_IDEMPOTENCY_TTL", 24 * 60 * 60)
+    IdempotencyKey.objects.create(
+        user=user,
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response=data,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+
+
+def purge_expired() -> int:
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Supprime les clés Idempotency-Key expirées (à lancer périodiquement, ex: cron)."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clés d'idempotence expirées supprimées."))
@@ -43,3 +43,28 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Réponse d'une création de commande, mémorisée par (utilisateur, clé
+    Idempotency-Key) : un rejeu (file hors-ligne du service worker, réseau
+    instable) renvoie la même commande au lieu d'en créer une deuxième.
+    Expire après ORDERS_IDEMPOTENCY_TTL secondes (voir orders/idempotency.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=255)
+    # empreinte du corps de la requête : une même clé ne peut pas servir à un autre panier
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_user_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
@@ -1,3 +1,184 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from catalog.models import CatalogVersion, Category, Product
+from catalog.response_cache import response_cache
+from catalog.stock_cache import stock_cache
+from ecommerce_pwa.fast_serializers import FastSerializer
+
+from .models import IdempotencyKey, Order
+from .serializers import OrderSerializer
+
+
+class OrderTestCase(TestCase):
+    url = "/api/orders/create/"
+
+    def setUp(self):
+        response_cache.clear()
+        self.user = get_user_model().objects.create_user(username="alice", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Chaussures")
+        self.shoe = Product.objects.create(category=category, name="Pegasus", price="100.00", stock=5)
+        self.sock = Product.objects.create(category=category, name="Chaussettes", price="5.50", stock=2)
+
+    def order(self, items, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key is not None else {}
+        return self.client.post(self.url, {"items": items}, format="json", **headers)
+
+
+class CreateOrderTests(OrderTestCase):
+    def test_decrements_stock(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.order([
+                {"product_id": self.shoe.pk, "quantity": 2},
+                {"product_id": self.sock.pk, "quantity": 1},
+                {"product_id": self.shoe.pk, "quantity": 1},
+            ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total"], "305.50")
+        self.shoe.refresh_from_db()
+        self.sock.refresh_from_db()
+        self.assertEqual((self.shoe.stock, self.sock.stock), (2, 1))
+        # stock "live" publié après commit
+        self.assertEqual(stock_cache.get_many([self.shoe.pk])[self.shoe.pk], 2)
+
+    def test_stock_decrement_publishes_new_catalog_version(self):
+        version = CatalogVersion.objects.get().version
+        listing = self.client.get("/api/products/")
+        self.assertEqual(self.client.get("/api/products/")["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order([{"product_id": self.shoe.pk, "quantity": 1}])
+
+        self.assertEqual(CatalogVersion.objects.get().version, version + 1)
+        self.shoe.refresh_from_db()
+        self.assertEqual(self.shoe.version, version + 1)
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=listing["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual({item["name"]: item["stock"] for item in response.data}["Pegasus"], 4)
+
+    def test_rolled_back_order_publishes_nothing(self):
+        version = CatalogVersion.objects.get().version
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.order([{"product_id": self.sock.pk, "quantity": 3}])
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CatalogVersion.objects.get().version, version)
+
+    def test_oversell_rejected(self):
+        response = self.order([
+            {"product_id": self.shoe.pk, "quantity": 1},
+            {"product_id": self.sock.pk, "quantity": 3},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["available"], 2)
+        self.shoe.refresh_from_db()
+        self.sock.refresh_from_db()
+        self.assertEqual((self.shoe.stock, self.sock.stock), (5, 2))
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_rejected(self):
+        response = self.order([{"product_id": 999, "quantity": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["missing"], [999])
+
+    def test_invalid_quantity_rejected(self):
+        response = self.order([{"product_id": self.shoe.pk, "quantity": 0}])
+        self.assertEqual(response.status_code, 400)
+
+
+class IdempotencyTests(OrderTestCase):
+    def test_replay_returns_original_response(self):
+        items = [{"product_id": self.shoe.pk, "quantity": 2}]
+        first = self.order(items, key="cart-1")
+        replay = self.order(items, key="cart-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.shoe.refresh_from_db()
+        self.assertEqual(self.shoe.stock, 3)
+
+    def test_same_key_other_cart_is_422(self):
+        self.order([{"product_id": self.shoe.pk, "quantity": 1}], key="cart-1")
+        response = self.order([{"product_id": self.shoe.pk, "quantity": 2}], key="cart-1")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+        self.shoe.refresh_from_db()
+        self.assertEqual(self.shoe.stock, 4)
+
+    def test_refused_order_is_not_remembered(self):
+        items = [{"product_id": self.sock.pk, "quantity": 3}]
+        self.assertEqual(self.order(items, key="cart-1").status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.sock.stock = 10
+        self.sock.save(update_fields=["stock"])
+        self.assertEqual(self.order(items, key="cart-1").status_code, 201)
+
+    def test_keys_are_per_user(self):
+        items = [{"product_id": self.shoe.pk, "quantity": 1}]
+        self.order(items, key="cart-1")
+        other = get_user_model().objects.create_user(username="bob", password="x")
+        self.client.force_authenticate(other)
+
+        response = self.order(items, key="cart-1")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+class PopularOrderingTests(OrderTestCase):
+    def test_order_refreshes_cached_best_sellers(self):
+        url = "/api/products/?ordering=popular"
+        first = self.client.get(url)
+        self.assertEqual([item["name"] for item in first.data], ["Chaussettes", "Pegasus"])
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order([{"product_id": self.shoe.pk, "quantity": 1}])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual([item["name"] for item in response.data], ["Pegasus", "Chaussettes"])
+
+
+class FastSerializerTests(OrderTestCase):
+    def test_orders_match_drf_output(self):
+        self.order([{"product_id": self.shoe.pk, "quantity": 2}, {"product_id": self.sock.pk, "quantity": 1}])
+        self.order([{"product_id": self.sock.pk, "quantity": 1}])
+        Order.objects.create(user=self.user, total_amount="0.00", note="vide")  # sans lignes
+        # microsecondes et fuseau : même formatage ISO 8601 que DRF
+        Order.objects.filter(note="vide").update(
+            created_at=datetime(2024, 3, 31, 1, 30, 0, 123456, tzinfo=dt_timezone.utc)
+        )
+        queryset = Order.objects.order_by("pk")
+
+        fast = FastSerializer.for_serializer(OrderSerializer)
+        data = fast.serialize(fast.values(queryset))
+
+        self.assertEqual(data, OrderSerializer(queryset, many=True).data)
+        self.assertEqual([len(order["items"]) for order in data], [2, 1, 0])
+        self.assertEqual(data[0]["items"][1]["unit_price"], "5.50")
+
+
+class StreamingTests(OrderTestCase):
+    def test_stream_matches_regular_list(self):
+        self.order([{"product_id": self.shoe.pk, "quantity": 1}, {"product_id": self.sock.pk, "quantity": 2}])
+        self.order([{"product_id": self.shoe.pk, "quantity": 1}])
+
+        streamed = self.client.get("/api/orders/?stream=1")
 
-# Create your tests here.
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join(streamed.streaming_content), self.client.get("/api/orders/").content)
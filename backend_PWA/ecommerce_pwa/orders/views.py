@@ -2,15 +2,21 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.conf import settings
 from notifications.utils import notify_order_validated
+from . import idempotency
 from .models import Order, OrderItem
-from catalog.models import Product  # adapte
+from catalog.inventory import decrement_stock, lock_products
+from catalog.popularity import record_sales
 from .serializers import OrderSerializer
 from decimal import Decimal
 from notifications.models import Notification
-from notifications.utils import send_push_for_notification  # si tu as déjà ça
+from ecommerce_pwa.fast_serializers import FastSerializer
+from ecommerce_pwa.streaming import stream_json_response, wants_stream
+
+# list_my_orders sérialise depuis .values() (voir ecommerce_pwa/fast_serializers.py)
+FAST_SERIALIZATION = True
 
 
 @api_view(["POST"])
@@ -19,6 +25,14 @@ def create_order(request):
     """
     Crée une commande à partir des items envoyés par le front :
     items = [{ "product_id": 1, "quantity": 2 }, ...]
+
+    Nombre de requêtes constant quelle que soit la taille du panier :
+    verrouillage de tous les produits en une requête (par pk croissant,
+    pas de deadlock entre deux commandes), lignes créées en bulk_create,
+    stock décrémenté en un seul UPDATE (voir catalog/inventory.py).
+
+    En-tête Idempotency-Key (optionnel) : un rejeu de la même commande
+    renvoie la réponse d'origine (voir orders/idempotency.py).
     """
     user = request.user
     items_data = request.data.get("items", [])
@@ -29,22 +43,68 @@ def create_order(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    # On protège toute la création dans une transaction
-    with transaction.atomic():
-        order = Order.objects.create(user=user, status="pending")
-
-        total = Decimal("0.00")
-
+    # 0) Valider le panier avant de toucher à la base
+    lines = []
+    try:
         for item in items_data:
-            product_id = item.get("product_id")
+            product_id = int(item.get("product_id"))
             quantity = int(item.get("quantity", 1))
+            if quantity < 1:
+                raise ValueError
+            lines.append((product_id, quantity))
+    except (AttributeError, TypeError, ValueError):
+        return Response(
+            {"detail": "Items invalides : product_id et quantity (>= 1) entiers attendus."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-            # On verrouille la ligne produit pour éviter 2 commandes en même temps
-            product = Product.objects.select_for_update().get(pk=product_id)
+    sold = {}  # product_id -> unités (un produit peut apparaître sur plusieurs lignes)
+    for product_id, quantity in lines:
+        sold[product_id] = sold.get(product_id, 0) + quantity
+
+    idempotency_key = request.headers.get(idempotency.HEADER)
+    request_hash = None
+    if idempotency_key is not None:
+        if not idempotency_key or len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{idempotency.HEADER} invalide (1 à {idempotency.MAX_KEY_LENGTH} caractères)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Rejeu : réponse mémorisée, sans transaction ni verrou sur le stock
+        request_hash = idempotency.fingerprint(request.data)
+        replayed = idempotency.lookup(user, idempotency_key, request_hash)
+        if replayed is not None:
+            return replayed
 
-            # 1) Vérifier le stock dispo
+    try:
+        return _place_order(user, lines, sold, idempotency_key, request_hash)
+    except IntegrityError:
+        # même clé envoyée deux fois en parallèle : l'autre requête a créé
+        # la commande (la nôtre est annulée), on renvoie sa réponse
+        replayed = idempotency_key and idempotency.lookup(user, idempotency_key, request_hash)
+        if not replayed:
+            raise
+        return replayed
+
+
+def _place_order(user, lines, sold, idempotency_key=None, request_hash=None):
+    """Transaction de create_order : verrous, lignes, stock, ventes, clé d'idempotence."""
+    # On protège toute la création dans une transaction
+    with transaction.atomic():
+        # 1) Verrouiller tous les produits en une requête, par pk croissant
+        products = lock_products(sold)
+
+        missing = [pk for pk in sold if pk not in products]
+        if missing:
+            return Response(
+                {"detail": "Produit introuvable.", "missing": missing},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # 2) Vérifier le stock dispo (rien n'est encore écrit)
+        for product_id, quantity in sold.items():
+            product = products[product_id]
             if product.stock < quantity:
-                # En levant une erreur ici, la transaction est rollback
                 return Response(
                     {
                         "detail": f"Stock insuffisant pour {product.name}",
@@ -53,30 +113,47 @@ def create_order(request):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # 2) Créer la ligne de commande
-            line_total = Decimal(str(product.price)) * quantity
-
-            OrderItem.objects.create(
+        # 3) Créer la commande et ses lignes
+        total = sum(
+            (Decimal(str(products[product_id].price)) * quantity for product_id, quantity in lines),
+            Decimal("0.00"),
+        )
+        order = Order.objects.create(
+            user=user,
+            status="confirmed",   # par exemple
+            total_amount=total,
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
                 order=order,
-                product=product,
+                product_id=product_id,
                 quantity=quantity,
-                unit_price=product.price,
-                #line_total=line_total,
+                unit_price=products[product_id].price,
             )
+            for product_id, quantity in lines
+        )
 
-            # 3) Mettre à jour le stock
-            product.stock -= quantity
-            product.save(update_fields=["stock"])
-
-            # 4) Mettre à jour le total global
-            total += line_total
+        # 4) Mettre à jour le stock (un seul UPDATE)
+        decrement_stock(products, sold)
 
-        # 5) Sauvegarder le total final
-        order.total_amount = total
-        order.status = "confirmed"   # par exemple
-        order.save(update_fields=["total_amount", "status"])
+        # 5) Meilleures ventes : incrément des compteurs 7 / 30 jours,
+        # dans la même transaction que la commande (catalog/popularity.py).
+        # Le nouveau classement est publié avec le stock (decrement_stock) :
+        # une seule nouvelle version du catalogue par commande.
+        record_sales(sold, publish=False)
 
-        # 6) (Optionnel) Créer une notification + push
+        data = {
+            "id": order.id,
+            "total": str(order.total_amount),
+            "status": order.status,
+        }
+        # 6) Mémoriser la réponse pour les rejeux (même transaction que la commande)
+        if idempotency_key is not None:
+            idempotency.store(user, idempotency_key, request_hash, status.HTTP_201_CREATED, data)
+
+        # 7) (Optionnel) Créer une notification : la push est mise en file
+        # (outbox) dans cette transaction et envoyée après commit par
+        # run_push_worker, hors du chemin critique de la commande
         try:
             frontend_orders_url = getattr(
                 settings,
@@ -84,28 +161,20 @@ def create_order(request):
                 "http://127.0.0.1:5173/orders",  # adapte à ton front
             )
 
-            notif = Notification.objects.create(
-                user=user,
-                title="Commande validée ✅",
-                message=f"Votre commande #{order.id} a été confirmée.",
-                type="order",
-                url=frontend_orders_url,
-            )
-
-            send_push_for_notification(notif)
+            with transaction.atomic():
+                Notification.objects.create(
+                    user=user,
+                    title="Commande validée ✅",
+                    message=f"Votre commande #{order.id} a été confirmée.",
+                    type="order",
+                    url=frontend_orders_url,
+                )
         except Exception as e:
             # on log juste, on ne casse pas la commande si la notif échoue
-            print("[ORDER] Erreur lors de l'envoi de la notif push:", e)
+            print("[ORDER] Erreur lors de la création de la notification:", e)
 
     # Réponse au front
-    return Response(
-        {
-            "id": order.id,
-            "total": str(order.total_amount),
-            "status": order.status,
-        },
-        status=status.HTTP_201_CREATED,
-    )
+    return Response(data, status=status.HTTP_201_CREATED)
 
 
 @api_view(["GET"])
@@ -113,8 +182,20 @@ def create_order(request):
 def list_my_orders(request):
     """
     Retourne la liste des commandes de l'utilisateur connecté.
+    ?stream=1 -> tableau JSON émis par paquets (mémoire constante).
     """
-    qs = Order.objects.filter(user=request.user).order_by("-created_at")
+    qs = (
+        Order.objects.filter(user=request.user)
+        .prefetch_related("items__product")
+        .order_by("-created_at")
+    )
+    if wants_stream(request):
+        return stream_json_response(qs, OrderSerializer)
+
+    if FAST_SERIALIZATION:
+        fast = FastSerializer.for_serializer(OrderSerializer)
+        return Response(fast.serialize(fast.values(qs)))
+
     serializer = OrderSerializer(qs, many=True)
     return Response(serializer.data)
 
@@ -32,10 +32,11 @@ async function apiGet(endpoint, auth = false) {
   return response.json();
 }
 //-----------------------------------------------------
-async function apiPost(endpoint, body, auth = false) {
+async function apiPost(endpoint, body, auth = false, extraHeaders = {}) {
   const headers = {
     "Content-Type": "application/json",
     ...(auth ? getAuthHeaders() : {}),
+    ...extraHeaders,
   };
 
   try {
@@ -87,14 +88,39 @@ export async function getProducts() {
 }
 
 export async function getLimitedProducts(limit = 6) {
-  const products = await apiGet("/products/");
-  return products.slice(2, limit);
+  // pagination côté serveur : on ne télécharge que la première page
+  const page = await apiGet(`/products/?limit=${limit}`);
+  return page.results.slice(2, limit);
+}
+
+// Meilleures ventes (7 derniers jours), pour la vitrine de l'accueil
+export async function getPopularProducts(limit = 6) {
+  const page = await apiGet(`/products/?ordering=popular&limit=${limit}`);
+  return page.results;
+}
+
+// Suggestions pendant la frappe (index mémoire côté serveur, sans SQL)
+// -> { products: [{ id, name }], categories: [{ id, name }] }
+export async function getAutocomplete(query, limit = 8) {
+  return apiGet(`/catalog/autocomplete/?q=${encodeURIComponent(query)}&limit=${limit}`);
 }
 
 export async function getProductById(id) {
   return apiGet(`/products/${id}/`);
 }
 
+// Plusieurs produits en une seule requête (ex: lignes du panier)
+// -> { results: [...], missing: [ids], inactive: [ids] }
+export async function getProductsByIds(ids) {
+  return apiGet(`/products/batch/?ids=${ids.join(",")}`);
+}
+
+// Stock "live" de quelques produits (polling léger pendant le checkout)
+// -> { stock: { "1": 4, ... }, missing: [ids] }
+export async function getProductsStock(ids) {
+  return apiGet(`/products/stock/?ids=${ids.join(",")}`);
+}
+
 export async function getProductsWithFilters(categoryId = null, search = null) {
   const params = new URLSearchParams();
   if (categoryId) params.append("category", categoryId);
@@ -153,9 +179,17 @@ export async function loginWithJWT( username, password) {
 }
 
 
-// Récupérer toutes les notifications du user connecté
-export async function getNotifications() {
-  return apiGet("/notifications/",true);
+// Notifications du user connecté, par pages (curseur renvoyé par la page précédente)
+// -> { next: <url ou null>, results: [...] }
+export async function getNotifications(cursor = null, limit = 20) {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.append("cursor", cursor);
+  return apiGet(`/notifications/?${params}`, true);
+}
+
+// Nombre de notifications non lues (badge de la cloche) -> { unread: 3 }
+export async function getUnreadNotificationsCount() {
+  return apiGet("/notifications/unread-count/", true);
 }
 
 // Marquer une notification comme lue
@@ -163,11 +197,18 @@ export async function markNotificationRead(id) {
   return apiPost(`/notifications/${id}/read/`, {}, true);
 }
 
+// Tout marquer comme lu (broadcasts compris)
+export async function markAllNotificationsRead() {
+  return apiPost("/notifications/read-all/", {}, true);
+}
+
 
 // 🧾 Créer une commande à partir du panier
-export async function createOrderFromCart(items) {
+export async function createOrderFromCart(items, idempotencyKey = crypto.randomUUID()) {
   // items: [{ product_id, quantity }]
-  return apiPost("/orders/create/", { items }, true); 
+  // Idempotency-Key : si la requête est rejouée (file hors-ligne du service
+  // worker, réseau instable), le serveur renvoie la même commande
+  return apiPost("/orders/create/", { items }, true, { "Idempotency-Key": idempotencyKey });
 }
 
 export async function getOrderById(orderId) {
@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { getCategories, getLimitedProducts, getProductById } from "../api";
+import { getCategories, getPopularProducts, getProductById } from "../api";
 import { useCart } from "../pages/CartContext";
 
 
@@ -20,7 +20,7 @@ function Home() {
 
         const [cats, prods] = await Promise.all([
           getCategories(),
-          getLimitedProducts(6), // Limiter à 6 produits seulement
+          getPopularProducts(6), // les 6 meilleures ventes seulement
         ]);
 
         // Limiter aussi les catégories à 4
@@ -112,11 +112,8 @@ function Home() {
     const sum = prices.reduce((acc, val) => acc + val, 0);
     const avg = sum / prices.length;
 
-    // Produit vedette (le plus cher parmi ceux chargés)
-    const maxPrice = Math.max(...prices);
-    const featuredProduct = products.find(
-      (p) => Number(p.price) === maxPrice
-    );
+    // Produit vedette : la meilleure vente (liste triée par le serveur)
+    const featuredProduct = products[0];
 
     return {
       totalProducts: products.length,
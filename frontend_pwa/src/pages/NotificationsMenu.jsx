@@ -1,6 +1,10 @@
 // src/components/NotificationsMenu.jsx
 import { useEffect, useState, useRef } from "react";
-import { getNotifications, markNotificationRead } from "../api";
+import {
+  getNotifications,
+  getUnreadNotificationsCount,
+  markNotificationRead,
+} from "../api";
 import { subscribeUserToPush } from "../pages/pushSubscription";
 import { useAuth } from "./AuthContext";
 
@@ -8,6 +12,8 @@ function NotificationsMenu() {
   const [open, setOpen] = useState(false);
   const [loading, setLoading] = useState(false);
   const [notifications, setNotifications] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [error, setError] = useState(null);
   const { user } = useAuth();
   const menuRef = useRef(null);
@@ -32,11 +38,20 @@ function NotificationsMenu() {
   }, [user]);
 
 
-  // Charger les notifications au montage
+  // Badge : compteur serveur (léger), rafraîchi au montage et toutes les minutes
   useEffect(() => {
-    fetchNotifications();
+    fetchUnreadCount();
+    const timer = setInterval(fetchUnreadCount, 60_000);
+    return () => clearInterval(timer);
   }, []);
 
+  // La liste n'est chargée qu'à l'ouverture du menu
+  useEffect(() => {
+    if (open) {
+      fetchNotifications();
+    }
+  }, [open]);
+
   // Fermer le menu quand on clique en dehors
   useEffect(() => {
     function handleClickOutside(e) {
@@ -50,12 +65,26 @@ function NotificationsMenu() {
     return () => document.removeEventListener("mousedown", handleClickOutside);
   }, [open]);
 
-  async function fetchNotifications() {
+  async function fetchUnreadCount() {
+    try {
+      const data = await getUnreadNotificationsCount();
+      setUnreadCount(data.unread);
+    } catch (err) {
+      console.error(err);
+    }
+  }
+
+  // cursor = null : première page (rafraîchissement), sinon page suivante
+  async function fetchNotifications(cursor = null) {
     try {
       setLoading(true);
       setError(null);
-      const data = await getNotifications();
-      setNotifications(data);
+      const page = await getNotifications(cursor);
+      setNotifications((prev) => (cursor ? [...prev, ...page.results] : page.results));
+      setNextCursor(page.next ? new URL(page.next).searchParams.get("cursor") : null);
+      if (!cursor) {
+        fetchUnreadCount();
+      }
     } catch (err) {
       console.error(err);
       setError("Impossible de charger les notifications.");
@@ -64,11 +93,10 @@ function NotificationsMenu() {
     }
   }
 
-  const unreadCount = notifications.filter((n) => !n.is_read).length;
-
   async function handleMarkRead(id) {
     try {
       await markNotificationRead(id);
+      setUnreadCount((count) => Math.max(count - 1, 0));
       setNotifications((prev) =>
         prev.map((n) =>
           n.id === id ? { ...n, is_read: true } : n
@@ -122,19 +150,20 @@ function NotificationsMenu() {
             <button
               type="button"
               className="notif-refresh-btn"
-              onClick={fetchNotifications}
+              onClick={() => fetchNotifications()}
             >
               ⟳
             </button>
           </div>
 
-          {loading ? (
+          {loading && notifications.length === 0 ? (
             <div className="notif-empty">Chargement…</div>
           ) : error ? (
             <div className="notif-error">{error}</div>
           ) : notifications.length === 0 ? (
             <div className="notif-empty">Aucune notification.</div>
           ) : (
+            <>
             <ul className="notif-list">
               {notifications.map((notif) => (
                 <li
@@ -178,6 +207,17 @@ function NotificationsMenu() {
                 </li>
               ))}
             </ul>
+            {nextCursor && (
+              <button
+                type="button"
+                className="notif-refresh-btn"
+                disabled={loading}
+                onClick={() => fetchNotifications(nextCursor)}
+              >
+                {loading ? "Chargement…" : "Voir plus"}
+              </button>
+            )}
+            </>
           )}
         </div>
       )}
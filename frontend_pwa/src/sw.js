@@ -254,6 +254,8 @@ registerRoute(
       }
 
       const authHeader = request.headers.get("Authorization") || null;
+      // même clé au rejeu : le serveur ne crée pas la commande deux fois
+      const idempotencyKey = request.headers.get("Idempotency-Key") || null;
 
       await queueOrderForSync({
         url: request.url,
@@ -261,6 +263,7 @@ registerRoute(
         headers: {
           "Content-Type": "application/json",
           ...(authHeader ? { Authorization: authHeader } : {}),
+          ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
         },
         body,
       });
@@ -332,6 +335,8 @@ self.addEventListener('fetch', (event) => {
           }
 
           const authHeader = event.request.headers.get("Authorization") || null;
+          // même clé au rejeu : le serveur ne crée pas la commande deux fois
+          const idempotencyKey = event.request.headers.get("Idempotency-Key") || null;
 
           await queueOrderForSync({
             url: event.request.url,
@@ -339,6 +344,7 @@ self.addEventListener('fetch', (event) => {
             headers: {
               "Content-Type": "application/json",
               ...(authHeader ? { Authorization: authHeader } : {}),
+              ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
             },
             body,
           });